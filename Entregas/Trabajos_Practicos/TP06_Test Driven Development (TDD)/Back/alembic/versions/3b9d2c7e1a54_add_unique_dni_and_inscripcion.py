@@ -0,0 +1,62 @@
+"""add_unique_dni_and_inscripcion
+
+Revision ID: 3b9d2c7e1a54
+Revises: fb528749b4f4
+Create Date: 2026-10-18 10:05:12.418305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b9d2c7e1a54'
+down_revision: Union[str, None] = 'fb528749b4f4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Unificar visitantes repetidos por DNI: las inscripciones pasan al visitante más antiguo
+    op.execute("""
+        UPDATE inscripcion i
+        SET id_visitante = d.id_conservado
+        FROM (
+            SELECT id, MIN(id) OVER (PARTITION BY dni) AS id_conservado
+            FROM visitante
+            WHERE dni IS NOT NULL
+        ) d
+        WHERE i.id_visitante = d.id AND d.id <> d.id_conservado
+    """)
+    op.execute("""
+        DELETE FROM visitante v
+        USING visitante o
+        WHERE v.dni = o.dni AND v.id > o.id
+    """)
+
+    # Eliminar inscripciones repetidas (mismo horario y visitante) devolviendo su cupo
+    op.execute("""
+        WITH borradas AS (
+            DELETE FROM inscripcion i
+            USING inscripcion o
+            WHERE i.id_horario = o.id_horario
+              AND i.id_visitante = o.id_visitante
+              AND i.id > o.id
+            RETURNING i.id_horario
+        )
+        UPDATE horario h
+        SET cupo_ocupado = GREATEST(h.cupo_ocupado - b.cantidad, 0)
+        FROM (SELECT id_horario, COUNT(*) AS cantidad FROM borradas GROUP BY id_horario) b
+        WHERE h.id = b.id_horario
+    """)
+
+    op.create_index(op.f('ix_visitante_dni'), 'visitante', ['dni'], unique=True)
+    op.create_unique_constraint('uq_inscripcion_horario_visitante', 'inscripcion', ['id_horario', 'id_visitante'])
+
+
+def downgrade() -> None:
+    # Los registros unificados en el upgrade no se recuperan
+    op.drop_constraint('uq_inscripcion_horario_visitante', 'inscripcion', type_='unique')
+    op.drop_index(op.f('ix_visitante_dni'), table_name='visitante')
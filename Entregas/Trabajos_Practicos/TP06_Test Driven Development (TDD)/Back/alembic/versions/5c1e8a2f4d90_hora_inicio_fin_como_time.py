@@ -0,0 +1,45 @@
+"""hora_inicio_fin_como_time
+
+Revision ID: 5c1e8a2f4d90
+Revises: 3b9d2c7e1a54
+Create Date: 2026-10-18 15:42:08.117930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c1e8a2f4d90'
+down_revision: Union[str, None] = '3b9d2c7e1a54'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Convertir los textos 'HH:MM' a time (los vacíos quedan en NULL)
+    for columna in ('hora_inicio', 'hora_fin'):
+        op.alter_column(
+            'horario', columna,
+            type_=sa.Time(),
+            existing_type=sa.String(),
+            postgresql_using=f"NULLIF(TRIM({columna}), '')::time"
+        )
+
+    # Búsqueda por estado o actividad dentro de una franja horaria
+    op.create_index('ix_horario_estado_hora_inicio', 'horario', ['estado', 'hora_inicio'])
+    op.create_index('ix_horario_actividad_hora_inicio', 'horario', ['id_actividad', 'hora_inicio'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_horario_actividad_hora_inicio', table_name='horario')
+    op.drop_index('ix_horario_estado_hora_inicio', table_name='horario')
+    for columna in ('hora_inicio', 'hora_fin'):
+        op.alter_column(
+            'horario', columna,
+            type_=sa.String(),
+            existing_type=sa.Time(),
+            postgresql_using=f"to_char({columna}, 'HH24:MI')"
+        )
@@ -0,0 +1,48 @@
+"""add_reserva_temporal
+
+Revision ID: 7f2a9c4e1d83
+Revises: d27b5e9c8f31
+Create Date: 2026-10-18 18:47:09.114382
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7f2a9c4e1d83'
+down_revision: Union[str, None] = 'd27b5e9c8f31'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'reserva_temporal',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('token', sa.String(), nullable=False),
+        sa.Column('id_horario', sa.Integer(), nullable=False),
+        sa.Column('cantidad', sa.Integer(), nullable=False),
+        sa.Column('vence_en', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('creado_en', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['id_horario'], ['horario.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('token')
+    )
+    op.create_index(op.f('ix_reserva_temporal_id'), 'reserva_temporal', ['id'], unique=False)
+    op.create_index('ix_reserva_temporal_vence_en', 'reserva_temporal', ['vence_en'], unique=False)
+
+
+def downgrade() -> None:
+    # Los lugares de las reservas vigentes vuelven al cupo
+    op.execute("""
+        UPDATE horario h
+        SET cupo_ocupado = GREATEST(h.cupo_ocupado - r.cantidad, 0)
+        FROM (SELECT id_horario, SUM(cantidad) AS cantidad FROM reserva_temporal GROUP BY id_horario) r
+        WHERE h.id = r.id_horario
+    """)
+    op.drop_index('ix_reserva_temporal_vence_en', table_name='reserva_temporal')
+    op.drop_index(op.f('ix_reserva_temporal_id'), table_name='reserva_temporal')
+    op.drop_table('reserva_temporal')
@@ -0,0 +1,90 @@
+"""add_disponibilidad_actividad
+
+Revision ID: 9a4f6b3c2e17
+Revises: 5c1e8a2f4d90
+Create Date: 2026-10-18 16:20:44.503211
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a4f6b3c2e17'
+down_revision: Union[str, None] = '5c1e8a2f4d90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'disponibilidad_actividad',
+        sa.Column('id_actividad', sa.Integer(), sa.ForeignKey('actividad.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('ranura', sa.Integer(), primary_key=True, autoincrement=False, server_default='0'),
+        sa.Column('horarios_abiertos', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('cupo_total', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('cupo_ocupado', sa.Integer(), nullable=False, server_default='0'),
+    )
+
+    # Cada conexión suma en su ranura (mod(pg_backend_pid(), 16)); los totales se leen sumando las ranuras
+    op.execute("""
+        CREATE OR REPLACE FUNCTION actualizar_disponibilidad_actividad() RETURNS trigger AS $$
+        DECLARE
+            cambios text;
+        BEGIN
+            cambios := CASE TG_OP
+                WHEN 'INSERT' THEN 'SELECT *, 1 AS signo FROM nuevas'
+                WHEN 'DELETE' THEN 'SELECT *, -1 AS signo FROM viejas'
+                ELSE 'SELECT *, 1 AS signo FROM nuevas UNION ALL SELECT *, -1 AS signo FROM viejas'
+            END;
+            EXECUTE
+                'INSERT INTO disponibilidad_actividad AS d (id_actividad, ranura, horarios_abiertos, cupo_total, cupo_ocupado)
+                 SELECT id_actividad, mod(pg_backend_pid(), 16), sum(signo),
+                        sum(signo * COALESCE(cupo_total, 0)), sum(signo * COALESCE(cupo_ocupado, 0))
+                 FROM (' || cambios || ') AS c
+                 WHERE estado = ''activo'' AND id_actividad IS NOT NULL
+                 GROUP BY id_actividad
+                 HAVING sum(signo) <> 0 OR sum(signo * COALESCE(cupo_total, 0)) <> 0
+                     OR sum(signo * COALESCE(cupo_ocupado, 0)) <> 0
+                 ORDER BY id_actividad
+                 ON CONFLICT (id_actividad, ranura) DO UPDATE
+                 SET horarios_abiertos = d.horarios_abiertos + EXCLUDED.horarios_abiertos,
+                     cupo_total = d.cupo_total + EXCLUDED.cupo_total,
+                     cupo_ocupado = d.cupo_ocupado + EXCLUDED.cupo_ocupado';
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER trg_horario_disponibilidad_insert
+        AFTER INSERT ON horario REFERENCING NEW TABLE AS nuevas
+        FOR EACH STATEMENT EXECUTE FUNCTION actualizar_disponibilidad_actividad()
+    """)
+    op.execute("""
+        CREATE TRIGGER trg_horario_disponibilidad_update
+        AFTER UPDATE ON horario REFERENCING OLD TABLE AS viejas NEW TABLE AS nuevas
+        FOR EACH STATEMENT EXECUTE FUNCTION actualizar_disponibilidad_actividad()
+    """)
+    op.execute("""
+        CREATE TRIGGER trg_horario_disponibilidad_delete
+        AFTER DELETE ON horario REFERENCING OLD TABLE AS viejas
+        FOR EACH STATEMENT EXECUTE FUNCTION actualizar_disponibilidad_actividad()
+    """)
+
+    # Cargar los totales de los horarios que ya existen
+    op.execute("""
+        INSERT INTO disponibilidad_actividad (id_actividad, ranura, horarios_abiertos, cupo_total, cupo_ocupado)
+        SELECT id_actividad, 0, COUNT(*), COALESCE(SUM(cupo_total), 0), COALESCE(SUM(cupo_ocupado), 0)
+        FROM horario
+        WHERE estado = 'activo' AND id_actividad IS NOT NULL
+        GROUP BY id_actividad
+    """)
+
+
+def downgrade() -> None:
+    for operacion in ('insert', 'update', 'delete'):
+        op.execute(f"DROP TRIGGER IF EXISTS trg_horario_disponibilidad_{operacion} ON horario")
+    op.execute("DROP FUNCTION IF EXISTS actualizar_disponibilidad_actividad()")
+    op.drop_table('disponibilidad_actividad')
@@ -0,0 +1,71 @@
+"""add_version_catalogo
+
+Revision ID: b5d8e3f1a270
+Revises: 7f2a9c4e1d83
+Create Date: 2026-10-18 21:05:37.620418
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5d8e3f1a270'
+down_revision: Union[str, None] = '7f2a9c4e1d83'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'version_catalogo',
+        sa.Column('ranura', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('horarios', sa.BigInteger(), server_default='0', nullable=False),
+        sa.Column('actividades', sa.BigInteger(), server_default='0', nullable=False),
+        sa.Column('estados_horario', sa.BigInteger(), server_default='0', nullable=False),
+        sa.PrimaryKeyConstraint('ranura')
+    )
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION incrementar_version_catalogo() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO version_catalogo AS v (ranura, horarios, actividades, estados_horario)
+            VALUES (mod(pg_backend_pid(), 16),
+                    ('horarios' = ANY(TG_ARGV))::int,
+                    ('actividades' = ANY(TG_ARGV))::int,
+                    ('estados-horario' = ANY(TG_ARGV))::int)
+            ON CONFLICT (ranura) DO UPDATE
+            SET horarios = v.horarios + EXCLUDED.horarios,
+                actividades = v.actividades + EXCLUDED.actividades,
+                estados_horario = v.estados_horario + EXCLUDED.estados_horario;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    for tabla, recursos in (
+        ('horario', "'horarios'"),
+        ('actividad', "'actividades', 'horarios'"),
+        ('estado_horario', "'estados-horario', 'horarios'"),
+    ):
+        op.execute(f"""
+            CREATE TRIGGER trg_{tabla}_version_catalogo
+            AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {tabla}
+            FOR EACH STATEMENT EXECUTE FUNCTION incrementar_version_catalogo({recursos})
+        """)
+
+    # Arrancar en la hora actual en milisegundos: una base recreada no repite ETags ya entregados
+    op.execute("""
+        INSERT INTO version_catalogo (ranura, horarios, actividades, estados_horario)
+        SELECT 0, inicio, inicio, inicio
+        FROM (SELECT (extract(epoch FROM clock_timestamp()) * 1000)::bigint AS inicio) AS s
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS trg_estado_horario_version_catalogo ON estado_horario")
+    op.execute("DROP TRIGGER IF EXISTS trg_actividad_version_catalogo ON actividad")
+    op.execute("DROP TRIGGER IF EXISTS trg_horario_version_catalogo ON horario")
+    op.execute("DROP FUNCTION IF EXISTS incrementar_version_catalogo()")
+    op.drop_table('version_catalogo')
@@ -0,0 +1,46 @@
+"""add_notificar_cupo_horario
+
+Revision ID: c3e7a9d2f458
+Revises: b5d8e3f1a270
+Create Date: 2026-10-18 22:14:51.308716
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3e7a9d2f458'
+down_revision: Union[str, None] = 'b5d8e3f1a270'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE OR REPLACE FUNCTION notificar_cupo_horario() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'UPDATE' AND OLD.cupo_ocupado IS NOT DISTINCT FROM NEW.cupo_ocupado
+               AND OLD.estado IS NOT DISTINCT FROM NEW.estado THEN
+                RETURN NULL;
+            END IF;
+            PERFORM pg_notify(
+                'cupos_' || TG_TABLE_SCHEMA,
+                json_build_object('id', NEW.id, 'cupo_ocupado', NEW.cupo_ocupado, 'estado', NEW.estado)::text
+            );
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER trg_horario_notificar_cupo
+        AFTER INSERT OR UPDATE OF cupo_ocupado, estado ON horario
+        FOR EACH ROW EXECUTE FUNCTION notificar_cupo_horario()
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS trg_horario_notificar_cupo ON horario")
+    op.execute("DROP FUNCTION IF EXISTS notificar_cupo_horario()")
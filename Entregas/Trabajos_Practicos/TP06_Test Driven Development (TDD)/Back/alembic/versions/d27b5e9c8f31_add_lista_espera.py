@@ -0,0 +1,48 @@
+"""add_lista_espera
+
+Revision ID: d27b5e9c8f31
+Revises: 9a4f6b3c2e17
+Create Date: 2026-10-18 17:05:31.902644
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd27b5e9c8f31'
+down_revision: Union[str, None] = '9a4f6b3c2e17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'lista_espera',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('id_horario', sa.Integer(), nullable=False),
+        sa.Column('id_visitante', sa.Integer(), nullable=False),
+        sa.Column('acepta_Terminos_Condiciones', sa.Boolean(), nullable=False),
+        sa.Column('estado', sa.String(), server_default='pendiente', nullable=False),
+        sa.Column('motivo', sa.String(), nullable=True),
+        sa.Column('id_inscripcion', sa.Integer(), nullable=True),
+        sa.Column('creado_en', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['id_horario'], ['horario.id'], ),
+        sa.ForeignKeyConstraint(['id_visitante'], ['visitante.id'], ),
+        sa.ForeignKeyConstraint(['id_inscripcion'], ['inscripcion.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_lista_espera_id'), 'lista_espera', ['id'], unique=False)
+    op.create_index('uq_lista_espera_pendiente', 'lista_espera', ['id_horario', 'id_visitante'], unique=True,
+                    postgresql_where=sa.text("estado = 'pendiente'"))
+    op.create_index('ix_lista_espera_pendientes', 'lista_espera', ['id_horario', 'id'],
+                    postgresql_where=sa.text("estado = 'pendiente'"))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_lista_espera_pendientes', table_name='lista_espera')
+    op.drop_index('uq_lista_espera_pendiente', table_name='lista_espera')
+    op.drop_index(op.f('ix_lista_espera_id'), table_name='lista_espera')
+    op.drop_table('lista_espera')
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Benchmark de carga del camino de inscripción y de los listados
+
+Carga un conjunto de datos parecido al del parque (actividades con y sin talle o edad
+mínima, varios horarios por actividad, inscripciones previas) y lanza muchos clientes
+concurrentes contra la app. Por defecto la app corre en este mismo proceso (ASGI, sin
+red: clientes y servidor comparten el event loop) contra la base configurada en
+config_db (variables DB_*); con --url se apunta a un servidor ya levantado que use
+esa misma base.
+
+Escenarios (cada uno con --pedidos pedidos repartidos entre --clientes clientes):
+  individual        POST /inscripciones/ de 1 persona en horarios al azar (sin contención)
+  grupal            POST /inscripciones/ de --grupo personas en horarios al azar
+  contendido        POST /inscripciones/ de 1 persona, todos al mismo horario
+  agotado           idem sobre un horario con 20 lugares: el resto recibe 400
+  horarios          GET /horarios/ (con la cache de HORARIOS_CACHE_TTL)
+  inscripciones     GET /inscripciones/?limit=100 desde un cursor al azar
+  disponibilidad    GET /actividades/disponibilidad
+
+Informa pedidos/s, latencias p50/p95/p99 (ms) y códigos de respuesta por escenario y
+guarda todo en JSON (--salida, por defecto benchmarks/resultados/carga-<commit>.json)
+junto con el commit y los parámetros; --comparar muestra la variación contra un
+resultado anterior. Los datos cargados se borran al terminar.
+
+Uso: python benchmarks/bench_carga.py [--clientes 32] [--pedidos 1000] [--escenarios individual,horarios]
+                                      [--comparar anterior.json] [--url http://localhost:8000]
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+from datetime import datetime, time as hora, timezone
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import httpx
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import Session
+from src.domain.database import engine
+from src.domain.models import Actividad, EstadoHorario, Horario, Inscripcion, Visitante
+
+PREFIJO_ACTIVIDAD = "Benchmark carga"
+DNI_BASE = 910000000  # fuera del rango de DNIs reales (y del de bench_listados)
+DNI_TOPE = DNI_BASE + 10_000_000
+ESCENARIOS = ("individual", "grupal", "contendido", "agotado", "horarios", "inscripciones", "disponibilidad")
+
+def cargar_datos(actividades: int, horarios_por_actividad: int, inscripciones_previas: int) -> dict:
+    """
+    Crea actividades (un tercio pide talle y otro tercio edad mínima), sus horarios con
+    cupo holgado, un horario "caliente" para el escenario contendido, uno de 20 lugares
+    para el agotado e inscripciones previas repartidas para darle volumen a los listados.
+    """
+    with Session(engine) as db:
+        if db.get(EstadoHorario, "activo") is None:
+            db.add(EstadoHorario(nombre="activo", descripcion="Horario activo"))
+        ids_actividades = db.scalars(
+            insert(Actividad).returning(Actividad.id, sort_by_parameter_order=True),
+            [
+                {"nombre": f"{PREFIJO_ACTIVIDAD} {i}", "requiere_talle": i % 3 == 1,
+                 "edad_minima": 12 if i % 3 == 2 else None, "descripcion": "Datos de benchmark"}
+                for i in range(actividades)
+            ]
+        ).all()
+        ids_horarios = db.scalars(
+            insert(Horario).returning(Horario.id, sort_by_parameter_order=True),
+            [
+                {"id_actividad": id_actividad, "hora_inicio": hora(9 + h % 9), "hora_fin": hora(10 + h % 9),
+                 "cupo_total": 100000, "cupo_ocupado": 0, "estado": "activo"}
+                for id_actividad in ids_actividades
+                for h in range(horarios_por_actividad)
+            ]
+        ).all()
+        caliente, agotado = db.scalars(
+            insert(Horario).returning(Horario.id, sort_by_parameter_order=True),
+            [
+                {"id_actividad": ids_actividades[0], "hora_inicio": hora(12), "hora_fin": hora(13),
+                 "cupo_total": 100000, "cupo_ocupado": 0, "estado": "activo"},
+                {"id_actividad": ids_actividades[0], "hora_inicio": hora(13), "hora_fin": hora(14),
+                 "cupo_total": 20, "cupo_ocupado": 0, "estado": "activo"},
+            ]
+        ).all()
+
+        ids_inscripciones = []
+        if inscripciones_previas:
+            ids_visitantes = db.scalars(
+                insert(Visitante).returning(Visitante.id, sort_by_parameter_order=True),
+                [{"nombre": f"Previo {i}", "dni": DNI_BASE + i, "edad": 30, "talle": "M"}
+                 for i in range(inscripciones_previas)]
+            ).all()
+            previas = [
+                {"id_horario": ids_horarios[i % len(ids_horarios)], "id_visitante": id_visitante,
+                 "nro_personas": 1, "acepta_Terminos_Condiciones": True}
+                for i, id_visitante in enumerate(ids_visitantes)
+            ]
+            ids_inscripciones = db.scalars(
+                insert(Inscripcion).returning(Inscripcion.id, sort_by_parameter_order=True), previas
+            ).all()
+            ocupados = Counter(previa["id_horario"] for previa in previas)
+            db.execute(update(Horario), [{"id": i, "cupo_ocupado": c} for i, c in ocupados.items()])
+        db.commit()
+
+    return {
+        "horarios": ids_horarios,
+        "caliente": caliente,
+        "agotado": agotado,
+        "inscripciones": ids_inscripciones,
+        "dnis": itertools.count(DNI_BASE + inscripciones_previas),
+    }
+
+def borrar_datos():
+    """Borra todo lo cargado por el benchmark (incluidas las inscripciones hechas durante la corrida)"""
+    with Session(engine) as db:
+        ids_actividades = select(Actividad.id).where(Actividad.nombre.startswith(PREFIJO_ACTIVIDAD))
+        ids_horarios = select(Horario.id).where(Horario.id_actividad.in_(ids_actividades))
+        db.execute(delete(Inscripcion).where(Inscripcion.id_horario.in_(ids_horarios)))
+        db.execute(delete(Horario).where(Horario.id_actividad.in_(ids_actividades)))
+        db.execute(delete(Actividad).where(Actividad.id.in_(ids_actividades)))
+        db.execute(delete(Visitante).where(Visitante.dni >= DNI_BASE, Visitante.dni < DNI_TOPE))
+        db.commit()
+
+def pedidos_por_escenario(datos: dict, grupo: int) -> dict:
+    """Para cada escenario, una función que hace un pedido con el cliente dado"""
+    def inscribir(id_horario: int, personas: int):
+        def pedido(cliente: httpx.AsyncClient):
+            return cliente.post("/inscripciones/", json={
+                "id_horario": id_horario,
+                "visitantes": [
+                    {"nombre": f"Carga {dni}", "dni": dni, "edad": 30, "talle": "M"}
+                    for dni in itertools.islice(datos["dnis"], personas)
+                ],
+                "acepta_terminos": True
+            })
+        return pedido
+
+    def al_azar(personas: int):
+        def pedido(cliente: httpx.AsyncClient):
+            return inscribir(random.choice(datos["horarios"]), personas)(cliente)
+        return pedido
+
+    def pagina_inscripciones(cliente: httpx.AsyncClient):
+        params = {"limit": 100}
+        if datos["inscripciones"]:
+            params["after"] = random.choice(datos["inscripciones"])
+        return cliente.get("/inscripciones/", params=params)
+
+    return {
+        "individual": al_azar(1),
+        "grupal": al_azar(grupo),
+        "contendido": inscribir(datos["caliente"], 1),
+        "agotado": inscribir(datos["agotado"], 1),
+        "horarios": lambda cliente: cliente.get("/horarios/"),
+        "inscripciones": pagina_inscripciones,
+        "disponibilidad": lambda cliente: cliente.get("/actividades/disponibilidad"),
+    }
+
+def percentil(ordenadas: list, p: float) -> float:
+    """Percentil por rango más cercano sobre latencias ya ordenadas"""
+    if not ordenadas:
+        return 0.0
+    return ordenadas[min(len(ordenadas) - 1, max(0, round(p / 100 * len(ordenadas)) - 1))]
+
+async def correr_escenario(cliente: httpx.AsyncClient, pedido, pedidos: int, clientes: int) -> dict:
+    latencias = []
+    codigos = Counter()
+    restantes = iter(range(pedidos))  # compartido: cada cliente toma el próximo pedido libre
+
+    async def usuario():
+        for _ in restantes:
+            inicio = time.perf_counter()
+            try:
+                respuesta = await pedido(cliente)
+                codigos[str(respuesta.status_code)] += 1
+            except httpx.HTTPError as e:
+                codigos[type(e).__name__] += 1
+            latencias.append(time.perf_counter() - inicio)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(usuario() for _ in range(clientes)))
+    duracion = time.perf_counter() - inicio
+
+    latencias.sort()
+    return {
+        "pedidos": len(latencias),
+        "duracion_s": round(duracion, 3),
+        "pedidos_por_s": round(len(latencias) / duracion, 1),
+        "p50_ms": round(percentil(latencias, 50) * 1000, 2),
+        "p95_ms": round(percentil(latencias, 95) * 1000, 2),
+        "p99_ms": round(percentil(latencias, 99) * 1000, 2),
+        "max_ms": round(latencias[-1] * 1000, 2),
+        "media_ms": round(statistics.fmean(latencias) * 1000, 2),
+        "codigos": dict(codigos),
+    }
+
+def crear_cliente(url: str, clientes: int) -> httpx.AsyncClient:
+    limites = httpx.Limits(max_connections=clientes, max_keepalive_connections=clientes)
+    if url:
+        return httpx.AsyncClient(base_url=url, limits=limites, timeout=60)
+    from src.application.main import app
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", limits=limites, timeout=60)
+
+async def correr(args, datos: dict) -> dict:
+    resultados = {}
+    pedidos = pedidos_por_escenario(datos, args.grupo)
+    async with crear_cliente(args.url, args.clientes) as cliente:
+        for nombre in args.escenarios:
+            if args.calentamiento and nombre not in ("contendido", "agotado"):
+                await correr_escenario(cliente, pedidos[nombre], args.calentamiento, args.clientes)
+            resultados[nombre] = await correr_escenario(cliente, pedidos[nombre], args.pedidos, args.clientes)
+            r = resultados[nombre]
+            print(f"{nombre:<16}{r['pedidos_por_s']:>10.1f}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}"
+                  f"{r['p99_ms']:>10.2f}  {r['codigos']}")
+    return resultados
+
+def commit_actual() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "desconocido"
+
+def comparar(actual: dict, anterior: dict):
+    """Variación de pedidos/s y p95 contra un resultado anterior (+ es más rápido / más lento)"""
+    print(f"\ncomparado con {anterior.get('commit')} ({anterior.get('fecha')}):")
+    print(f"{'escenario':<16}{'pedidos/s':>12}{'p95':>10}")
+    for nombre, r in actual["escenarios"].items():
+        previo = anterior.get("escenarios", {}).get(nombre)
+        if not previo:
+            continue
+        variacion = lambda nuevo, viejo: f"{(nuevo - viejo) / viejo * 100:+.1f}%" if viejo else "-"
+        print(f"{nombre:<16}{variacion(r['pedidos_por_s'], previo['pedidos_por_s']):>12}"
+              f"{variacion(r['p95_ms'], previo['p95_ms']):>10}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clientes", type=int, default=32, help="clientes concurrentes")
+    parser.add_argument("--pedidos", type=int, default=1000, help="pedidos medidos por escenario")
+    parser.add_argument("--calentamiento", type=int, default=50, help="pedidos sin medir antes de cada escenario")
+    parser.add_argument("--grupo", type=int, default=4, help="personas por inscripción grupal")
+    parser.add_argument("--actividades", type=int, default=30)
+    parser.add_argument("--horarios-por-actividad", type=int, default=8)
+    parser.add_argument("--inscripciones-previas", type=int, default=20000)
+    parser.add_argument("--escenarios", default=",".join(ESCENARIOS),
+                        type=lambda valor: [e for e in valor.split(",") if e])
+    parser.add_argument("--url", default="", help="servidor ya levantado; vacío = app en este proceso")
+    parser.add_argument("--salida", default=None)
+    parser.add_argument("--comparar", default=None, help="JSON de una corrida anterior")
+    parser.add_argument("--semilla", type=int, default=1)
+    args = parser.parse_args()
+    desconocidos = set(args.escenarios) - set(ESCENARIOS)
+    if desconocidos:
+        parser.error(f"escenarios desconocidos: {', '.join(sorted(desconocidos))}")
+
+    random.seed(args.semilla)
+    commit = commit_actual()
+    borrar_datos()  # restos de una corrida interrumpida
+    datos = cargar_datos(args.actividades, args.horarios_por_actividad, args.inscripciones_previas)
+    try:
+        print(f"{'escenario':<16}{'pedidos/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}  códigos")
+        escenarios = asyncio.run(correr(args, datos))
+    finally:
+        borrar_datos()
+
+    resultado = {
+        "commit": commit,
+        "fecha": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "parametros": {
+            clave: valor for clave, valor in vars(args).items() if clave not in ("salida", "comparar")
+        },
+        "escenarios": escenarios,
+    }
+    salida = args.salida or os.path.join(os.path.dirname(__file__), "resultados", f"carga-{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(salida)), exist_ok=True)
+    with open(salida, "w", encoding="utf-8") as archivo:
+        json.dump(resultado, archivo, indent=2, ensure_ascii=False)
+    print(f"\nresultados en {salida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as archivo:
+            comparar(resultado, json.load(archivo))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Benchmark del listado de inscripciones: proyección de columnas vs. hidratación ORM
+
+Carga N inscripciones dentro de una transacción que se revierte al final (la base
+queda como estaba) y mide, para cada implementación, tiempo de CPU por fila y pico
+de memoria de Python. La versión "orm" es la implementación anterior de
+get_all_inscripciones / get_all_inscripciones_con_visitantes.
+
+Uso: python benchmarks/bench_listados.py [--filas 10000] [--repeticiones 5]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session, joinedload
+from src.domain.database import engine
+from src.domain.models import Actividad, EstadoHorario, Horario, Inscripcion, Visitante
+from src.domain.schemas import InscripcionConVisitantes, VisitanteInfo
+from src.domain.services.inscripcion_service import InscripcionConActividad, InscripcionService
+
+DNI_BASE = 900000000  # fuera del rango de DNIs reales para no chocar con datos existentes
+
+def cargar_datos(db: Session, filas: int):
+    """Un horario por cada 100 inscripciones y un visitante por inscripción"""
+    if db.get(EstadoHorario, "activo") is None:
+        db.add(EstadoHorario(nombre="activo", descripcion="Horario activo"))
+    actividad = Actividad(nombre="Benchmark", requiere_talle=False, edad_minima=None, descripcion="Datos de benchmark")
+    db.add(actividad)
+    db.flush()
+
+    ids_horarios = db.scalars(
+        insert(Horario).returning(Horario.id),
+        [
+            {"id_actividad": actividad.id, "hora_inicio": "10:00", "hora_fin": "11:00",
+             "cupo_total": 100, "cupo_ocupado": 100, "estado": "activo"}
+            for _ in range((filas + 99) // 100)
+        ]
+    ).all()
+    ids_visitantes = db.scalars(
+        insert(Visitante).returning(Visitante.id, sort_by_parameter_order=True),
+        [{"nombre": f"Visitante {i}", "dni": DNI_BASE + i, "edad": 30, "talle": "M"} for i in range(filas)]
+    ).all()
+    db.execute(
+        insert(Inscripcion),
+        [
+            {"id_horario": ids_horarios[i // 100], "id_visitante": ids_visitantes[i],
+             "nro_personas": 1, "acepta_Terminos_Condiciones": True}
+            for i in range(filas)
+        ]
+    )
+    db.flush()
+
+def orm_con_actividad(db: Session):
+    """Implementación anterior: doble join + joinedload y copia campo a campo"""
+    inscripciones = (
+        db.query(Inscripcion)
+        .join(Horario, Inscripcion.id_horario == Horario.id)
+        .join(Actividad, Horario.id_actividad == Actividad.id)
+        .options(joinedload(Inscripcion.horario).joinedload(Horario.actividad))
+        .order_by(Inscripcion.id)
+        .all()
+    )
+    return [
+        InscripcionConActividad(
+            id=i.id,
+            id_horario=i.id_horario,
+            id_visitante=i.id_visitante,
+            nro_personas=i.nro_personas,
+            acepta_Terminos_Condiciones=i.acepta_Terminos_Condiciones,
+            nombre_actividad=i.horario.actividad.nombre
+        )
+        for i in inscripciones
+    ]
+
+def orm_con_visitantes(db: Session):
+    inscripciones = (
+        db.query(Inscripcion)
+        .join(Horario, Inscripcion.id_horario == Horario.id)
+        .join(Actividad, Horario.id_actividad == Actividad.id)
+        .join(Visitante, Inscripcion.id_visitante == Visitante.id)
+        .options(
+            joinedload(Inscripcion.horario).joinedload(Horario.actividad),
+            joinedload(Inscripcion.visitante)
+        )
+        .order_by(Inscripcion.id)
+        .all()
+    )
+    return [
+        InscripcionConVisitantes(
+            id=i.id,
+            id_horario=i.id_horario,
+            nro_personas=i.nro_personas,
+            acepta_Terminos_Condiciones=i.acepta_Terminos_Condiciones,
+            nombre_actividad=i.horario.actividad.nombre,
+            visitante=VisitanteInfo(
+                id=i.visitante.id,
+                nombre=i.visitante.nombre,
+                dni=i.visitante.dni,
+                edad=i.visitante.edad,
+                talle=i.visitante.talle
+            )
+        )
+        for i in inscripciones
+    ]
+
+def medir(db: Session, funcion, repeticiones: int):
+    """
+    Mejor tiempo de CPU (s) entre las repeticiones y pico de memoria (bytes) de una
+    corrida aparte: tracemalloc encarece cada asignación y distorsionaría el tiempo.
+    """
+    mejor_cpu = float("inf")
+    for _ in range(repeticiones):
+        # Sesión limpia: ninguna versión debe aprovechar objetos ya cargados
+        db.expunge_all()
+        inicio = time.process_time()
+        filas = len(funcion(db))
+        mejor_cpu = min(mejor_cpu, time.process_time() - inicio)
+
+    db.expunge_all()
+    tracemalloc.start()
+    funcion(db)
+    pico = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return filas, mejor_cpu, pico
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, default=10000)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    with engine.connect() as conn:
+        transaccion = conn.begin()
+        db = Session(bind=conn, join_transaction_mode="create_savepoint")
+        try:
+            cargar_datos(db, args.filas)
+            servicio = InscripcionService(db)
+            casos = [
+                ("con-actividad", "orm", orm_con_actividad),
+                ("con-actividad", "columnas", lambda db: servicio.get_all_inscripciones()),
+                ("con-visitantes", "orm", orm_con_visitantes),
+                ("con-visitantes", "columnas", lambda db: servicio.get_all_inscripciones_con_visitantes()),
+            ]
+            print(f"{'listado':<16}{'versión':<10}{'filas':>8}{'CPU total ms':>14}{'µs/fila':>10}{'pico MiB':>10}")
+            for listado, version, funcion in casos:
+                filas, cpu, pico = medir(db, funcion, args.repeticiones)
+                print(f"{listado:<16}{version:<10}{filas:>8}{cpu * 1000:>14.1f}{cpu * 1e6 / max(filas, 1):>10.1f}{pico / 2**20:>10.1f}")
+        finally:
+            db.close()
+            transaccion.rollback()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark de las búsquedas frecuentes de la inscripción: Query armada en cada
+llamada vs. sentencias select() armadas una sola vez
+
+Carga un horario y visitantes dentro de una transacción que se revierte al final (la
+base queda como estaba) y mide:
+  búsquedas   tiempo de CPU por llamada de cada búsqueda, en su versión "query" (la
+              implementación anterior, db.query(...) armada en cada llamada) y "select"
+              (las sentencias de inscripcion_service, que sólo ligan parámetros)
+  pedidos     pedidos/s y CPU por pedido de POST /inscripciones/ (grupo de --grupo
+              personas nuevas) en serie, con la app en este proceso
+
+--solo-pedidos mide sólo el camino completo (sirve también sobre un commit anterior,
+para comparar antes y después).
+
+Uso: python benchmarks/bench_sentencias.py [--llamadas 2000] [--pedidos 500] [--grupo 3]
+"""
+import argparse
+import os
+import sys
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+os.environ.setdefault("LISTA_ESPERA_INTERVALO", "0")
+os.environ.setdefault("RESERVAS_INTERVALO", "0")
+os.environ.setdefault("ARRANQUE_PRECALENTAR", "false")
+
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session, joinedload
+from src.application.main import app
+from src.domain.database import engine, get_db
+from src.domain.models import Actividad, EstadoHorario, Horario, Inscripcion, Visitante
+
+DNI_BASE = 920000000  # fuera del rango de DNIs reales para no chocar con datos existentes
+
+def cargar_datos(db: Session, visitantes: int):
+    if db.get(EstadoHorario, "activo") is None:
+        db.add(EstadoHorario(nombre="activo", descripcion="Horario activo"))
+    actividad = Actividad(nombre="Benchmark sentencias", requiere_talle=False, edad_minima=None, descripcion="Datos de benchmark")
+    db.add(actividad)
+    db.flush()
+    horario = Horario(id_actividad=actividad.id, hora_inicio="10:00", hora_fin="11:00",
+                      cupo_total=10**6, cupo_ocupado=0, estado="activo")
+    db.add(horario)
+    db.add_all(Visitante(nombre=f"Visitante {i}", dni=DNI_BASE + i, edad=30, talle="M") for i in range(visitantes))
+    db.flush()
+    return horario.id
+
+# Implementación anterior de cada búsqueda
+def horario_query(db: Session, id_horario: int):
+    return db.query(Horario).options(joinedload(Horario.actividad)).filter(Horario.id == id_horario).first()
+
+def visitantes_query(db: Session, dnis):
+    return db.query(Visitante).filter(Visitante.dni.in_(dnis)).all()
+
+def visitante_query(db: Session, id_visitante: int):
+    return db.query(Visitante).filter(Visitante.id == id_visitante).first()
+
+def inscripciones_query(db: Session, ids):
+    return (
+        db.query(Inscripcion)
+        .options(joinedload(Inscripcion.horario).joinedload(Horario.actividad))
+        .filter(Inscripcion.id.in_(ids))
+        .order_by(Inscripcion.id)
+        .all()
+    )
+
+def medir_busquedas(db: Session, id_horario: int, llamadas: int):
+    from src.domain.services.inscripcion_service import (
+        buscar_horario_con_actividad, buscar_inscripciones_con_horario, buscar_visitante, buscar_visitantes_por_dni
+    )
+    dnis = [DNI_BASE + i for i in range(3)]
+    id_visitante = db.query(Visitante.id).filter(Visitante.dni == DNI_BASE).scalar()
+    inscripcion = Inscripcion(id_horario=id_horario, id_visitante=id_visitante, nro_personas=1, acepta_Terminos_Condiciones=True)
+    db.add(inscripcion)
+    db.flush()
+    ids = [inscripcion.id]
+
+    casos = [
+        ("horario", "query", lambda: horario_query(db, id_horario)),
+        ("horario", "select", lambda: buscar_horario_con_actividad(db, id_horario)),
+        ("visitantes-dni", "query", lambda: visitantes_query(db, dnis)),
+        ("visitantes-dni", "select", lambda: buscar_visitantes_por_dni(db, dnis)),
+        ("visitante-id", "query", lambda: visitante_query(db, id_visitante)),
+        ("visitante-id", "select", lambda: buscar_visitante(db, id_visitante)),
+        ("inscripciones", "query", lambda: inscripciones_query(db, ids)),
+        ("inscripciones", "select", lambda: buscar_inscripciones_con_horario(db, ids)),
+    ]
+    print(f"{'búsqueda':<16}{'versión':<8}{'µs CPU/llamada':>16}{'µs/llamada':>12}")
+    for busqueda, version, funcion in casos:
+        for _ in range(50):
+            funcion()
+        db.expunge_all()
+        inicio_cpu, inicio = time.process_time(), time.perf_counter()
+        for _ in range(llamadas):
+            funcion()
+        cpu, total = time.process_time() - inicio_cpu, time.perf_counter() - inicio
+        print(f"{busqueda:<16}{version:<8}{cpu * 1e6 / llamadas:>16.1f}{total * 1e6 / llamadas:>12.1f}")
+
+def medir_pedidos(conexion, id_horario: int, pedidos: int, grupo: int):
+    """POST /inscripciones/ en serie; cada pedido usa una sesión sobre la transacción del benchmark"""
+    def override_get_db():
+        db = Session(bind=conexion, autoflush=False, join_transaction_mode="create_savepoint")
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    dni = DNI_BASE + 10**6
+    try:
+        with TestClient(app) as cliente:
+            def pedido():
+                nonlocal dni
+                visitantes = [{"nombre": "Benchmark", "dni": dni + i, "edad": 30} for i in range(grupo)]
+                dni += grupo
+                respuesta = cliente.post("/inscripciones/", json={
+                    "id_horario": id_horario, "visitantes": visitantes, "acepta_terminos": True
+                })
+                assert respuesta.status_code == 200, respuesta.text
+
+            for _ in range(50):
+                pedido()
+            inicio_cpu, inicio = time.process_time(), time.perf_counter()
+            for _ in range(pedidos):
+                pedido()
+            cpu, total = time.process_time() - inicio_cpu, time.perf_counter() - inicio
+    finally:
+        app.dependency_overrides.clear()
+    print(f"POST /inscripciones/ (grupo de {grupo}): {pedidos / total:.1f} pedidos/s, {cpu * 1000 / pedidos:.2f} ms CPU/pedido")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--llamadas", type=int, default=2000, help="llamadas medidas por búsqueda")
+    parser.add_argument("--pedidos", type=int, default=500, help="pedidos medidos de POST /inscripciones/")
+    parser.add_argument("--grupo", type=int, default=3, help="personas por inscripción")
+    parser.add_argument("--solo-pedidos", action="store_true")
+    args = parser.parse_args()
+
+    with engine.connect() as conexion:
+        transaccion = conexion.begin()
+        db = Session(bind=conexion, join_transaction_mode="create_savepoint")
+        try:
+            id_horario = cargar_datos(db, 10)
+            # commit: libera el SAVEPOINT, los datos quedan en la transacción del benchmark
+            db.commit()
+            if not args.solo_pedidos:
+                medir_busquedas(db, id_horario, args.llamadas)
+            db.close()
+            medir_pedidos(conexion, id_horario, args.pedidos, args.grupo)
+        finally:
+            db.close()
+            transaccion.rollback()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark de serialización de listados: camino de FastAPI con response_model vs. RespuestaLista
+
+"antes": los modelos se construyen validando y FastAPI los vuelve a validar contra
+response_model, los pasa a dicts y los codifica con json.dumps (JSONResponse).
+"después": los modelos se validan una sola vez, como en los servicios (TypeAdapter sobre
+las tuplas o constructor tipado), y se codifican con el TypeAdapter de RespuestaLista.
+
+No usa la base: las filas son sintéticas, con los tipos que devuelve la consulta.
+
+Uso: python benchmarks/bench_serializacion.py [--filas 10000] [--repeticiones 5]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from collections import namedtuple
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from typing import List
+from pydantic import TypeAdapter
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from src.domain.schemas import InscripcionConVisitantes, VisitanteInfo
+from src.domain.services.horario_service import ActividadDeHorario, EstadoDeHorario, HorarioConDetalles
+from src.domain.services.inscripcion_service import InscripcionConActividad
+from src.infrastructure.serializacion import RespuestaLista
+
+def filas_inscripciones(filas: int):
+    """Tuplas con nombre, como las filas (Row) de una consulta por columnas"""
+    Fila = namedtuple("Fila", [
+        "id", "id_horario", "id_visitante", "nro_personas", "acepta_Terminos_Condiciones",
+        "nombre_actividad", "nombre", "dni", "edad", "talle"
+    ])
+    return [
+        Fila(**{"id": i, "id_horario": i // 100, "id_visitante": i, "nro_personas": 1,
+         "acepta_Terminos_Condiciones": True, "nombre_actividad": "Tirolesa",
+         "nombre": f"Visitante {i}", "dni": 30000000 + i, "edad": 30, "talle": "M"})
+        for i in range(filas)
+    ]
+
+def con_actividad(fila):
+    return InscripcionConActividad(
+        id=fila.id, id_horario=fila.id_horario, id_visitante=fila.id_visitante,
+        nro_personas=fila.nro_personas, acepta_Terminos_Condiciones=fila.acepta_Terminos_Condiciones,
+        nombre_actividad=fila.nombre_actividad
+    )
+
+def con_visitantes(fila):
+    return InscripcionConVisitantes(
+        id=fila.id, id_horario=fila.id_horario, nro_personas=fila.nro_personas,
+        acepta_Terminos_Condiciones=fila.acepta_Terminos_Condiciones, nombre_actividad=fila.nombre_actividad,
+        visitante=VisitanteInfo(id=fila.id_visitante, nombre=fila.nombre, dni=fila.dni, edad=fila.edad, talle=fila.talle)
+    )
+
+def horario(fila):
+    return HorarioConDetalles(
+        id=fila.id, id_actividad=1, hora_inicio="10:00", hora_fin="11:00", cupo_total=20,
+        cupo_ocupado=fila.id % 20, estado="activo",
+        actividad=ActividadDeHorario(id=1, nombre="Tirolesa", requiere_talle=True, edad=12, descripcion="Aventura"),
+        estado_horario=EstadoDeHorario(nombre="activo", descripcion="Horario activo")
+    )
+
+def antes(modelo, armar, filas):
+    campo = create_response_field(name="respuesta", type_=List[modelo])
+    items = [armar(fila) for fila in filas]
+    contenido = asyncio.run(serialize_response(field=campo, response_content=items))
+    return JSONResponse(contenido).body
+
+def despues(modelo, armar, filas, respuesta: RespuestaLista, filas_a_modelos=None):
+    if filas_a_modelos is not None:
+        items = filas_a_modelos.validate_python(filas, from_attributes=True)
+    else:
+        items = [armar(fila) for fila in filas]
+    return respuesta.json(items)
+
+def medir(funcion, repeticiones: int, *args):
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        cuerpo = funcion(*args)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor, len(cuerpo)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, default=10000)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    filas = filas_inscripciones(args.filas)
+    casos = [
+        # get_all_inscripciones valida las tuplas de una sola vez con un TypeAdapter
+        ("inscripciones", InscripcionConActividad, con_actividad, TypeAdapter(List[InscripcionConActividad])),
+        ("con-visitantes", InscripcionConVisitantes, con_visitantes, None),
+        ("horarios", HorarioConDetalles, horario, None),
+    ]
+    print(f"{'listado':<16}{'antes ms':>10}{'después ms':>12}{'mejora':>8}{'bytes':>10}")
+    for nombre, modelo, armar, filas_a_modelos in casos:
+        t_antes, _ = medir(antes, args.repeticiones, modelo, armar, filas)
+        t_despues, tamano = medir(despues, args.repeticiones, modelo, armar, filas, RespuestaLista(modelo), filas_a_modelos)
+        print(f"{nombre:<16}{t_antes * 1000:>10.1f}{t_despues * 1000:>12.1f}{t_antes / t_despues:>7.1f}x{tamano:>10}")
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,65 @@
-import os
-# config.py
-
-# Constantes de configuración para la base de datos
-
-USUARIO_DB = os.getenv("DB_USER", "postgres")
-CONTRASENA_DB = os.getenv("DB_PASSWORD", "admin")
-URL_DB = os.getenv("DB_HOST", "localhost")
-PUERTO_DB = os.getenv("DB_PORT", "5432")
-DATABASE_NAME = os.getenv("DB_NAME", "parque_db")
\ No newline at end of file
+import os
+# config.py
+
+# Constantes de configuración para la base de datos
+
+USUARIO_DB = os.getenv("DB_USER", "postgres")
+CONTRASENA_DB = os.getenv("DB_PASSWORD", "admin")
+URL_DB = os.getenv("DB_HOST", "localhost")
+PUERTO_DB = os.getenv("DB_PORT", "5432")
+DATABASE_NAME = os.getenv("DB_NAME", "parque_db")
+# Esquema de Postgres donde viven las tablas (search_path); vacío = el del usuario (public).
+# Los tests usan uno por worker para poder correr en paralelo.
+ESQUEMA_DB = os.getenv("DB_SCHEMA", "")
+
+# Usar el motor async (asyncpg + AsyncSession) en lugar de psycopg2 + threadpool
+USAR_DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() in ("1", "true", "si")
+
+# Pool de conexiones (valores por proceso/worker de uvicorn)
+POOL_SIZE_DB = int(os.getenv("DB_POOL_SIZE", "5"))
+MAX_OVERFLOW_DB = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+POOL_TIMEOUT_DB = float(os.getenv("DB_POOL_TIMEOUT", "30"))  # segundos esperando una conexión libre
+POOL_RECYCLE_DB = int(os.getenv("DB_POOL_RECYCLE", "-1"))  # segundos de vida de una conexión, -1 = sin límite
+# true: verificar cada conexión con un ping al sacarla del pool (un round trip extra por checkout)
+# false: estrategia optimista, la conexión caída se descarta al fallar y se renueva con DB_POOL_RECYCLE
+PRE_PING_DB = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "si")
+
+# Sentencias compiladas que SQLAlchemy guarda por motor (cache de compilación)
+CACHE_COMPILACION_DB = int(os.getenv("DB_CACHE_COMPILACION", "500"))
+# Sentencias preparadas en el servidor por conexión (sólo asyncpg; psycopg2 no prepara del lado del servidor)
+SENTENCIAS_PREPARADAS_DB = int(os.getenv("DB_SENTENCIAS_PREPARADAS", "100"))
+
+# Cache en memoria de GET /horarios (por proceso/worker)
+TTL_CACHE_HORARIOS = float(os.getenv("HORARIOS_CACHE_TTL", "5"))  # segundos; 0 desactiva la cache
+MAX_CACHE_HORARIOS = int(os.getenv("HORARIOS_CACHE_MAX", "32"))  # cantidad máxima de respuestas guardadas
+TTL_CACHE_ESTADOS = float(os.getenv("ESTADOS_CACHE_TTL", "60"))  # segundos que se reutiliza la lista de estados de horario; 0 la desactiva
+
+# Cupos en vivo (SSE/WebSocket): cada worker escucha los pg_notify del trigger de horario
+ESCUCHA_CUPOS = os.getenv("CUPOS_ESCUCHA", "true").lower() in ("1", "true", "si")  # false: no se emiten deltas
+REINTENTO_ESCUCHA_CUPOS = float(os.getenv("CUPOS_ESCUCHA_REINTENTO", "2"))  # segundos entre intentos de reconectar la escucha
+
+# Promoción de la lista de espera (por proceso/worker)
+INTERVALO_LISTA_ESPERA = float(os.getenv("LISTA_ESPERA_INTERVALO", "5"))  # segundos entre pasadas; 0 desactiva el promotor
+LOTE_LISTA_ESPERA = int(os.getenv("LISTA_ESPERA_LOTE", "100"))  # entradas que toma cada pasada
+
+# Reservas temporales de cupo durante la confirmación (por proceso/worker)
+TTL_RESERVA = int(os.getenv("RESERVA_TTL", "300"))  # segundos que dura una reserva
+INTERVALO_RESERVAS = float(os.getenv("RESERVAS_INTERVALO", "10"))  # segundos entre pasadas del liberador; 0 lo desactiva
+LOTE_RESERVAS = int(os.getenv("RESERVAS_LOTE", "500"))  # reservas vencidas que libera cada pasada
+
+# Sentencias SQL por pedido HTTP (por proceso/worker)
+CONSULTAS_EN_HEADERS = os.getenv("DB_CONSULTAS_HEADERS", "false").lower() in ("1", "true", "si")  # X-DB-Consultas y Server-Timing
+UMBRAL_CONSULTAS_REPETIDAS = int(os.getenv("DB_CONSULTAS_REPETIDAS", "5"))  # misma sentencia N veces en un pedido = posible N+1; 0 no avisa
+
+# Registro de sentencias lentas con su plan (por proceso/worker)
+UMBRAL_CONSULTAS_LENTAS_MS = float(os.getenv("DB_CONSULTAS_LENTAS_MS", "0"))  # milisegundos; 0 desactiva el registro
+ARCHIVO_CONSULTAS_LENTAS = os.getenv("DB_CONSULTAS_LENTAS_ARCHIVO", "consultas_lentas.log")  # una línea JSON por sentencia lenta
+MAX_BYTES_CONSULTAS_LENTAS = int(os.getenv("DB_CONSULTAS_LENTAS_MAX_BYTES", str(10 * 1024 * 1024)))  # tamaño antes de rotar el archivo
+COPIAS_CONSULTAS_LENTAS = int(os.getenv("DB_CONSULTAS_LENTAS_COPIAS", "3"))  # archivos rotados que se conservan
+TIMEOUT_EXPLAIN_CONSULTAS_LENTAS = int(os.getenv("DB_CONSULTAS_LENTAS_TIMEOUT", "5"))  # segundos máximos para conectar y obtener cada plan
+
+# Arranque y chequeos de salud (por proceso/worker)
+PRECALENTAR_AL_INICIAR = os.getenv("ARRANQUE_PRECALENTAR", "true").lower() in ("1", "true", "si")  # abrir el pool y compilar consultas al arrancar (/readyz da 503 hasta terminar)
+TIMEOUT_PRECALENTAR = float(os.getenv("ARRANQUE_TIMEOUT", "30"))  # segundos máximos de cada paso del precalentamiento
+TTL_CHEQUEO_DB = float(os.getenv("SALUD_DB_TTL", "2"))  # segundos que se reutiliza el resultado del chequeo de la base en /readyz
+TIMEOUT_CHEQUEO_DB = int(os.getenv("SALUD_DB_TIMEOUT", "2"))  # segundos máximos para conectar y responder el chequeo
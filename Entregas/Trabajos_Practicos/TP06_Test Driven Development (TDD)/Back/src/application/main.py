@@ -1,7 +1,35 @@
+import asyncio
+from contextlib import asynccontextmanager, suppress
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
+from src.domain.services.lista_espera_service import promotor_lista_espera
+from src.domain.services.notificacion_service import escucha_cupos
+from src.domain.services.reserva_service import liberador_reservas
+from src.infrastructure.consultas_lentas import registro_consultas_lentas
+from src.infrastructure.metricas import ConsultasMiddleware, MetricasMiddleware, metricas_http
+from src.infrastructure.salud import precalentar
 
-app = FastAPI(title="API Parque de Diversiones", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Tareas de fondo de este worker
+    promotor_lista_espera.iniciar()
+    liberador_reservas.iniciar()
+    registro_consultas_lentas.iniciar()
+    escucha_cupos.iniciar()
+    # Pool, consultas compiladas y esquemas en segundo plano: el worker atiende /healthz
+    # aunque la base no responda, y /readyz da 503 hasta que termina
+    tarea_precalentar = asyncio.create_task(precalentar(app))
+    yield
+    tarea_precalentar.cancel()
+    with suppress(asyncio.CancelledError):
+        await tarea_precalentar
+    escucha_cupos.detener()
+    registro_consultas_lentas.detener()
+    liberador_reservas.detener()
+    promotor_lista_espera.detener()
+
+app = FastAPI(title="API Parque de Diversiones", version="1.0.0", lifespan=lifespan)
 
 # Configurar CORS
 app.add_middleware(
@@ -12,6 +40,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Pedidos, latencia por ruta y errores de dominio, expuestos en /metrics
+app.add_middleware(MetricasMiddleware)
+# Sentencias SQL y tiempo en la base por pedido; avisa en el log las sentencias repetidas (N+1)
+app.add_middleware(ConsultasMiddleware)
+
 from src.infrastructure.routers.inscripcion import router as inscripcion_router
 app.include_router(inscripcion_router)
 
@@ -21,6 +54,29 @@ app.include_router(horario_router)
 from src.infrastructure.routers.actividad_router import router as actividad_router
 app.include_router(actividad_router)
 
+from src.infrastructure.routers.estado_horario_router import router as estado_horario_router
+app.include_router(estado_horario_router)
+
+from src.infrastructure.routers.parque_router import router as parque_router
+app.include_router(parque_router)
+
+from src.infrastructure.routers.admin_router import router as admin_router
+app.include_router(admin_router)
+
+from src.infrastructure.routers.lista_espera_router import router as lista_espera_router
+app.include_router(lista_espera_router)
+
+from src.infrastructure.routers.reserva_router import router as reserva_router
+app.include_router(reserva_router)
+
+from src.infrastructure.routers.salud_router import router as salud_router
+app.include_router(salud_router)
+
 @app.get("/")
 def read_root():
-    return {"message": "API levantada eco parque"}
\ No newline at end of file
+    return {"message": "API levantada eco parque"}
+
+@app.get("/metrics", include_in_schema=False)
+def read_metrics():
+    """Métricas de este worker en formato de texto de Prometheus"""
+    return PlainTextResponse(metricas_http.exportar(), media_type="text/plain; version=0.0.4; charset=utf-8")
\ No newline at end of file
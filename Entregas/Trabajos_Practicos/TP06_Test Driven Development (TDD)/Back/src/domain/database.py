@@ -1,30 +1,230 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from starlette.concurrency import run_in_threadpool
 import os
+import re
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Callable, List, Optional, Tuple
 
-from config_db import USUARIO_DB, CONTRASENA_DB, PUERTO_DB, URL_DB, DATABASE_NAME
+from config_db import (
+    USUARIO_DB, CONTRASENA_DB, PUERTO_DB, URL_DB, DATABASE_NAME, USAR_DB_ASYNC, ESQUEMA_DB,
+    POOL_SIZE_DB, MAX_OVERFLOW_DB, POOL_TIMEOUT_DB, POOL_RECYCLE_DB, PRE_PING_DB,
+    CACHE_COMPILACION_DB, SENTENCIAS_PREPARADAS_DB
+)
 
 # Database configuration with proper encoding
 DATABASE_URL = f"postgresql://{USUARIO_DB}:{CONTRASENA_DB}@{URL_DB}:{PUERTO_DB}/{DATABASE_NAME}"
+ASYNC_DATABASE_URL = f"postgresql+asyncpg://{USUARIO_DB}:{CONTRASENA_DB}@{URL_DB}:{PUERTO_DB}/{DATABASE_NAME}"
+
+class MetricasPool:
+    """Contadores de checkout de un pool: cantidad, tiempo de espera y timeouts"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.espera_total = 0.0
+        self.espera_maxima = 0.0
+
+    def registrar(self, espera: float, timeout: bool = False):
+        with self._lock:
+            if timeout:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.espera_total += espera
+            self.espera_maxima = max(self.espera_maxima, espera)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            intentos = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "checkout_timeouts": self.timeouts,
+                "checkout_wait_avg_ms": round(self.espera_total / intentos * 1000, 3) if intentos else 0.0,
+                "checkout_wait_max_ms": round(self.espera_maxima * 1000, 3)
+            }
+
+class MedirCheckoutMixin:
+    """Mide cuánto tarda cada checkout del pool (espera por una conexión libre incluida)"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metricas = MetricasPool()
+
+    def connect(self):
+        inicio = time.perf_counter()
+        try:
+            conexion = super().connect()
+        except exc.TimeoutError:
+            self.metricas.registrar(time.perf_counter() - inicio, timeout=True)
+            raise
+        self.metricas.registrar(time.perf_counter() - inicio)
+        return conexion
+
+class MedidoQueuePool(MedirCheckoutMixin, QueuePool):
+    pass
+
+class MedidoAsyncAdaptedQueuePool(MedirCheckoutMixin, AsyncAdaptedQueuePool):
+    pass
+
+# Opciones de sesión de Postgres de cada conexión (zona horaria y, si se configuró, esquema)
+OPCIONES_SERVIDOR = {"timezone": "UTC"}
+if ESQUEMA_DB:
+    OPCIONES_SERVIDOR["search_path"] = ESQUEMA_DB
+
+POOL_OPTIONS = dict(
+    pool_size=POOL_SIZE_DB,
+    max_overflow=MAX_OVERFLOW_DB,
+    pool_timeout=POOL_TIMEOUT_DB,
+    pool_recycle=POOL_RECYCLE_DB,
+    pool_pre_ping=PRE_PING_DB,  # Verify connections before use (configurable)
+    query_cache_size=CACHE_COMPILACION_DB
+)
 
 engine = create_engine(
     DATABASE_URL,
     echo=False,  # Set to True for debugging SQL queries
-    pool_pre_ping=True,  # Verify connections before use
+    poolclass=MedidoQueuePool,
+    **POOL_OPTIONS,
     connect_args={
         "client_encoding": "utf8",
-        "options": "-c timezone=UTC"
+        "options": " ".join(f"-c {clave}={valor}" for clave, valor in OPCIONES_SERVIDOR.items())
     }
 )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine (asyncpg), only created when DB_ASYNC is enabled
+async_engine = None
+AsyncSessionLocal = None
+if USAR_DB_ASYNC:
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        echo=False,
+        poolclass=MedidoAsyncAdaptedQueuePool,
+        **POOL_OPTIONS,
+        connect_args={
+            "server_settings": OPCIONES_SERVIDOR,
+            # Cache de sentencias preparadas de asyncpg: las búsquedas frecuentes se preparan una vez por conexión
+            "prepared_statement_cache_size": SENTENCIAS_PREPARADAS_DB
+        }
+    )
+    # expire_on_commit=False: los objetos devueltos se serializan fuera de la sesión
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
+def estado_pool(pool) -> dict:
+    """Estado actual de un pool medido: conexiones en uso, overflow y métricas de checkout"""
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "timeout_s": pool.timeout(),
+        **pool.metricas.snapshot()
+    }
+
+def get_pool_metrics() -> dict:
+    """Métricas de los pools de este worker (sync siempre, async si DB_ASYNC está activo)"""
+    metricas = {"sync": estado_pool(engine.pool)}
+    if async_engine is not None:
+        metricas["async"] = estado_pool(async_engine.sync_engine.pool)
+    return metricas
+
+class ConsultasPedido:
+    """Sentencias SQL ejecutadas durante un pedido HTTP: cantidad, tiempo total y cuántas veces cada forma"""
+    __slots__ = ("cantidad", "tiempo", "formas")
+
+    def __init__(self):
+        self.cantidad = 0
+        self.tiempo = 0.0
+        self.formas: Counter = Counter()
+
+    def registrar(self, sentencia: str, duracion: float):
+        self.cantidad += 1
+        self.tiempo += duracion
+        self.formas[forma_sentencia(sentencia)] += 1
+
+    def repetidas(self, minimo: int) -> List[Tuple[str, int]]:
+        """Formas ejecutadas `minimo` veces o más, de la más repetida a la menos"""
+        return [(forma, veces) for forma, veces in self.formas.most_common() if veces >= minimo]
+
+# Pedido en curso; lo fija el middleware (ver ConsultasMiddleware) y lo heredan el threadpool y run_sync
+consultas_pedido: ContextVar[Optional[ConsultasPedido]] = ContextVar("consultas_pedido", default=None)
+
+_LISTA_PARAMETROS = re.compile(r"(%\(\w+\)s|\$\d+)(\s*,\s*(%\(\w+\)s|\$\d+))+")
+_PARAMETRO = re.compile(r"%\(\w+\)s|\$\d+")
+_FILAS_VALUES = re.compile(r"\(\?\)(\s*,\s*\(\?\))+")
+_SAVEPOINT = re.compile(r"sa_savepoint_\d+")
+
+def forma_sentencia(sentencia: str) -> str:
+    """
+    La sentencia sin valores: los parámetros quedan como ? y una lista de parámetros
+    (IN expandido, VALUES de varias filas) como un solo ?, así un IN de 3 o de 30 ids es la misma
+    forma. Los nombres de SAVEPOINT numerados por SQLAlchemy también se unifican.
+    """
+    forma = _PARAMETRO.sub("?", _LISTA_PARAMETROS.sub("?", " ".join(sentencia.split())))
+    return _SAVEPOINT.sub("sa_savepoint", _FILAS_VALUES.sub("(?)", forma))
+
+# Funciones (sentencia, parámetros, executemany, duración) que reciben cada sentencia terminada,
+# haya o no un pedido en curso (ver consultas_lentas.py)
+observadores_sentencias: List[Callable[[str, object, bool, float], None]] = []
+
+# Eventos sobre la clase Engine: valen para el motor sincrónico, el async (su sync_engine)
+# y los que crean los tests. Sin un pedido en curso ni observadores no hacen nada.
+@event.listens_for(Engine, "before_cursor_execute")
+def _inicio_sentencia(conn, cursor, statement, parameters, context, executemany):
+    if observadores_sentencias or consultas_pedido.get() is not None:
+        conn.info.setdefault("inicio_sentencias", []).append(time.perf_counter())
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _fin_sentencia(conn, cursor, statement, parameters, context, executemany):
+    if not conn.info.get("inicio_sentencias"):
+        return
+    duracion = time.perf_counter() - conn.info["inicio_sentencias"].pop()
+    consultas = consultas_pedido.get()
+    if consultas is not None:
+        consultas.registrar(statement, duracion)
+    for observador in observadores_sentencias:
+        observador(statement, parameters, executemany, duracion)
+
+@event.listens_for(Engine, "handle_error")
+def _error_sentencia(contexto):
+    # La sentencia que falló no llega a after_cursor_execute
+    if contexto.connection is not None and contexto.connection.info.get("inicio_sentencias"):
+        contexto.connection.info["inicio_sentencias"].pop()
+
 # Dependency to get DB session
-def get_db():
+def get_sync_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# Los routers dependen de get_db; la configuración decide qué sesión reciben
+get_db = get_async_db if USAR_DB_ASYNC else get_sync_db
+
+async def run_in_session(db, fn, *args, **kwargs):
+    """
+    Ejecuta una función de servicio fn(db, *args, **kwargs) sobre la sesión inyectada.
+
+    Los servicios están escritos contra la API sincrónica de Session. Con una AsyncSession
+    se ejecutan con run_sync, en un greenlet sobre el event loop y con I/O de asyncpg,
+    sin ocupar un thread por request. Con una Session común se ejecutan en el threadpool.
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(lambda sync_db: fn(sync_db, *args, **kwargs))
+    return await run_in_threadpool(fn, db, *args, **kwargs)
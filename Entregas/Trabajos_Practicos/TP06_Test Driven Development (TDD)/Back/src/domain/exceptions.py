@@ -114,4 +114,36 @@ class ListaVisitantesVaciaError(ExcepcionDominio):
     def __init__(self):
         super().__init__(
             "No se puede inscribir: la lista de visitantes no puede estar vacía."
-        )
\ No newline at end of file
+        )
+
+class YaEnListaEsperaError(ExcepcionDominio):
+    """
+    Se lanza cuando un visitante ya está esperando lugar en el horario.
+    """
+    def __init__(self, id_visitante: int, id_horario: int):
+        self.id_visitante = id_visitante
+        self.id_horario = id_horario
+        super().__init__(
+            f"El visitante ID {id_visitante} ya está en la lista de espera del horario ID {id_horario}"
+        )
+
+class ReservaNoValidaError(ExcepcionDominio):
+    """
+    Se lanza cuando el token de reserva no existe, ya venció o es de otro horario.
+    """
+    def __init__(self, id_horario: int):
+        self.id_horario = id_horario
+        super().__init__(
+            f"La reserva no existe, ya venció o no corresponde al horario ID {id_horario}"
+        )
+
+class HorarioConCupoError(ExcepcionDominio):
+    """
+    Se lanza cuando se intenta anotar en la lista de espera un horario que todavía tiene lugar.
+    """
+    def __init__(self, id_horario: int, cupo_disponible: int):
+        self.id_horario = id_horario
+        self.cupo_disponible = cupo_disponible
+        super().__init__(
+            f"El horario ID {id_horario} todavía tiene {cupo_disponible} lugares libres: inscribirse directamente"
+        )
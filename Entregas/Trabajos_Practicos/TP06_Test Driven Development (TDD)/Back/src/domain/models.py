@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey 
+from sqlalchemy import DDL, BigInteger, Column, Integer, String, Boolean, DateTime, ForeignKey, Index, Time, UniqueConstraint, event, func, text
 from sqlalchemy.orm import relationship, validates, declarative_base
 from .database import Base
 
@@ -34,11 +34,15 @@ class Actividad(Base):
 
 class Horario(Base):
     __tablename__ = "horario"
+    __table_args__ = (
+        Index("ix_horario_estado_hora_inicio", "estado", "hora_inicio"),
+        Index("ix_horario_actividad_hora_inicio", "id_actividad", "hora_inicio"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     id_actividad = Column(Integer, ForeignKey("actividad.id"))
-    hora_inicio = Column(String)
-    hora_fin = Column(String)
+    hora_inicio = Column(Time)
+    hora_fin = Column(Time)
     cupo_total = Column(Integer)
     cupo_ocupado = Column(Integer)
     estado = Column(String, ForeignKey("estado_horario.nombre"))
@@ -46,12 +50,178 @@ class Horario(Base):
     actividad = relationship("Actividad")
     estado_horario = relationship("EstadoHorario")
 
+class DisponibilidadActividad(Base):
+    """
+    Totales por actividad de los horarios activos, mantenidos por los triggers
+    trg_horario_disponibilidad_* en la misma transacción que modifica el horario.
+    Como en version_catalogo, cada conexión suma en su propia ranura: dos inscripciones
+    en horarios distintos de la misma actividad no esperan la misma fila. Los totales de
+    una actividad son la suma de sus ranuras (ver get_disponibilidad_actividades).
+    """
+    __tablename__ = "disponibilidad_actividad"
+
+    id_actividad = Column(Integer, ForeignKey("actividad.id", ondelete="CASCADE"), primary_key=True)
+    ranura = Column(Integer, primary_key=True, autoincrement=False, server_default="0")
+    horarios_abiertos = Column(Integer, nullable=False, server_default="0")
+    cupo_total = Column(Integer, nullable=False, server_default="0")
+    cupo_ocupado = Column(Integer, nullable=False, server_default="0")
+
+# Un trigger por sentencia y por operación (las tablas de transición no admiten varias): suma el
+# aporte de las filas nuevas y resta el de las viejas, agrupado por actividad, y actualiza las
+# filas en orden de actividad, así dos sentencias que tocan varias actividades no se cruzan.
+# Se crea también con create_all (tests) y es idempotente porque create_all puede correr varias veces.
+TRIGGER_DISPONIBILIDAD = [
+    """
+    CREATE OR REPLACE FUNCTION actualizar_disponibilidad_actividad() RETURNS trigger AS $$
+    DECLARE
+        cambios text;
+    BEGIN
+        cambios := CASE TG_OP
+            WHEN 'INSERT' THEN 'SELECT *, 1 AS signo FROM nuevas'
+            WHEN 'DELETE' THEN 'SELECT *, -1 AS signo FROM viejas'
+            ELSE 'SELECT *, 1 AS signo FROM nuevas UNION ALL SELECT *, -1 AS signo FROM viejas'
+        END;
+        EXECUTE
+            'INSERT INTO disponibilidad_actividad AS d (id_actividad, ranura, horarios_abiertos, cupo_total, cupo_ocupado)
+             SELECT id_actividad, mod(pg_backend_pid(), 16), sum(signo),
+                    sum(signo * COALESCE(cupo_total, 0)), sum(signo * COALESCE(cupo_ocupado, 0))
+             FROM (' || cambios || ') AS c
+             WHERE estado = ''activo'' AND id_actividad IS NOT NULL
+             GROUP BY id_actividad
+             HAVING sum(signo) <> 0 OR sum(signo * COALESCE(cupo_total, 0)) <> 0
+                 OR sum(signo * COALESCE(cupo_ocupado, 0)) <> 0
+             ORDER BY id_actividad
+             ON CONFLICT (id_actividad, ranura) DO UPDATE
+             SET horarios_abiertos = d.horarios_abiertos + EXCLUDED.horarios_abiertos,
+                 cupo_total = d.cupo_total + EXCLUDED.cupo_total,
+                 cupo_ocupado = d.cupo_ocupado + EXCLUDED.cupo_ocupado';
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS trg_horario_disponibilidad ON horario",
+    "DROP TRIGGER IF EXISTS trg_horario_disponibilidad_insert ON horario",
+    """
+    CREATE TRIGGER trg_horario_disponibilidad_insert
+    AFTER INSERT ON horario REFERENCING NEW TABLE AS nuevas
+    FOR EACH STATEMENT EXECUTE FUNCTION actualizar_disponibilidad_actividad()
+    """,
+    "DROP TRIGGER IF EXISTS trg_horario_disponibilidad_update ON horario",
+    """
+    CREATE TRIGGER trg_horario_disponibilidad_update
+    AFTER UPDATE ON horario REFERENCING OLD TABLE AS viejas NEW TABLE AS nuevas
+    FOR EACH STATEMENT EXECUTE FUNCTION actualizar_disponibilidad_actividad()
+    """,
+    "DROP TRIGGER IF EXISTS trg_horario_disponibilidad_delete ON horario",
+    """
+    CREATE TRIGGER trg_horario_disponibilidad_delete
+    AFTER DELETE ON horario REFERENCING OLD TABLE AS viejas
+    FOR EACH STATEMENT EXECUTE FUNCTION actualizar_disponibilidad_actividad()
+    """,
+]
+
+for sentencia in TRIGGER_DISPONIBILIDAD:
+    event.listen(Base.metadata, "after_create", DDL(sentencia).execute_if(dialect="postgresql"))
+
+class VersionCatalogo(Base):
+    """
+    Versión compartida de los recursos de catálogo, para los ETag de todos los workers.
+    Los triggers trg_*_version_catalogo la incrementan en la misma transacción que cambia
+    horario, actividad o estado_horario (ORM, UPDATE directo o SQL a mano). Cada conexión
+    suma en su propia ranura para que las inscripciones concurrentes no esperen todas la
+    misma fila; la versión de un recurso es la suma de las ranuras (ver version_service).
+    """
+    __tablename__ = "version_catalogo"
+
+    ranura = Column(Integer, primary_key=True, autoincrement=False)
+    horarios = Column(BigInteger, nullable=False, server_default="0")
+    actividades = Column(BigInteger, nullable=False, server_default="0")
+    estados_horario = Column(BigInteger, nullable=False, server_default="0")
+
+# Triggers por sentencia (también TRUNCATE): suman 1 a los recursos que reciben como argumento.
+# La ranura 0 arranca en la hora de creación en milisegundos, así una base recreada no repite
+# las etiquetas que los clientes tengan guardadas.
+TRIGGER_VERSION_CATALOGO = [
+    """
+    CREATE OR REPLACE FUNCTION incrementar_version_catalogo() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO version_catalogo AS v (ranura, horarios, actividades, estados_horario)
+        VALUES (mod(pg_backend_pid(), 16),
+                ('horarios' = ANY(TG_ARGV))::int,
+                ('actividades' = ANY(TG_ARGV))::int,
+                ('estados-horario' = ANY(TG_ARGV))::int)
+        ON CONFLICT (ranura) DO UPDATE
+        SET horarios = v.horarios + EXCLUDED.horarios,
+            actividades = v.actividades + EXCLUDED.actividades,
+            estados_horario = v.estados_horario + EXCLUDED.estados_horario;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    INSERT INTO version_catalogo (ranura, horarios, actividades, estados_horario)
+    SELECT 0, inicio, inicio, inicio
+    FROM (SELECT (extract(epoch FROM clock_timestamp()) * 1000)::bigint AS inicio) AS s
+    ON CONFLICT (ranura) DO NOTHING
+    """,
+    "DROP TRIGGER IF EXISTS trg_horario_version_catalogo ON horario",
+    """
+    CREATE TRIGGER trg_horario_version_catalogo
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON horario
+    FOR EACH STATEMENT EXECUTE FUNCTION incrementar_version_catalogo('horarios')
+    """,
+    "DROP TRIGGER IF EXISTS trg_actividad_version_catalogo ON actividad",
+    """
+    CREATE TRIGGER trg_actividad_version_catalogo
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON actividad
+    FOR EACH STATEMENT EXECUTE FUNCTION incrementar_version_catalogo('actividades', 'horarios')
+    """,
+    "DROP TRIGGER IF EXISTS trg_estado_horario_version_catalogo ON estado_horario",
+    """
+    CREATE TRIGGER trg_estado_horario_version_catalogo
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON estado_horario
+    FOR EACH STATEMENT EXECUTE FUNCTION incrementar_version_catalogo('estados-horario', 'horarios')
+    """,
+]
+
+for sentencia in TRIGGER_VERSION_CATALOGO:
+    event.listen(Base.metadata, "after_create", DDL(sentencia).execute_if(dialect="postgresql"))
+
+# Cada cambio de cupo o estado de un horario se avisa con pg_notify en el canal "cupos_<esquema>";
+# Postgres lo entrega a los que escuchan (EscuchaCupos en notificacion_service) al confirmar.
+TRIGGER_NOTIFICAR_CUPO = [
+    """
+    CREATE OR REPLACE FUNCTION notificar_cupo_horario() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'UPDATE' AND OLD.cupo_ocupado IS NOT DISTINCT FROM NEW.cupo_ocupado
+           AND OLD.estado IS NOT DISTINCT FROM NEW.estado THEN
+            RETURN NULL;
+        END IF;
+        PERFORM pg_notify(
+            'cupos_' || TG_TABLE_SCHEMA,
+            json_build_object('id', NEW.id, 'cupo_ocupado', NEW.cupo_ocupado, 'estado', NEW.estado)::text
+        );
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS trg_horario_notificar_cupo ON horario",
+    """
+    CREATE TRIGGER trg_horario_notificar_cupo
+    AFTER INSERT OR UPDATE OF cupo_ocupado, estado ON horario
+    FOR EACH ROW EXECUTE FUNCTION notificar_cupo_horario()
+    """,
+]
+
+for sentencia in TRIGGER_NOTIFICAR_CUPO:
+    event.listen(Base.metadata, "after_create", DDL(sentencia).execute_if(dialect="postgresql"))
+
 class Visitante(Base):
     __tablename__ = "visitante"
 
     id = Column(Integer, primary_key=True, index=True)
     nombre = Column(String)
-    dni = Column(Integer)
+    dni = Column(Integer, unique=True, index=True)
     edad = Column(Integer, nullable=True)  # permite null en la base
     talle = Column(String)
 
@@ -86,6 +256,9 @@ def crear_visitante_validado(nombre: str = None, dni: int = None, edad: int = No
 
 class Inscripcion(Base):
     __tablename__ = "inscripcion"
+    __table_args__ = (
+        UniqueConstraint("id_horario", "id_visitante", name="uq_inscripcion_horario_visitante"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     id_horario = Column(Integer, ForeignKey("horario.id"))
@@ -94,4 +267,52 @@ class Inscripcion(Base):
     acepta_Terminos_Condiciones = Column(Boolean)
 
     horario = relationship("Horario")
-    visitante = relationship("Visitante")
\ No newline at end of file
+    visitante = relationship("Visitante")
+
+class ListaEspera(Base):
+    """
+    Visitante esperando lugar en un horario lleno. Las entradas se atienden por id
+    (orden de llegada) y pasan a 'promovida' (con su inscripción) o 'rechazada' (con motivo).
+    """
+    __tablename__ = "lista_espera"
+    __table_args__ = (
+        # Un visitante espera una sola vez por horario
+        Index("uq_lista_espera_pendiente", "id_horario", "id_visitante", unique=True,
+              postgresql_where=text("estado = 'pendiente'")),
+        # Recorrer los pendientes de cada horario en orden de llegada
+        Index("ix_lista_espera_pendientes", "id_horario", "id", postgresql_where=text("estado = 'pendiente'")),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    id_horario = Column(Integer, ForeignKey("horario.id"), nullable=False)
+    id_visitante = Column(Integer, ForeignKey("visitante.id"), nullable=False)
+    acepta_Terminos_Condiciones = Column(Boolean, nullable=False)
+    estado = Column(String, nullable=False, server_default="pendiente")
+    motivo = Column(String, nullable=True)
+    id_inscripcion = Column(Integer, ForeignKey("inscripcion.id", ondelete="SET NULL"), nullable=True)
+    creado_en = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    horario = relationship("Horario")
+    visitante = relationship("Visitante")
+
+
+class ReservaTemporal(Base):
+    """
+    Lugares de un horario apartados durante el flujo de confirmación. El cupo ya está
+    sumado en horario.cupo_ocupado; la reserva se canjea por inscripciones con su token
+    o, al vencer, el liberador de reservas devuelve los lugares.
+    """
+    __tablename__ = "reserva_temporal"
+    __table_args__ = (
+        # El liberador recorre las vencidas por fecha de vencimiento
+        Index("ix_reserva_temporal_vence_en", "vence_en"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    token = Column(String, nullable=False, unique=True)
+    id_horario = Column(Integer, ForeignKey("horario.id"), nullable=False)
+    cantidad = Column(Integer, nullable=False)
+    vence_en = Column(DateTime(timezone=True), nullable=False)
+    creado_en = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    horario = relationship("Horario")
@@ -1,5 +1,6 @@
-from pydantic import BaseModel, ConfigDict, model_validator
-from typing import Optional
+from datetime import datetime, time
+from pydantic import BaseModel, ConfigDict, Field, PlainSerializer, model_validator
+from typing import Annotated, Optional
 
 # User schemas (existing)
 class UserBase(BaseModel):
@@ -55,10 +56,24 @@ class Actividad(ActividadBase):
 
     model_config = ConfigDict(from_attributes=True)
 
+class DisponibilidadActividad(BaseModel):
+    """Resumen de los horarios activos de una actividad"""
+    id_actividad: int
+    nombre: str
+    horarios_abiertos: int
+    cupo_total: int
+    cupo_ocupado: int
+    cupo_libre: int
+
+    model_config = ConfigDict(from_attributes=True)
+
 # Horario schemas
+# Hora guardada como time; en JSON se sigue mostrando como "HH:MM"
+HoraMinutos = Annotated[time, PlainSerializer(lambda hora: hora.strftime("%H:%M"), return_type=str)]
+
 class HorarioBase(BaseModel):
-    hora_inicio: str
-    hora_fin: str
+    hora_inicio: HoraMinutos
+    hora_fin: HoraMinutos
     cupo_total: int
     cupo_ocupado: int
     estado: str
@@ -114,6 +129,37 @@ class InscripcionUnificadaCreateRequest(BaseModel):
     id_horario: int
     visitantes: list[PersonaInscripcion]  # Lista de visitantes (1 o más)
     acepta_terminos: bool
+    token_reserva: Optional[str] = None  # Reserva temporal a canjear (POST /reservas/)
+
+class InscripcionMasivaCreateRequest(BaseModel):
+    inscripciones: list[InscripcionUnificadaCreateRequest]  # Solicitudes independientes entre sí
+
+class ReservaCreateRequest(BaseModel):
+    id_horario: int
+    cantidad: int = Field(..., ge=1)
+
+class ReservaTemporal(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    token: str
+    id_horario: int
+    cantidad: int
+    vence_en: datetime
+
+class CancelacionRequest(BaseModel):
+    ids: list[int]  # ids de las inscripciones a cancelar
+
+class DisponibilidadHorario(BaseModel):
+    id: int
+    cupo_total: int
+    cupo_ocupado: int
+    cupo_libre: int
+    estado: str
+
+class ResultadoCancelacion(BaseModel):
+    canceladas: list[int]
+    no_encontradas: list[int]
+    horarios: list[DisponibilidadHorario]  # cupo de cada horario afectado después de cancelar
 
 # Schema para respuesta con datos de visitantes
 class VisitanteInfo(BaseModel):
@@ -133,4 +179,16 @@ class InscripcionConVisitantes(BaseModel):
     nombre_actividad: str
     visitante: VisitanteInfo
 
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+class EntradaListaEspera(BaseModel):
+    id: int
+    id_horario: int
+    id_visitante: int
+    estado: str  # pendiente, promovida o rechazada
+    posicion: Optional[int] = None  # lugar en la fila mientras está pendiente
+    id_inscripcion: Optional[int] = None
+    motivo: Optional[str] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
@@ -1,7 +1,9 @@
 # Lógica de negocio para actividades
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
-from src.domain.models import Actividad
-from src.domain.schemas import ActividadCreate
+from typing import List
+from src.domain.models import Actividad, DisponibilidadActividad
+from src.domain.schemas import ActividadCreate, DisponibilidadActividad as DisponibilidadActividadSchema
 
 def get_actividades(db: Session, skip: int = 0, limit: int = 100):
     return db.query(Actividad).offset(skip).limit(limit).all()
@@ -37,4 +39,33 @@ def delete_actividad(db: Session, actividad_id: int):
     if db_actividad:
         db.delete(db_actividad)
         db.commit()
-    return db_actividad
\ No newline at end of file
+    return db_actividad
+
+def get_disponibilidad_actividades(db: Session) -> List[DisponibilidadActividadSchema]:
+    """
+    Lugares libres y horarios abiertos por actividad, leídos del resumen que mantienen
+    los triggers de horario (a lo sumo 16 ranuras por actividad, sin recorrer los horarios)
+    """
+    resumen = (
+        select(
+            DisponibilidadActividad.id_actividad,
+            func.sum(DisponibilidadActividad.horarios_abiertos).label("horarios_abiertos"),
+            func.sum(DisponibilidadActividad.cupo_total).label("cupo_total"),
+            func.sum(DisponibilidadActividad.cupo_ocupado).label("cupo_ocupado")
+        )
+        .group_by(DisponibilidadActividad.id_actividad)
+        .subquery("resumen")
+    )
+    filas = db.execute(
+        select(
+            Actividad.id.label("id_actividad"),
+            Actividad.nombre,
+            func.coalesce(resumen.c.horarios_abiertos, 0).label("horarios_abiertos"),
+            func.coalesce(resumen.c.cupo_total, 0).label("cupo_total"),
+            func.coalesce(resumen.c.cupo_ocupado, 0).label("cupo_ocupado"),
+            func.greatest(func.coalesce(resumen.c.cupo_total - resumen.c.cupo_ocupado, 0), 0).label("cupo_libre")
+        )
+        .outerjoin(resumen, resumen.c.id_actividad == Actividad.id)
+        .order_by(Actividad.id)
+    ).all()
+    return [DisponibilidadActividadSchema.model_validate(fila) for fila in filas]
@@ -1,16 +1,46 @@
 # Lógica de negocio para estados de horario
+import threading
+import time
 from sqlalchemy.orm import Session
+from config_db import TTL_CACHE_ESTADOS
 from src.domain.models import EstadoHorario
-from src.domain.schemas import EstadoHorarioCreate
-from typing import List
+from src.domain.schemas import EstadoHorario as EstadoHorarioSchema, EstadoHorarioCreate
+from src.domain.services.version_service import leer_version
+from typing import List, Optional, Tuple
+
+class CacheEstados:
+    """
+    Lista de estados de horario en memoria: son pocos y casi no cambian. Vale mientras no
+    cambie la versión compartida "estados-horario" (ver version_service) y no venza el TTL.
+    """
+
+    def __init__(self, ttl: float = TTL_CACHE_ESTADOS):
+        self.ttl = ttl
+        self._entrada: Optional[Tuple[int, float, List[EstadoHorarioSchema]]] = None
+        self._lock = threading.Lock()
+
+    def obtener(self, db: Session, version: Optional[int] = None) -> List[EstadoHorarioSchema]:
+        # La versión se lee antes de consultar: un cambio que llegue mientras tanto la deja vieja
+        if version is None:
+            version = leer_version(db, "estados-horario")
+        entrada = self._entrada
+        if entrada is not None and entrada[0] == version and entrada[1] > time.monotonic():
+            return entrada[2]
+        estados = [EstadoHorarioSchema.model_validate(estado) for estado in db.query(EstadoHorario).all()]
+        if self.ttl > 0:
+            with self._lock:
+                self._entrada = (version, time.monotonic() + self.ttl, estados)
+        return estados
+
+cache_estados = CacheEstados()
 
 def get_estado_horario(db: Session, nombre: str) -> EstadoHorario:
     """Obtener un estado de horario por nombre"""
     return db.query(EstadoHorario).filter(EstadoHorario.nombre == nombre).first()
 
-def get_estados_horario(db: Session) -> List[EstadoHorario]:
-    """Obtener todos los estados de horario"""
-    return db.query(EstadoHorario).all()
+def get_estados_horario(db: Session, version: Optional[int] = None) -> List[EstadoHorario]:
+    """Obtener todos los estados de horario (desde cache_estados; `version` si ya se leyó)"""
+    return cache_estados.obtener(db, version)
 
 def create_estado_horario(db: Session, estado: EstadoHorarioCreate) -> EstadoHorario:
     """Crear un nuevo estado de horario"""
@@ -1,8 +1,248 @@
 # Lógica de negocio para horarios
 # Funciones para manejar horarios, cupos, estados, etc.
+import datetime
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.orm import Session, contains_eager, joinedload
+from pydantic import BaseModel, ConfigDict, TypeAdapter
+from typing import Dict, Hashable, List, Optional
+from config_db import TTL_CACHE_HORARIOS, MAX_CACHE_HORARIOS
+from src.domain.models import Actividad, Horario, ReservaTemporal
+from src.domain.schemas import HoraMinutos
+from src.domain.exceptions import CupoInsuficienteError, EstadoHorarioInvalidoError, ReservaNoValidaError
 
-# def get_horarios(db):
-#     # Implementar lógica
+class ActividadDeHorario(BaseModel):
+    id: int
+    nombre: str
+    requiere_talle: bool
+    edad: Optional[int] = None  # edad mínima de la actividad
+    descripcion: Optional[str] = None
 
-# def create_horario(id_actividad, hora_inicio, hora_fin, cupo_total, estado, db):
-#     # Implementar lógica
\ No newline at end of file
+class EstadoDeHorario(BaseModel):
+    nombre: str
+    descripcion: str
+
+class HorarioConDetalles(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    
+    id: int
+    id_actividad: int
+    hora_inicio: HoraMinutos
+    hora_fin: HoraMinutos
+    cupo_total: int
+    cupo_ocupado: int
+    estado: str
+    
+    actividad: ActividadDeHorario
+    
+    estado_horario: EstadoDeHorario
+
+# Serializador armado una sola vez (pydantic-core) para la lista completa de horarios
+LISTA_HORARIOS = TypeAdapter(List[HorarioConDetalles])
+
+def get_horarios_con_detalles(db: Session) -> List[HorarioConDetalles]:
+    """
+    Obtener todos los horarios con información completa de actividad y estado_horario
+    """
+    horarios = (
+        db.query(Horario)
+        .options(joinedload(Horario.actividad))
+        .options(joinedload(Horario.estado_horario))
+        .all()
+    )
+    
+    # Convertir a formato de respuesta
+    return [_a_horario_con_detalles(h) for h in horarios]
+
+def _a_horario_con_detalles(h: Horario) -> HorarioConDetalles:
+    return HorarioConDetalles(
+        id=h.id,
+        id_actividad=h.id_actividad,
+        hora_inicio=h.hora_inicio,
+        hora_fin=h.hora_fin,
+        cupo_total=h.cupo_total,
+        cupo_ocupado=h.cupo_ocupado,
+        estado=h.estado,
+        actividad=ActividadDeHorario(
+            id=h.actividad.id,
+            nombre=h.actividad.nombre,
+            requiere_talle=h.actividad.requiere_talle,
+            edad=h.actividad.edad_minima,
+            descripcion=h.actividad.descripcion
+        ),
+        estado_horario=EstadoDeHorario(
+            nombre=h.estado_horario.nombre,
+            descripcion=h.estado_horario.descripcion
+        )
+    )
+
+def buscar_horarios(db: Session, id_actividad: Optional[int] = None, estado: Optional[str] = None,
+                    desde: Optional[datetime.time] = None, hasta: Optional[datetime.time] = None, cupo_minimo: Optional[int] = None,
+                    requiere_talle: Optional[bool] = None, requiere_edad: Optional[bool] = None,
+                    edad: Optional[int] = None) -> List[HorarioConDetalles]:
+    """
+    Buscar horarios con los filtros resueltos en la base (índices por estado/actividad y hora_inicio).
+
+    desde/hasta: el horario empieza en o después de `desde` y termina en o antes de `hasta`.
+    cupo_minimo: lugares libres (cupo_total - cupo_ocupado) que tiene que tener el horario.
+    requiere_talle / requiere_edad: la actividad pide (o no) talle / edad mínima.
+    edad: sólo actividades sin edad mínima o con edad mínima menor o igual a esta.
+    """
+    query = (
+        select(Horario)
+        .join(Horario.actividad)
+        .join(Horario.estado_horario)
+        .options(contains_eager(Horario.actividad), contains_eager(Horario.estado_horario))
+    )
+    if id_actividad is not None:
+        query = query.where(Horario.id_actividad == id_actividad)
+    if estado is not None:
+        query = query.where(Horario.estado == estado)
+    if desde is not None:
+        query = query.where(Horario.hora_inicio >= desde)
+    if hasta is not None:
+        query = query.where(Horario.hora_fin <= hasta)
+    if cupo_minimo is not None:
+        query = query.where(Horario.cupo_total - Horario.cupo_ocupado >= cupo_minimo)
+    if requiere_talle is not None:
+        query = query.where(Actividad.requiere_talle.is_(requiere_talle))
+    if requiere_edad is not None:
+        query = query.where(Actividad.edad_minima.is_not(None) if requiere_edad else Actividad.edad_minima.is_(None))
+    if edad is not None:
+        query = query.where((Actividad.edad_minima.is_(None)) | (Actividad.edad_minima <= edad))
+
+    horarios = db.scalars(query.order_by(Horario.hora_inicio, Horario.id)).all()
+    return [_a_horario_con_detalles(h) for h in horarios]
+
+class _EntradaCache:
+    __slots__ = ("cuerpo", "version", "vence")
+
+    def __init__(self, cuerpo: bytes, version: int, vence: float):
+        self.cuerpo = cuerpo
+        self.version = version
+        self.vence = vence
+
+class CacheHorarios:
+    """
+    Cache read-through de respuestas de horarios ya serializadas, acotada en tamaño (LRU) y TTL.
+
+    Cada entrada guarda el JSON codificado y la versión compartida de "horarios" leída antes
+    de consultar la base (ver version_service). Sólo se sirve mientras esa siga siendo la
+    versión vigente: cualquier cambio de cupo, horario, actividad o estado, de este worker o
+    de otro, por ORM o por SQL directo, la deja vieja.
+    """
+
+    def __init__(self, max_entradas: int = MAX_CACHE_HORARIOS, ttl: float = TTL_CACHE_HORARIOS):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self._entradas: "OrderedDict[Hashable, _EntradaCache]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, clave: Hashable, version: int) -> Optional[bytes]:
+        """Devuelve el JSON cacheado para `clave` en `version` o None si no está, es de otra versión o venció"""
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                return None
+            if entrada.vence < time.monotonic():
+                del self._entradas[clave]
+                return None
+            if entrada.version != version:
+                return None
+            self._entradas.move_to_end(clave)
+            return entrada.cuerpo
+
+    def guardar(self, clave: Hashable, horarios: List[HorarioConDetalles], version: int) -> bytes:
+        """
+        Guarda los horarios leídos en `version` y devuelve el JSON. Un pedido lento no pisa
+        la entrada que otro ya guardó con una versión más nueva.
+        """
+        cuerpo = LISTA_HORARIOS.dump_json(horarios)
+        with self._lock:
+            actual = self._entradas.get(clave)
+            if self.ttl > 0 and (actual is None or actual.version <= version):
+                self._entradas[clave] = _EntradaCache(cuerpo, version, time.monotonic() + self.ttl)
+                self._entradas.move_to_end(clave)
+                while len(self._entradas) > self.max_entradas:
+                    self._entradas.popitem(last=False)
+        return cuerpo
+
+    def invalidar(self):
+        with self._lock:
+            self._entradas.clear()
+
+cache_horarios = CacheHorarios()
+
+def get_horarios_con_detalles_json(db: Session, version: int) -> bytes:
+    """
+    Igual que get_horarios_con_detalles pero devuelve el JSON y lo deja en cache_horarios.
+    `version` es la de "horarios" leída antes de consultar (ver version_service.leer_version).
+    """
+    return cache_horarios.guardar("todos", get_horarios_con_detalles(db), version)
+
+def reservar_cupo(db: Session, id_horario: int, cantidad: int) -> int:
+    """
+    Reserva `cantidad` lugares del horario con un único UPDATE condicional.
+
+    La condición de cupo se evalúa en la base, sobre la versión vigente de la fila,
+    así que dos inscripciones concurrentes no pueden sobrevender el horario. La fila
+    queda bloqueada sólo hasta el commit de la transacción que hizo la reserva.
+    Devuelve el nuevo cupo_ocupado o lanza CupoInsuficienteError si no alcanza
+    (EstadoHorarioInvalidoError si el horario dejó de estar activo).
+    """
+    cupo_ocupado = db.execute(
+        update(Horario)
+        .where(
+            Horario.id == id_horario,
+            Horario.estado == "activo",
+            Horario.cupo_total - Horario.cupo_ocupado >= cantidad
+        )
+        .values(cupo_ocupado=Horario.cupo_ocupado + cantidad)
+        .returning(Horario.cupo_ocupado)
+        .execution_options(synchronize_session="fetch")
+    ).scalar_one_or_none()
+
+    if cupo_ocupado is None:
+        # No se tomó ningún lugar: informar si el horario se cerró o el cupo que quedaba al fallar
+        fila = db.execute(
+            select(Horario.estado, (Horario.cupo_total - Horario.cupo_ocupado).label("cupo_disponible"))
+            .where(Horario.id == id_horario)
+        ).first()
+        if fila is not None and fila.estado != "activo":
+            raise EstadoHorarioInvalidoError(fila.estado)
+        raise CupoInsuficienteError(max(fila.cupo_disponible or 0, 0) if fila else 0, cantidad)
+
+    return cupo_ocupado
+
+def canjear_reserva(db: Session, token: str, id_horario: int, cantidad: int) -> int:
+    """
+    Usa una reserva temporal vigente para tomar `cantidad` lugares del horario.
+
+    La reserva se borra con un DELETE condicional (vigente y del mismo horario), así que
+    no puede canjearse dos veces ni cruzarse con el liberador de vencidas. Sus lugares ya
+    están en cupo_ocupado: si se inscriben menos personas se devuelve la diferencia y si
+    son más se reserva el resto con reservar_cupo. Devuelve el nuevo cupo_ocupado.
+    """
+    reservados = db.execute(
+        delete(ReservaTemporal)
+        .where(
+            ReservaTemporal.token == token,
+            ReservaTemporal.id_horario == id_horario,
+            ReservaTemporal.vence_en > func.now()
+        )
+        .returning(ReservaTemporal.cantidad)
+    ).scalar_one_or_none()
+    if reservados is None:
+        raise ReservaNoValidaError(id_horario)
+
+    if cantidad > reservados:
+        return reservar_cupo(db, id_horario, cantidad - reservados)
+    return db.execute(
+        update(Horario)
+        .where(Horario.id == id_horario)
+        .values(cupo_ocupado=Horario.cupo_ocupado - (reservados - cantidad))
+        .returning(Horario.cupo_ocupado)
+        .execution_options(synchronize_session="fetch")
+    ).scalar_one()
@@ -1,7 +1,10 @@
 # Lógica de negocio para inscripciones
+from sqlalchemy import bindparam, func, select, update, delete
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session, joinedload
 from src.domain.models import Actividad, Visitante, Horario, Inscripcion, crear_visitante_validado
 from src.domain.exceptions import (
+    ExcepcionDominio,
     CupoInsuficienteError,
     TerminosNoAceptadosError,
     HorarioNoEncontradoError,
@@ -13,9 +16,10 @@ from src.domain.exceptions import (
     DnisDuplicadosEnListaError,
     ListaVisitantesVaciaError
 )
-from typing import List, Optional
-from pydantic import BaseModel, ConfigDict
-from src.domain.schemas import VisitanteInfo, InscripcionConVisitantes
+from typing import List, Optional, Union
+from pydantic import BaseModel, ConfigDict, TypeAdapter
+from src.domain.schemas import VisitanteInfo, InscripcionConVisitantes, DisponibilidadHorario, ResultadoCancelacion
+from src.domain.services.horario_service import canjear_reserva, reservar_cupo
 
 class InscripcionConActividad(BaseModel):
     """Clase auxiliar para devolver inscripciones con nombre de actividad"""
@@ -28,18 +32,94 @@ class InscripcionConActividad(BaseModel):
 
     model_config = ConfigDict(from_attributes=True)
 
+# Valida todas las filas de una consulta en una sola pasada de pydantic-core
+_FILAS_CON_ACTIVIDAD = TypeAdapter(List[InscripcionConActividad])
+
+# Búsquedas frecuentes del camino de inscripción, armadas una sola vez al importar el módulo.
+# Cada llamada sólo liga parámetros: no se arma una Query nueva y la compilación sale de la
+# cache de sentencias del motor (con asyncpg también se reutiliza la sentencia preparada en
+# el servidor). Ver benchmarks/bench_sentencias.py.
+_HORARIO_CON_ACTIVIDAD = (
+    select(Horario)
+    .options(joinedload(Horario.actividad))
+    .where(Horario.id == bindparam("id_horario"))
+)
+_HORARIOS_CON_ACTIVIDAD = (
+    select(Horario)
+    .options(joinedload(Horario.actividad))
+    .where(Horario.id.in_(bindparam("ids_horario", expanding=True)))
+)
+_VISITANTES_POR_DNI = select(Visitante).where(Visitante.dni.in_(bindparam("dnis", expanding=True)))
+_INSCRIPCIONES_CON_HORARIO = (
+    select(Inscripcion)
+    .options(joinedload(Inscripcion.horario).joinedload(Horario.actividad))
+    .where(Inscripcion.id.in_(bindparam("ids", expanding=True)))
+    .order_by(Inscripcion.id)
+)
+
+# Errores que rechazan una sola solicitud de un lote (TalleRequeridoError no hereda de ExcepcionDominio);
+# cualquier otro error deshace el lote completo
+ERRORES_POR_SOLICITUD = (ExcepcionDominio, TalleRequeridoError, ValueError)
+
+def buscar_horario_con_actividad(db: Session, id_horario: int) -> Optional[Horario]:
+    """El horario con su actividad cargada en la misma consulta, o None"""
+    return db.scalars(_HORARIO_CON_ACTIVIDAD, {"id_horario": id_horario}).first()
+
+def buscar_horarios_con_actividad(db: Session, ids_horario) -> List[Horario]:
+    return db.scalars(_HORARIOS_CON_ACTIVIDAD, {"ids_horario": list(ids_horario)}).all()
+
+def buscar_visitantes_por_dni(db: Session, dnis) -> List[Visitante]:
+    return db.scalars(_VISITANTES_POR_DNI, {"dnis": list(dnis)}).all()
+
+def buscar_visitante(db: Session, id_visitante: int) -> Optional[Visitante]:
+    """Por clave primaria: sale del identity map de la sesión si ya está cargado"""
+    return db.get(Visitante, id_visitante)
+
+def buscar_inscripciones_con_horario(db: Session, ids_inscripciones) -> List[Inscripcion]:
+    return db.scalars(_INSCRIPCIONES_CON_HORARIO, {"ids": list(ids_inscripciones)}).all()
+
+def _select_inscripciones_con_actividad():
+    """Columnas de InscripcionConActividad en un único join, sin hidratar entidades ORM"""
+    return (
+        select(
+            Inscripcion.id,
+            Inscripcion.id_horario,
+            Inscripcion.id_visitante,
+            Inscripcion.nro_personas,
+            Inscripcion.acepta_Terminos_Condiciones,
+            Actividad.nombre.label("nombre_actividad")
+        )
+        .join(Horario, Inscripcion.id_horario == Horario.id)
+        .join(Actividad, Horario.id_actividad == Actividad.id)
+    )
+
+def _select_inscripciones_con_visitantes():
+    """Columnas de InscripcionConVisitantes (visitante aplanado) en un único join"""
+    return (
+        select(
+            Inscripcion.id,
+            Inscripcion.id_horario,
+            Inscripcion.nro_personas,
+            Inscripcion.acepta_Terminos_Condiciones,
+            Actividad.nombre.label("nombre_actividad"),
+            Visitante.id.label("id_visitante"),
+            Visitante.nombre,
+            Visitante.dni,
+            Visitante.edad,
+            Visitante.talle
+        )
+        .join(Horario, Inscripcion.id_horario == Horario.id)
+        .join(Actividad, Horario.id_actividad == Actividad.id)
+        .join(Visitante, Inscripcion.id_visitante == Visitante.id)
+    )
+
 class InscripcionService:
     def __init__(self, db: Session):
         self.db = db
 
-    def inscripcion_actividad(self, id_horario: int, visitantes: List[dict], acepta_terminos: bool = True) -> List[Inscripcion]:
-        """
-        Realiza la inscripción de uno o múltiples visitantes a un horario de actividad.
-        visitantes: lista de dicts con {nombre, dni, edad, talle?}
-        """
-        
+    def _validar_solicitud(self, horario: Optional[Horario], id_horario: int, visitantes: List[dict], acepta_terminos: bool):
+        """Validaciones de la solicitud que no dependen de los visitantes guardados en la base"""
         # Verificar que el horario existe
-        horario = self.db.query(Horario).filter(Horario.id == id_horario).first()
         if not horario:
             raise HorarioNoEncontradoError(id_horario)
 
@@ -65,156 +145,504 @@ class InscripcionService:
                     raise DnisDuplicadosEnListaError(dni)
                     break
 
+    def _construir_visitante(self, persona: dict) -> Visitante:
+        """Valida los datos de un visitante nuevo y arma la entidad (sin agregarla a la sesión)"""
+        try:
+            return crear_visitante_validado(
+                nombre=persona['nombre'],
+                dni=persona['dni'],
+                edad=persona['edad'],
+                talle=persona.get('talle')
+            )
+        except DatosVisitantesInvalidosError as e:
+            raise ValueError(f"Datos inválidos para {persona['nombre']}: {', '.join(e.campos_faltantes)}")
+
+    def _validar_requisitos_actividad(self, horario: Horario, visitante: Visitante):
+        """Verifica talle y edad mínima del visitante contra la actividad del horario"""
+        # Verificar requerimiento de talle
+        if horario.actividad.requiere_talle and not visitante.talle:
+            raise TalleRequeridoError(
+                id_visitante=visitante.id,
+                nombre_actividad=horario.actividad.nombre
+            )
+
+        # Verificar edad mínima requerida por la actividad
+        if horario.actividad.edad_minima is not None and visitante.edad < horario.actividad.edad_minima:
+            raise EdadMinimaRequeridaError(
+                id_visitante=visitante.id,
+                nombre_actividad=horario.actividad.nombre,
+                edad_visitante=visitante.edad,
+                edad_minima=horario.actividad.edad_minima
+            )
+
+    def _resolver_visitantes(self, personas: List[dict]):
+        """
+        Obtiene los visitantes de todas las personas sin consultar antes si existen.
+
+        Los que no existen se crean con un único INSERT ... ON CONFLICT (dni) DO NOTHING,
+        que apoyado en el índice único de DNI no puede duplicar visitantes aunque otra
+        transacción inserte el mismo DNI al mismo tiempo. Sólo los DNIs que ya existían
+        se traen después con una consulta. Devuelve el diccionario {dni: Visitante},
+        el error de validación de cada DNI con datos inválidos y los ids creados.
+        """
+        filas_por_dni = {}
+        errores_por_dni = {}
+        for persona in personas:
+            dni = persona['dni']
+            if dni in filas_por_dni:
+                continue
+            try:
+                visitante = self._construir_visitante(persona)
+            except ValueError as e:
+                errores_por_dni.setdefault(dni, e)
+                continue
+            errores_por_dni.pop(dni, None)
+            filas_por_dni[dni] = {
+                "nombre": visitante.nombre,
+                "dni": visitante.dni,
+                "edad": visitante.edad,
+                "talle": visitante.talle
+            }
+
+        visitantes_por_dni = {}
+        if filas_por_dni:
+            # Insertar ordenado por DNI para que transacciones concurrentes tomen los
+            # bloqueos del índice único siempre en el mismo orden
+            creados = self.db.scalars(
+                pg_insert(Visitante)
+                .values([filas_por_dni[dni] for dni in sorted(filas_por_dni)])
+                .on_conflict_do_nothing(index_elements=[Visitante.dni])
+                .returning(Visitante)
+            ).all()
+            visitantes_por_dni = {visitante.dni: visitante for visitante in creados}
+        ids_creados = {visitante.id for visitante in visitantes_por_dni.values()}
+
+        ya_existentes = {persona['dni'] for persona in personas} - visitantes_por_dni.keys()
+        if ya_existentes:
+            visitantes_por_dni.update(
+                (visitante.dni, visitante)
+                for visitante in buscar_visitantes_por_dni(self.db, ya_existentes)
+            )
+
+        return visitantes_por_dni, errores_por_dni, ids_creados
+
+    def _recargar_inscripciones(self, ids_inscripciones: List[int]) -> List[Inscripcion]:
+        """
+        Recarga inscripciones con su horario y actividad en una sola consulta,
+        así quien las use después del commit no dispara una consulta por fila
+        """
+        return buscar_inscripciones_con_horario(self.db, ids_inscripciones)
+
+    def inscripcion_actividad(self, id_horario: int, visitantes: List[dict], acepta_terminos: bool = True,
+                              token_reserva: Optional[str] = None) -> List[Inscripcion]:
+        """
+        Realiza la inscripción de uno o múltiples visitantes a un horario de actividad.
+        visitantes: lista de dicts con {nombre, dni, edad, talle?}
+        token_reserva: reserva temporal del horario cuyos lugares se usan (ver canjear_reserva)
+        """
+        
+        # Buscar el horario trayendo su actividad en la misma consulta
+        horario = buscar_horario_con_actividad(self.db, id_horario)
+        self._validar_solicitud(horario, id_horario, visitantes, acepta_terminos)
+
         cantidad_personas = len(visitantes)
         
-        # Verificar cupo disponible para todas las personas
+        # Verificar cupo disponible para todas las personas (chequeo rápido sin bloqueo,
+        # la reserva definitiva se hace con reservar_cupo)
+        # (con reserva los lugares ya están contados en cupo_ocupado)
         cupo_disponible = horario.cupo_total - horario.cupo_ocupado
-        if cupo_disponible < cantidad_personas:
+        if token_reserva is None and cupo_disponible < cantidad_personas:
             raise CupoInsuficienteError(cupo_disponible, cantidad_personas)
 
-        inscripciones = []
-        visitantes_creados = []
+        try:
+            # Crear los visitantes nuevos y traer los existentes
+            visitantes_por_dni, errores_por_dni, ids_creados = self._resolver_visitantes(visitantes)
 
-        for persona in visitantes:
-            # Buscar visitante por DNI
-            visitante = self.db.query(Visitante).filter(Visitante.dni == persona['dni']).first()
-            
-            if not visitante:
-                # Crear nuevo visitante
-                try:
-                    visitante = crear_visitante_validado(
-                        nombre=persona['nombre'],
-                        dni=persona['dni'],
-                        edad=persona['edad'],
-                        talle=persona.get('talle')
+            # Sólo un visitante que ya existía puede estar inscripto: una consulta para todos
+            ids_existentes = [v.id for v in visitantes_por_dni.values() if v.id not in ids_creados]
+            inscriptos = set()
+            if ids_existentes:
+                inscriptos = set(self.db.scalars(
+                    select(Inscripcion.id_visitante).where(
+                        Inscripcion.id_horario == horario.id,
+                        Inscripcion.id_visitante.in_(ids_existentes)
                     )
-                    self.db.add(visitante)
-                    self.db.flush()
-                    visitantes_creados.append(visitante)
-                except DatosVisitantesInvalidosError as e:
-                    # Rollback de visitantes creados si hay error
-                    for v in visitantes_creados:
-                        self.db.delete(v)
-                    raise ValueError(f"Datos inválidos para {persona['nombre']}: {', '.join(e.campos_faltantes)}")
-            
-            # Verificar que no esté ya inscrito
-            inscripcion_existente = self.db.query(Inscripcion).filter(
-                Inscripcion.id_horario == horario.id,
-                Inscripcion.id_visitante == visitante.id
-            ).first()
-            if inscripcion_existente:
-                # Rollback de visitantes creados si hay error
-                for v in visitantes_creados:
-                    self.db.delete(v)
-                raise InscripcionDuplicadaError(visitante.id, horario.id)
-            
-            # Verificar requerimiento de talle
-            if horario.actividad.requiere_talle and not visitante.talle:
-                # Rollback de visitantes creados si hay error
-                for v in visitantes_creados:
-                    self.db.delete(v)
-                raise TalleRequeridoError(
-                    id_visitante=visitante.id,
-                    nombre_actividad=horario.actividad.nombre
+                ))
+
+            # Mismo orden de errores que la validación persona por persona: para cada una,
+            # datos inválidos, después inscripción duplicada y después talle y edad mínima
+            for persona in visitantes:
+                visitante = visitantes_por_dni.get(persona['dni'])
+                if visitante is None:
+                    # No existía y sus datos no permitieron crearlo
+                    raise errores_por_dni[persona['dni']]
+                if visitante.id in inscriptos:
+                    raise InscripcionDuplicadaError(visitante.id, horario.id)
+                self._validar_requisitos_actividad(horario, visitante)
+
+            # Tomar el cupo de forma atómica antes de insertar las inscripciones
+            if token_reserva is not None:
+                canjear_reserva(self.db, token_reserva, horario.id, cantidad_personas)
+            else:
+                reservar_cupo(self.db, horario.id, cantidad_personas)
+
+            # Insertar todas las inscripciones en bloque; una inscripción concurrente que
+            # apareció después de la consulta anterior la detecta el índice único (id_horario, id_visitante)
+            inscripciones = self.db.scalars(
+                pg_insert(Inscripcion)
+                .values([
+                    {
+                        "id_horario": horario.id,
+                        "id_visitante": visitantes_por_dni[persona['dni']].id,
+                        "nro_personas": 1,
+                        "acepta_Terminos_Condiciones": acepta_terminos
+                    }
+                    for persona in visitantes
+                ])
+                .on_conflict_do_nothing(index_elements=[Inscripcion.id_horario, Inscripcion.id_visitante])
+                .returning(Inscripcion)
+            ).all()
+
+            if len(inscripciones) < cantidad_personas:
+                ids_insertados = {inscripcion.id_visitante for inscripcion in inscripciones}
+                for persona in visitantes:
+                    visitante = visitantes_por_dni[persona['dni']]
+                    if visitante.id not in ids_insertados:
+                        raise InscripcionDuplicadaError(visitante.id, horario.id)
+        except Exception:
+            # Descartar visitantes, cupo e inscripciones ya escritos en esta transacción
+            self.db.rollback()
+            raise
+
+        ids_inscripciones = [inscripcion.id for inscripcion in inscripciones]
+        self.db.commit()
+
+        return self._recargar_inscripciones(ids_inscripciones)
+
+    def inscripcion_masiva(self, solicitudes: List[dict]) -> List[Union[List[Inscripcion], Exception]]:
+        """
+        Procesa muchas solicitudes de inscripción en una sola transacción.
+        solicitudes: lista de dicts con {id_horario, visitantes, acepta_terminos}
+
+        Devuelve, en el mismo orden, la lista de inscripciones creadas para cada solicitud
+        o la excepción de dominio que la rechazó. Una solicitud rechazada no afecta a las demás.
+        La cantidad de sentencias SQL no depende del número de solicitudes.
+        """
+        resultados: List[Union[List[Inscripcion], Exception]] = [None] * len(solicitudes)
+
+        # Todos los horarios del lote con sus actividades en una sola consulta
+        ids_horario = {solicitud['id_horario'] for solicitud in solicitudes}
+        horarios = {horario.id: horario for horario in buscar_horarios_con_actividad(self.db, ids_horario)}
+
+        # Primera pasada: validaciones que no necesitan visitantes ni bloqueos
+        for indice, solicitud in enumerate(solicitudes):
+            try:
+                if solicitud.get('token_reserva') is not None:
+                    raise ValueError("Las reservas temporales se canjean de a una con POST /inscripciones/")
+                self._validar_solicitud(
+                    horarios.get(solicitud['id_horario']), solicitud['id_horario'],
+                    solicitud['visitantes'], solicitud['acepta_terminos']
                 )
+            except ERRORES_POR_SOLICITUD as e:
+                resultados[indice] = e
+
+        try:
+            # Crear los visitantes nuevos del lote y traer los existentes
+            visitantes_por_dni, errores_por_dni, ids_creados = self._resolver_visitantes([
+                persona
+                for indice, solicitud in enumerate(solicitudes)
+                if resultados[indice] is None
+                for persona in solicitud['visitantes']
+            ])
+
+            # Bloquear los horarios en orden de id (mismo orden de bloqueo que inscripcion_actividad:
+            # primero visitantes, después horarios) y releer su cupo ya bloqueado
+            if horarios:
+                self.db.scalars(
+                    select(Horario)
+                    .where(Horario.id.in_(horarios))
+                    .order_by(Horario.id)
+                    .with_for_update()
+                    .execution_options(populate_existing=True)
+                ).all()
+
+            inscriptos = set()
+            if visitantes_por_dni:
+                inscriptos = set(self.db.execute(
+                    select(Inscripcion.id_horario, Inscripcion.id_visitante).where(
+                        Inscripcion.id_horario.in_(horarios),
+                        Inscripcion.id_visitante.in_([v.id for v in visitantes_por_dni.values()])
+                    )
+                ).tuples())
 
-            # Verificar edad mínima requerida por la actividad
-            if horario.actividad.edad_minima is not None and visitante.edad < horario.actividad.edad_minima:
-                # Rollback de visitantes creados si hay error
-                for v in visitantes_creados:
-                    self.db.delete(v)
-                raise EdadMinimaRequeridaError(
-                    id_visitante=visitante.id,
-                    nombre_actividad=horario.actividad.nombre,
-                    edad_visitante=visitante.edad,
-                    edad_minima=horario.actividad.edad_minima
+            # Segunda pasada: cupo, duplicados y requisitos de la actividad con los datos bloqueados
+            cupo_tomado = {id_horario: 0 for id_horario in horarios}
+            inscripciones_por_solicitud = {}
+            for indice, solicitud in enumerate(solicitudes):
+                if resultados[indice] is not None:
+                    continue
+                horario = horarios[solicitud['id_horario']]
+                try:
+                    self._validar_solicitud(horario, horario.id, solicitud['visitantes'], solicitud['acepta_terminos'])
+
+                    cantidad_personas = len(solicitud['visitantes'])
+                    cupo_disponible = horario.cupo_total - horario.cupo_ocupado - cupo_tomado[horario.id]
+                    if cupo_disponible < cantidad_personas:
+                        raise CupoInsuficienteError(cupo_disponible, cantidad_personas)
+
+                    inscripciones = []
+                    for persona in solicitud['visitantes']:
+                        visitante = visitantes_por_dni.get(persona['dni'])
+                        if visitante is None:
+                            raise errores_por_dni[persona['dni']]
+                        if (horario.id, visitante.id) in inscriptos:
+                            raise InscripcionDuplicadaError(visitante.id, horario.id)
+                        self._validar_requisitos_actividad(horario, visitante)
+                        inscripciones.append({
+                            "id_horario": horario.id,
+                            "id_visitante": visitante.id,
+                            "nro_personas": 1,
+                            "acepta_Terminos_Condiciones": solicitud['acepta_terminos']
+                        })
+                except ERRORES_POR_SOLICITUD as e:
+                    resultados[indice] = e
+                    continue
+
+                inscriptos.update((i["id_horario"], i["id_visitante"]) for i in inscripciones)
+                cupo_tomado[horario.id] += cantidad_personas
+                inscripciones_por_solicitud[indice] = inscripciones
+
+            # Insertar todas las inscripciones aceptadas en bloque; una inscripción concurrente que
+            # apareció después de la consulta anterior la detecta el índice único (id_horario, id_visitante)
+            # y rechaza sólo la solicitud a la que pertenece
+            ids_por_solicitud = {}
+            if inscripciones_por_solicitud:
+                insertadas = {
+                    (i.id_horario, i.id_visitante): i.id
+                    for i in self.db.execute(
+                        pg_insert(Inscripcion)
+                        .values([i for inscripciones in inscripciones_por_solicitud.values() for i in inscripciones])
+                        .on_conflict_do_nothing(index_elements=[Inscripcion.id_horario, Inscripcion.id_visitante])
+                        .returning(Inscripcion.id, Inscripcion.id_horario, Inscripcion.id_visitante)
+                    )
+                }
+                descartadas = []
+                for indice, inscripciones in inscripciones_por_solicitud.items():
+                    claves = [(i["id_horario"], i["id_visitante"]) for i in inscripciones]
+                    faltante = next((clave for clave in claves if clave not in insertadas), None)
+                    if faltante is None:
+                        ids_por_solicitud[indice] = [insertadas[clave] for clave in claves]
+                        continue
+                    resultados[indice] = InscripcionDuplicadaError(faltante[1], faltante[0])
+                    descartadas.extend(insertadas[clave] for clave in claves if clave in insertadas)
+                    cupo_tomado[faltante[0]] -= len(claves)
+                    inscriptos.difference_update(claves)
+                if descartadas:
+                    self.db.execute(
+                        delete(Inscripcion).where(Inscripcion.id.in_(descartadas)),
+                        execution_options={"synchronize_session": False}
+                    )
+
+            # Los visitantes creados sólo para solicitudes rechazadas no deben quedar guardados
+            huerfanos = ids_creados - {id_visitante for _, id_visitante in inscriptos}
+            if huerfanos:
+                self.db.execute(
+                    delete(Visitante).where(Visitante.id.in_(huerfanos)),
+                    execution_options={"synchronize_session": False}
                 )
+                for visitante in list(visitantes_por_dni.values()):
+                    if visitante.id in huerfanos:
+                        self.db.expunge(visitante)
 
-            # Crear inscripción
-            inscripcion = Inscripcion(
-                id_horario=horario.id,
-                id_visitante=visitante.id,
-                nro_personas=1,
-                acepta_Terminos_Condiciones=acepta_terminos
-            )
-            self.db.add(inscripcion)
-            inscripciones.append(inscripcion)
+            # Un solo UPDATE por lote con el cupo final de cada horario (las filas ya están bloqueadas)
+            cambios_cupo = [
+                {"id": id_horario, "cupo_ocupado": horarios[id_horario].cupo_ocupado + tomado}
+                for id_horario, tomado in cupo_tomado.items()
+                if tomado
+            ]
+            if cambios_cupo:
+                self.db.execute(update(Horario), cambios_cupo)
+        except Exception:
+            self.db.rollback()
+            raise
 
-        # Actualizar cupo
-        horario.cupo_ocupado += cantidad_personas
         self.db.commit()
 
-        return inscripciones
-
-    def get_all_inscripciones(self) -> List[InscripcionConActividad]:
-        """Obtiene todas las inscripciones con el nombre de la actividad"""
-        # Hacer join con Horario y Actividad para obtener el nombre de la actividad
-        inscripciones = (
-            self.db.query(Inscripcion)
-            .join(Horario, Inscripcion.id_horario == Horario.id)
-            .join(Actividad, Horario.id_actividad == Actividad.id)
-            .options(joinedload(Inscripcion.horario).joinedload(Horario.actividad))
-            .all()
-        )
+        recargadas = {
+            i.id: i
+            for i in self._recargar_inscripciones([id_inscripcion for ids in ids_por_solicitud.values() for id_inscripcion in ids])
+        }
+        for indice, ids_inscripciones in ids_por_solicitud.items():
+            resultados[indice] = [recargadas[id_inscripcion] for id_inscripcion in ids_inscripciones]
+
+        return resultados
 
-        # Convertir a objetos con nombre de actividad
-        resultado = []
-        for inscripcion in inscripciones:
-            resultado.append(InscripcionConActividad(
-                id=inscripcion.id,
-                id_horario=inscripcion.id_horario,
-                id_visitante=inscripcion.id_visitante,
-                nro_personas=inscripcion.nro_personas,
-                acepta_Terminos_Condiciones=inscripcion.acepta_Terminos_Condiciones,
-                nombre_actividad=inscripcion.horario.actividad.nombre
-            ))
-
-        return resultado
-
-    def get_all_inscripciones_con_visitantes(self) -> List[InscripcionConVisitantes]:
-        """Obtiene todas las inscripciones con el nombre de la actividad y datos del visitante"""
-        # Hacer join con Horario, Actividad y Visitante para obtener toda la información
-        inscripciones = (
-            self.db.query(Inscripcion)
-            .join(Horario, Inscripcion.id_horario == Horario.id)
-            .join(Actividad, Horario.id_actividad == Actividad.id)
-            .join(Visitante, Inscripcion.id_visitante == Visitante.id)
-            .options(
-                joinedload(Inscripcion.horario).joinedload(Horario.actividad),
-                joinedload(Inscripcion.visitante)
+    def cancelar_inscripciones(self, ids_inscripciones: List[int]) -> ResultadoCancelacion:
+        """
+        Cancela (borra) las inscripciones y devuelve su cupo en una sola transacción.
+
+        Primero se bloquean los horarios afectados en orden de id (el mismo orden que usa
+        la inscripción: horario antes que inscripción). Después una única sentencia borra
+        las inscripciones y descuenta de cada horario las personas borradas de ese horario,
+        devolviendo el cupo resultante. Los ids inexistentes se informan sin error.
+        """
+        ids = sorted(set(ids_inscripciones))
+        if not ids:
+            return ResultadoCancelacion(canceladas=[], no_encontradas=[], horarios=[])
+
+        try:
+            self.db.execute(
+                select(Horario.id)
+                .where(Horario.id.in_(select(Inscripcion.id_horario).where(Inscripcion.id.in_(ids))))
+                .order_by(Horario.id)
+                .with_for_update()
+            )
+
+            inscripcion = Inscripcion.__table__
+            borradas = (
+                delete(inscripcion)
+                .where(inscripcion.c.id.in_(ids))
+                .returning(inscripcion.c.id, inscripcion.c.id_horario, inscripcion.c.nro_personas)
+                .cte("borradas")
+            )
+            por_horario = (
+                select(borradas.c.id_horario, func.sum(borradas.c.nro_personas).label("cantidad"))
+                .group_by(borradas.c.id_horario)
+                .subquery("por_horario")
             )
-            .all()
+            horario = Horario.__table__
+            actualizados = (
+                update(horario)
+                .where(horario.c.id == por_horario.c.id_horario)
+                .values(cupo_ocupado=func.greatest(horario.c.cupo_ocupado - por_horario.c.cantidad, 0))
+                .returning(horario.c.id, horario.c.cupo_total, horario.c.cupo_ocupado, horario.c.estado)
+                .cte("actualizados")
+            )
+            filas = self.db.execute(
+                select(borradas.c.id.label("id_inscripcion"), actualizados)
+                .join(actualizados, actualizados.c.id == borradas.c.id_horario)
+                .order_by(borradas.c.id)
+            ).all()
+        except Exception:
+            self.db.rollback()
+            raise
+        self.db.commit()
+
+        horarios = {
+            fila.id: DisponibilidadHorario(
+                id=fila.id,
+                cupo_total=fila.cupo_total,
+                cupo_ocupado=fila.cupo_ocupado,
+                cupo_libre=max(fila.cupo_total - fila.cupo_ocupado, 0),
+                estado=fila.estado
+            )
+            for fila in filas
+        }
+        canceladas = [fila.id_inscripcion for fila in filas]
+        return ResultadoCancelacion(
+            canceladas=canceladas,
+            no_encontradas=sorted(set(ids) - set(canceladas)),
+            horarios=sorted(horarios.values(), key=lambda h: h.id)
         )
 
-        # Convertir a objetos con nombre de actividad y datos del visitante
-        resultado = []
-        for inscripcion in inscripciones:
-            resultado.append(InscripcionConVisitantes(
-                id=inscripcion.id,
-                id_horario=inscripcion.id_horario,
-                nro_personas=inscripcion.nro_personas,
-                acepta_Terminos_Condiciones=inscripcion.acepta_Terminos_Condiciones,
-                nombre_actividad=inscripcion.horario.actividad.nombre,
+    def _filtrar_pagina(self, query, limit: Optional[int], after: Optional[int], id_horario: Optional[int],
+                        id_actividad: Optional[int], dni: Optional[int]):
+        """
+        Aplica filtros y paginación por keyset sobre Inscripcion.id: la página siguiente
+        arranca después del último id recibido (after), así el costo no depende de
+        cuántas inscripciones haya antes, a diferencia de OFFSET.
+        """
+        if id_horario is not None:
+            query = query.filter(Inscripcion.id_horario == id_horario)
+        if id_actividad is not None:
+            query = query.filter(Horario.id_actividad == id_actividad)
+        if dni is not None:
+            query = query.filter(Visitante.dni == dni)
+        if after is not None:
+            query = query.filter(Inscripcion.id > after)
+        query = query.order_by(Inscripcion.id)
+        if limit is not None:
+            query = query.limit(limit)
+        return query
+
+    def get_all_inscripciones(self, limit: Optional[int] = None, after: Optional[int] = None, id_horario: Optional[int] = None,
+                              id_actividad: Optional[int] = None, dni: Optional[int] = None) -> List[InscripcionConActividad]:
+        """Obtiene las inscripciones con el nombre de la actividad (filtradas y paginadas por id)"""
+        query = _select_inscripciones_con_actividad()
+        if dni is not None:
+            query = query.join(Visitante, Inscripcion.id_visitante == Visitante.id)
+        filas = self.db.execute(self._filtrar_pagina(query, limit, after, id_horario, id_actividad, dni))
+
+        # Las tuplas tienen los mismos nombres que el modelo: se validan directo, sin copiar campos
+        return _FILAS_CON_ACTIVIDAD.validate_python(filas.all(), from_attributes=True)
+
+    def get_all_inscripciones_con_visitantes(self, limit: Optional[int] = None, after: Optional[int] = None, id_horario: Optional[int] = None,
+                                             id_actividad: Optional[int] = None, dni: Optional[int] = None) -> List[InscripcionConVisitantes]:
+        """Obtiene las inscripciones con el nombre de la actividad y datos del visitante (filtradas y paginadas por id)"""
+        query = _select_inscripciones_con_visitantes()
+        filas = self.db.execute(self._filtrar_pagina(query, limit, after, id_horario, id_actividad, dni))
+
+        return [
+            InscripcionConVisitantes(
+                id=fila.id,
+                id_horario=fila.id_horario,
+                nro_personas=fila.nro_personas,
+                acepta_Terminos_Condiciones=fila.acepta_Terminos_Condiciones,
+                nombre_actividad=fila.nombre_actividad,
                 visitante=VisitanteInfo(
-                    id=inscripcion.visitante.id,
-                    nombre=inscripcion.visitante.nombre,
-                    dni=inscripcion.visitante.dni,
-                    edad=inscripcion.visitante.edad,
-                    talle=inscripcion.visitante.talle
+                    id=fila.id_visitante,
+                    nombre=fila.nombre,
+                    dni=fila.dni,
+                    edad=fila.edad,
+                    talle=fila.talle
                 )
-            ))
+            )
+            for fila in filas
+        ]
+
+# Filas por lote al exportar: se leen de a este tamaño desde un cursor del servidor
+FILAS_POR_LOTE_EXPORT = 1000
 
-        return resultado
+def export_inscripciones_query(id_horario: Optional[int] = None, id_actividad: Optional[int] = None, dni: Optional[int] = None):
+    """
+    Consulta de exportación: sólo las columnas necesarias (sin hidratar entidades ORM),
+    ordenada por id y pensada para leerse con un cursor del servidor (yield_per).
+    """
+    query = _select_inscripciones_con_visitantes()
+    if id_horario is not None:
+        query = query.where(Inscripcion.id_horario == id_horario)
+    if id_actividad is not None:
+        query = query.where(Horario.id_actividad == id_actividad)
+    if dni is not None:
+        query = query.where(Visitante.dni == dni)
+    return query.order_by(Inscripcion.id).execution_options(yield_per=FILAS_POR_LOTE_EXPORT)
 
-def create_inscripcion_unificada(db: Session, id_horario: int, visitantes: List[dict], acepta_terminos: bool = True):
-    """Función helper unificada para crear inscripciones"""
+def iterar_lotes_export(db: Session, **filtros):
+    """Genera las filas de la exportación en lotes de FILAS_POR_LOTE_EXPORT, sin cargarlas todas"""
+    yield from db.execute(export_inscripciones_query(**filtros)).partitions()
+
+def create_inscripcion_unificada(db: Session, id_horario: int, visitantes: List[dict], acepta_terminos: bool = True,
+                                 token_reserva: Optional[str] = None):
+    """Función helper unificada para crear inscripciones (opcionalmente canjeando una reserva temporal)"""
     service = InscripcionService(db)
-    return service.inscripcion_actividad(id_horario=id_horario, visitantes=visitantes, acepta_terminos=acepta_terminos)
+    return service.inscripcion_actividad(
+        id_horario=id_horario, visitantes=visitantes, acepta_terminos=acepta_terminos, token_reserva=token_reserva
+    )
+
+def create_inscripciones_masivas(db: Session, solicitudes: List[dict]) -> List[Union[List[Inscripcion], Exception]]:
+    """Función helper para procesar un lote de inscripciones"""
+    service = InscripcionService(db)
+    return service.inscripcion_masiva(solicitudes)
+
+def cancelar_inscripciones(db: Session, ids_inscripciones: List[int]) -> ResultadoCancelacion:
+    """Función helper para cancelar una o más inscripciones"""
+    service = InscripcionService(db)
+    return service.cancelar_inscripciones(ids_inscripciones)
 
 def create_inscripcion_individual(db: Session, id_horario: int, id_visitante: int, acepta_terminos: bool):
     """Función helper para crear una inscripción individual - busca el visitante por ID"""
     service = InscripcionService(db)
-    visitante = service.db.query(Visitante).filter(Visitante.id == id_visitante).first()
+    visitante = buscar_visitante(service.db, id_visitante)
     if not visitante:
         raise VisitanteNoEncontradoError(f"Visitante ID {id_visitante}")
     
@@ -233,12 +661,12 @@ def create_inscripcion_grupal(db: Session, id_horario: int, personas: List[dict]
     service = InscripcionService(db)
     return service.inscripcion_actividad(id_horario=id_horario, visitantes=personas, acepta_terminos=acepta_terminos)
 
-def get_all_inscripciones(db: Session) -> List[InscripcionConActividad]:
-    """Función helper para obtener todas las inscripciones"""
+def get_all_inscripciones(db: Session, **filtros) -> List[InscripcionConActividad]:
+    """Función helper para obtener las inscripciones (filtros: limit, after, id_horario, id_actividad, dni)"""
     service = InscripcionService(db)
-    return service.get_all_inscripciones()
+    return service.get_all_inscripciones(**filtros)
 
-def get_all_inscripciones_con_visitantes(db: Session) -> List[InscripcionConVisitantes]:
-    """Función helper para obtener todas las inscripciones con datos de visitantes"""
+def get_all_inscripciones_con_visitantes(db: Session, **filtros) -> List[InscripcionConVisitantes]:
+    """Función helper para obtener las inscripciones con datos de visitantes (mismos filtros)"""
     service = InscripcionService(db)
-    return service.get_all_inscripciones_con_visitantes()
\ No newline at end of file
+    return service.get_all_inscripciones_con_visitantes(**filtros)
\ No newline at end of file
@@ -0,0 +1,254 @@
+# Lógica de negocio para la lista de espera
+# Anotarse cuando un horario está lleno y promover automáticamente cuando se libera cupo
+from collections import defaultdict
+from typing import Callable, Dict, List
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session, aliased, joinedload
+from config_db import INTERVALO_LISTA_ESPERA, LOTE_LISTA_ESPERA
+from src.domain.database import SessionLocal
+from src.domain.models import Horario, Inscripcion, ListaEspera, Visitante
+from src.domain.exceptions import (
+    CupoInsuficienteError,
+    EdadMinimaRequeridaError,
+    EstadoHorarioInvalidoError,
+    HorarioConCupoError,
+    InscripcionDuplicadaError,
+    TalleRequeridoError,
+    YaEnListaEsperaError
+)
+from src.domain.schemas import EntradaListaEspera
+from src.domain.services.horario_service import reservar_cupo
+from src.domain.services.inscripcion_service import InscripcionService, buscar_horario_con_actividad
+from src.domain.services.tarea_periodica import TareaPeriodica
+
+class ListaEsperaService(InscripcionService):
+    """Usa las mismas validaciones que la inscripción directa"""
+
+    def _posiciones(self, ids_entradas: List[int]) -> Dict[int, int]:
+        """Lugar en la fila de cada entrada pendiente (1 = la próxima en promoverse)"""
+        anteriores = aliased(ListaEspera)
+        return dict(self.db.execute(
+            select(ListaEspera.id, func.count(anteriores.id))
+            .join(anteriores, (anteriores.id_horario == ListaEspera.id_horario) & (anteriores.id <= ListaEspera.id))
+            .where(ListaEspera.id.in_(ids_entradas), ListaEspera.estado == "pendiente", anteriores.estado == "pendiente")
+            .group_by(ListaEspera.id)
+        ).tuples().all())
+
+    def _a_respuesta(self, entradas: List[ListaEspera]) -> List[EntradaListaEspera]:
+        posiciones = self._posiciones([entrada.id for entrada in entradas])
+        return [
+            EntradaListaEspera(
+                id=entrada.id,
+                id_horario=entrada.id_horario,
+                id_visitante=entrada.id_visitante,
+                estado=entrada.estado,
+                posicion=posiciones.get(entrada.id),
+                id_inscripcion=entrada.id_inscripcion,
+                motivo=entrada.motivo
+            )
+            for entrada in entradas
+        ]
+
+    def unirse(self, id_horario: int, visitantes: List[dict], acepta_terminos: bool = True) -> List[EntradaListaEspera]:
+        """
+        Anota a los visitantes en la lista de espera del horario.
+
+        Sólo se puede esperar lugar en un horario lleno: con cupo libre hay que inscribirse
+        directamente. Se rechaza también lo que nunca podría promoverse (datos inválidos,
+        talle o edad mínima, visitante ya inscripto).
+        """
+        horario = buscar_horario_con_actividad(self.db, id_horario)
+        self._validar_solicitud(horario, id_horario, visitantes, acepta_terminos)
+        if horario.cupo_ocupado < horario.cupo_total:
+            raise HorarioConCupoError(horario.id, horario.cupo_total - horario.cupo_ocupado)
+
+        try:
+            visitantes_por_dni, errores_por_dni, _ = self._resolver_visitantes(visitantes)
+            for persona in visitantes:
+                visitante = visitantes_por_dni.get(persona['dni'])
+                if visitante is None:
+                    raise errores_por_dni[persona['dni']]
+                self._validar_requisitos_actividad(horario, visitante)
+
+            ids_visitantes = [visitantes_por_dni[persona['dni']].id for persona in visitantes]
+            ya_inscripto = self.db.scalars(
+                select(Inscripcion.id_visitante)
+                .where(Inscripcion.id_horario == horario.id, Inscripcion.id_visitante.in_(ids_visitantes))
+                .limit(1)
+            ).first()
+            if ya_inscripto is not None:
+                raise InscripcionDuplicadaError(ya_inscripto, horario.id)
+
+            entradas = self.db.scalars(
+                pg_insert(ListaEspera)
+                .values([
+                    {"id_horario": horario.id, "id_visitante": id_visitante, "acepta_Terminos_Condiciones": acepta_terminos}
+                    for id_visitante in ids_visitantes
+                ])
+                .on_conflict_do_nothing(
+                    index_elements=[ListaEspera.id_horario, ListaEspera.id_visitante],
+                    index_where=ListaEspera.estado == "pendiente"
+                )
+                .returning(ListaEspera)
+            ).all()
+            if len(entradas) < len(ids_visitantes):
+                anotados = {entrada.id_visitante for entrada in entradas}
+                raise YaEnListaEsperaError(next(i for i in ids_visitantes if i not in anotados), horario.id)
+        except Exception:
+            self.db.rollback()
+            raise
+
+        self.db.commit()
+        promotor_lista_espera.avisar()
+        return self._a_respuesta(sorted(entradas, key=lambda entrada: entrada.id))
+
+    def get_entrada(self, id_entrada: int):
+        entrada = self.db.get(ListaEspera, id_entrada)
+        return self._a_respuesta([entrada])[0] if entrada else None
+
+    def promover(self, lote: int = LOTE_LISTA_ESPERA) -> Dict[str, int]:
+        """
+        Promueve a inscripción las entradas pendientes de horarios con lugar libre.
+
+        Las entradas se toman con FOR UPDATE SKIP LOCKED: varios procesos pueden promover
+        en paralelo y cada uno se queda con entradas distintas sin esperar al otro. El cupo se
+        toma con el mismo UPDATE condicional que la inscripción directa (reservar_cupo), por
+        horario en orden de id, y sólo para las entradas que cumplen talle y edad mínima; las
+        que no, quedan rechazadas con el motivo. Las que no alcanzan lugar siguen pendientes.
+        """
+        candidatas = self.db.scalars(
+            select(ListaEspera)
+            .join(Horario, ListaEspera.id_horario == Horario.id)
+            .where(
+                ListaEspera.estado == "pendiente",
+                Horario.estado == "activo",
+                Horario.cupo_total > Horario.cupo_ocupado
+            )
+            .order_by(ListaEspera.id)
+            .limit(lote)
+            .with_for_update(of=ListaEspera, skip_locked=True)
+        ).all()
+        if not candidatas:
+            self.db.rollback()
+            return {"promovidas": 0, "rechazadas": 0}
+
+        try:
+            por_horario = defaultdict(list)
+            for entrada in candidatas:
+                por_horario[entrada.id_horario].append(entrada)
+
+            horarios = {
+                horario.id: horario
+                for horario in self.db.scalars(
+                    select(Horario).options(joinedload(Horario.actividad)).where(Horario.id.in_(por_horario))
+                )
+            }
+            visitantes = {
+                visitante.id: visitante
+                for visitante in self.db.scalars(
+                    select(Visitante).where(Visitante.id.in_({entrada.id_visitante for entrada in candidatas}))
+                )
+            }
+
+            aceptadas, rechazos = [], []
+            for id_horario in sorted(por_horario):
+                horario = horarios[id_horario]
+                validas = []
+                for entrada in por_horario[id_horario]:
+                    try:
+                        self._validar_requisitos_actividad(horario, visitantes[entrada.id_visitante])
+                    except (TalleRequeridoError, EdadMinimaRequeridaError) as e:
+                        rechazos.append({"id": entrada.id, "estado": "rechazada", "motivo": str(e)})
+                        continue
+                    validas.append(entrada)
+                tomados = self._tomar_cupo(id_horario, len(validas))
+                aceptadas.extend(validas[:tomados])  # el resto sigue pendiente para la próxima pasada
+
+            inscripciones = []
+            if aceptadas:
+                inscripciones = self.db.execute(
+                    pg_insert(Inscripcion)
+                    .values([
+                        {
+                            "id_horario": entrada.id_horario,
+                            "id_visitante": entrada.id_visitante,
+                            "nro_personas": 1,
+                            "acepta_Terminos_Condiciones": entrada.acepta_Terminos_Condiciones
+                        }
+                        for entrada in aceptadas
+                    ])
+                    .on_conflict_do_nothing(index_elements=[Inscripcion.id_horario, Inscripcion.id_visitante])
+                    .returning(Inscripcion.id, Inscripcion.id_horario, Inscripcion.id_visitante)
+                ).all()
+
+            id_inscripcion = {(i.id_horario, i.id_visitante): i.id for i in inscripciones}
+            promociones = []
+            sobrantes = defaultdict(int)
+            for entrada in aceptadas:
+                clave = (entrada.id_horario, entrada.id_visitante)
+                if clave in id_inscripcion:
+                    promociones.append({"id": entrada.id, "estado": "promovida", "id_inscripcion": id_inscripcion[clave]})
+                else:
+                    # Se inscribió directamente mientras esperaba: su lugar vuelve al horario
+                    rechazos.append({"id": entrada.id, "estado": "rechazada", "motivo": "Ya inscripto en el horario"})
+                    sobrantes[entrada.id_horario] += 1
+
+            for id_horario, cantidad in sobrantes.items():
+                self.db.execute(
+                    update(Horario)
+                    .where(Horario.id == id_horario)
+                    .values(cupo_ocupado=Horario.cupo_ocupado - cantidad)
+                )
+            if promociones:
+                self.db.execute(update(ListaEspera), promociones)
+            if rechazos:
+                self.db.execute(update(ListaEspera), rechazos)
+        except Exception:
+            self.db.rollback()
+            raise
+
+        self.db.commit()
+        return {"promovidas": len(promociones), "rechazadas": len(rechazos)}
+
+    def _tomar_cupo(self, id_horario: int, cantidad: int) -> int:
+        """
+        Toma hasta `cantidad` lugares del horario con reservar_cupo y devuelve cuántos tomó.
+        Si no alcanzan, reintenta con el cupo que informa el error hasta tomar algo o ver el horario lleno.
+        """
+        while cantidad > 0:
+            try:
+                reservar_cupo(self.db, id_horario, cantidad)
+                return cantidad
+            except CupoInsuficienteError as e:
+                cantidad = min(cantidad - 1, e.cupo_disponible)
+            except EstadoHorarioInvalidoError:
+                return 0
+        return 0
+
+class PromotorListaEspera(TareaPeriodica):
+    """
+    Promueve la lista de espera cada `intervalo` segundos o apenas se le avisa
+    (nueva entrada, cupo liberado). Cada pasada procesa lotes hasta que no queda nada promovible.
+    """
+    nombre = "promotor-lista-espera"
+
+    def __init__(self, fabrica_sesion: Callable[[], Session], intervalo: float = INTERVALO_LISTA_ESPERA):
+        super().__init__(fabrica_sesion, intervalo)
+
+    def pasada(self, db: Session) -> bool:
+        return ListaEsperaService(db).promover()["promovidas"] > 0
+
+# El promotor corre en su propio hilo, siempre con el motor sincrónico
+promotor_lista_espera = PromotorListaEspera(SessionLocal)
+
+def unirse_lista_espera(db: Session, id_horario: int, visitantes: List[dict], acepta_terminos: bool = True) -> List[EntradaListaEspera]:
+    """Función helper para anotarse en la lista de espera"""
+    return ListaEsperaService(db).unirse(id_horario=id_horario, visitantes=visitantes, acepta_terminos=acepta_terminos)
+
+def get_entrada_lista_espera(db: Session, id_entrada: int):
+    return ListaEsperaService(db).get_entrada(id_entrada)
+
+def promover_lista_espera(db: Session) -> Dict[str, int]:
+    """Una pasada del promotor (para correrla a mano desde la API)"""
+    return ListaEsperaService(db).promover()
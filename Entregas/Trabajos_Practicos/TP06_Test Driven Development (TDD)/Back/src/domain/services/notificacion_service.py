@@ -0,0 +1,255 @@
+# Difusión en vivo de cambios de cupo/estado de horarios (SSE y WebSocket)
+# Los cambios llegan de la base (pg_notify del trigger de horario, ver EscuchaCupos) y se
+# reparten a los suscriptores de este worker
+import asyncio
+import json
+import logging
+import secrets
+import select
+import socket
+import threading
+from collections import deque
+from operator import itemgetter
+from typing import Deque, Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import create_engine
+from sqlalchemy.pool import NullPool
+from config_db import ESCUCHA_CUPOS, REINTENTO_ESCUCHA_CUPOS
+from src.domain.database import DATABASE_URL, OPCIONES_SERVIDOR
+
+logger = logging.getLogger(__name__)
+
+HISTORIAL_CUPOS = 1024  # eventos que se guardan para reanudar desde un id de evento
+ESPERA_LATIDO_S = 15.0  # sin eventos, cada cuánto se manda un latido (detecta clientes caídos)
+
+class SuscripcionCupos:
+    """
+    Eventos pendientes de un suscriptor, agrupados por horario.
+
+    Cada delta reemplaza al anterior del mismo horario, así un cliente lento recibe el
+    último estado de cada horario en lugar de acumular una cola: la memoria por suscriptor
+    queda acotada por la cantidad de horarios y el productor nunca espera al consumidor.
+    `reiniciar` indica que se perdieron eventos: el cliente debe volver a pedir /horarios.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, id_inicial: str):
+        self.id_inicial = id_inicial
+        self.reiniciar = False
+        self._loop = loop
+        self._lock = threading.Lock()
+        self._pendientes: Dict[int, Tuple[int, str, dict]] = {}
+        self._despertar = asyncio.Event()
+
+    def _agregar(self, seq: int, id_evento: str, delta: dict):
+        """Se llama desde cualquier hilo; despierta al consumidor en su event loop"""
+        with self._lock:
+            self._pendientes[delta["id"]] = (seq, id_evento, delta)
+        self._loop.call_soon_threadsafe(self._despertar.set)
+
+    def _reiniciar(self, id_actual: str):
+        """Descarta lo pendiente y pide al cliente que recargue (se llama desde cualquier hilo)"""
+        with self._lock:
+            self._pendientes.clear()
+            self.reiniciar = True
+            self.id_inicial = id_actual
+        self._loop.call_soon_threadsafe(self._despertar.set)
+
+    def tomar_reinicio(self) -> Optional[str]:
+        """Si hay que reiniciar, el id desde el que vale la recarga (y baja la marca)"""
+        with self._lock:
+            if not self.reiniciar:
+                return None
+            self.reiniciar = False
+            return self.id_inicial
+
+    async def siguientes(self, espera: float = ESPERA_LATIDO_S) -> List[Tuple[str, dict]]:
+        """Espera eventos y devuelve los pendientes (id_evento, delta) en orden ([] si pasó `espera`)"""
+        try:
+            await asyncio.wait_for(self._despertar.wait(), espera)
+        except asyncio.TimeoutError:
+            return []
+        self._despertar.clear()
+        with self._lock:
+            pendientes, self._pendientes = self._pendientes, {}
+        return [(id_evento, delta) for _, id_evento, delta in sorted(pendientes.values(), key=itemgetter(0))]
+
+class CanalCupos:
+    """
+    Numera los cambios, guarda los últimos HISTORIAL_CUPOS y los reparte a los suscriptores.
+
+    Cada worker numera por su cuenta, así que el id de evento lleva el origen de la numeración
+    ("<origen>-<seq>"): un cliente que reanuda contra otro worker, otro arranque o después de
+    un reinicio del canal recibe siempre `reset` en lugar de eventos que no le corresponden.
+    """
+
+    def __init__(self, historial: int = HISTORIAL_CUPOS):
+        self.origen = secrets.token_hex(4)
+        self._secuencia = 0
+        self._historial: Deque[Tuple[int, dict]] = deque(maxlen=historial)
+        self._suscripciones: Set[SuscripcionCupos] = set()
+        self._lock = threading.Lock()
+
+    @property
+    def secuencia(self) -> int:
+        return self._secuencia
+
+    def id_evento(self, seq: int) -> str:
+        return f"{self.origen}-{seq}"
+
+    @property
+    def ultimo_id(self) -> str:
+        return self.id_evento(self._secuencia)
+
+    def publicar(self, deltas: Iterable[dict]):
+        """Publicar deltas {id, cupo_ocupado, estado} ya confirmados en la base"""
+        with self._lock:
+            for delta in deltas:
+                self._secuencia += 1
+                self._historial.append((self._secuencia, delta))
+                id_evento = self.id_evento(self._secuencia)
+                for suscripcion in list(self._suscripciones):
+                    try:
+                        suscripcion._agregar(self._secuencia, id_evento, delta)
+                    except RuntimeError:
+                        # El event loop del suscriptor ya no existe
+                        self._suscripciones.discard(suscripcion)
+
+    def reiniciar(self):
+        """
+        Se perdieron eventos (se cortó la escucha de la base): nuevo origen, historial vacío
+        y `reset` a todos los suscriptores conectados
+        """
+        with self._lock:
+            self.origen = secrets.token_hex(4)
+            self._historial.clear()
+            for suscripcion in list(self._suscripciones):
+                try:
+                    suscripcion._reiniciar(self.ultimo_id)
+                except RuntimeError:
+                    self._suscripciones.discard(suscripcion)
+
+    def suscribir(self, desde: Optional[str] = None) -> SuscripcionCupos:
+        """
+        Registrar un suscriptor en el event loop actual. Con `desde` (un id de evento) se
+        reenvían los eventos posteriores; si es de otro origen o ya no están en el historial
+        se marca `reiniciar`.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            suscripcion = SuscripcionCupos(loop, self.ultimo_id)
+            if desde is not None:
+                origen, _, seq = desde.rpartition("-")
+                primera = self._historial[0][0] if self._historial else self._secuencia + 1
+                if origen != self.origen or not seq.isdigit() or not primera - 1 <= int(seq) <= self._secuencia:
+                    suscripcion.reiniciar = True
+                else:
+                    for seq_evento, delta in self._historial:
+                        if seq_evento > int(seq):
+                            suscripcion._agregar(seq_evento, self.id_evento(seq_evento), delta)
+            self._suscripciones.add(suscripcion)
+        return suscripcion
+
+    def desuscribir(self, suscripcion: SuscripcionCupos):
+        with self._lock:
+            self._suscripciones.discard(suscripcion)
+
+    @property
+    def cantidad_suscriptores(self) -> int:
+        return len(self._suscripciones)
+
+canal_cupos = CanalCupos()
+
+class EscuchaCupos:
+    """
+    Hilo que escucha (LISTEN) los cambios que el trigger trg_horario_notificar_cupo avisa con
+    pg_notify y los publica en `canal`. Postgres los entrega al confirmarse cada transacción,
+    así cada worker reparte todos los cambios: los suyos, los de otros workers y los hechos
+    por SQL directo. Usa una conexión propia fuera del pool (queda tomada escuchando). Si la
+    conexión se corta reintenta cada `reintento` segundos y, al volver, reinicia el canal:
+    lo confirmado mientras tanto no llegó.
+    """
+    nombre = "escucha-cupos"
+
+    def __init__(self, canal: CanalCupos, activa: bool = ESCUCHA_CUPOS, url: str = DATABASE_URL,
+                 reintento: float = REINTENTO_ESCUCHA_CUPOS, timeout: int = 5):
+        self.canal = canal
+        self.activa = activa
+        self.reintento = reintento
+        self.motor = create_engine(
+            url, poolclass=NullPool,
+            connect_args={
+                "connect_timeout": timeout,
+                "options": " ".join(f"-c {clave}={valor}" for clave, valor in OPCIONES_SERVIDOR.items())
+            }
+        )
+        self.conectada = threading.Event()
+        self._detener = threading.Event()
+        # detener() escribe en el par de sockets para despertar al select() enseguida
+        self._despertador, self._despertar = socket.socketpair()
+        self._despertador.setblocking(False)
+        self._hilo = None
+
+    def iniciar(self):
+        if not self.activa or self._hilo is not None:
+            return
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._ciclo, name=self.nombre, daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        if self._hilo is None:
+            return
+        self._detener.set()
+        self._despertar.send(b"\0")
+        self._hilo.join()
+        self._hilo = None
+        try:
+            while self._despertador.recv(64):
+                pass
+        except BlockingIOError:
+            pass
+
+    def _ciclo(self):
+        perdida = False
+        while not self._detener.is_set():
+            try:
+                conexion = self.motor.raw_connection()
+            except Exception as e:
+                logger.warning("Escucha de cupos: no se pudo conectar: %s", e)
+                perdida = True
+                self._detener.wait(self.reintento)
+                continue
+            try:
+                self._escuchar(conexion.driver_connection, reiniciar=perdida)
+                conexion.close()
+            except Exception:
+                logger.exception("Escucha de cupos: se cortó la conexión")
+                # Conexión caída: se descarta sin intentar el rollback del pool
+                conexion.invalidate()
+            finally:
+                self.conectada.clear()
+            perdida = True
+            self._detener.wait(self.reintento)
+
+    def _escuchar(self, conexion, reiniciar: bool):
+        conexion.autocommit = True
+        cursor = conexion.cursor()
+        cursor.execute("SELECT current_schema()")
+        cursor.execute(f'LISTEN "cupos_{cursor.fetchone()[0]}"')
+        if reiniciar:
+            self.canal.reiniciar()
+        self.conectada.set()
+        while not self._detener.is_set():
+            listos, _, _ = select.select([conexion, self._despertador], [], [], ESPERA_LATIDO_S)
+            if self._despertador in listos:
+                break
+            if not listos:
+                # Sin avisos: se prueba la conexión para detectar un corte
+                cursor.execute("SELECT 1")
+                continue
+            conexion.poll()
+            deltas = [json.loads(aviso.payload) for aviso in conexion.notifies]
+            conexion.notifies.clear()
+            if deltas:
+                self.canal.publicar(deltas)
+
+escucha_cupos = EscuchaCupos(canal_cupos)
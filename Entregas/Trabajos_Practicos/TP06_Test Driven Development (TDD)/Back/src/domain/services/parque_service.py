@@ -1,9 +1,28 @@
 # Lógica de negocio para el parque
 # Funciones para manejar información del parque, estado de apertura, etc.
 # Puede incluir llamadas a procedimientos almacenados
+from sqlalchemy.orm import Session
+from src.domain.models import Parque
+from src.domain.schemas import ParqueCreate
 
-# def get_parque_info(db):
-#     # Implementar lógica
+def get_parque(db: Session) -> Parque:
+    """Obtener la información del parque (hay un único registro)"""
+    return db.query(Parque).first()
 
-# def update_parque_status(abierto, db):
-#     # Implementar lógica
\ No newline at end of file
+def create_parque(db: Session, parque: ParqueCreate) -> Parque:
+    """Crear el registro del parque"""
+    db_parque = Parque(**parque.dict())
+    db.add(db_parque)
+    db.commit()
+    db.refresh(db_parque)
+    return db_parque
+
+def update_parque(db: Session, parque: ParqueCreate) -> Parque:
+    """Actualizar horarios y estado de apertura del parque"""
+    db_parque = db.query(Parque).first()
+    if db_parque:
+        for key, value in parque.dict().items():
+            setattr(db_parque, key, value)
+        db.commit()
+        db.refresh(db_parque)
+    return db_parque
@@ -0,0 +1,136 @@
+# Lógica de negocio para reservas temporales de cupo
+# Apartar lugares mientras el visitante completa la confirmación y devolverlos al vencer
+import secrets
+from collections import defaultdict
+from datetime import timedelta
+from typing import Callable, List
+from sqlalchemy import Integer, column, delete, func, select, update, values
+from sqlalchemy.orm import Session
+from config_db import INTERVALO_RESERVAS, LOTE_RESERVAS, TTL_RESERVA
+from src.domain.database import SessionLocal
+from src.domain.models import Horario, ReservaTemporal
+from src.domain.exceptions import EstadoHorarioInvalidoError, HorarioNoEncontradoError
+from src.domain.schemas import ReservaTemporal as ReservaTemporalSchema
+from src.domain.services.horario_service import reservar_cupo
+from src.domain.services.lista_espera_service import promotor_lista_espera
+from src.domain.services.tarea_periodica import TareaPeriodica
+
+class ReservaService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def reservar(self, id_horario: int, cantidad: int, ttl: int = TTL_RESERVA) -> ReservaTemporalSchema:
+        """
+        Aparta `cantidad` lugares del horario por `ttl` segundos y devuelve el token para
+        canjearlos en la inscripción. El cupo se toma con el mismo UPDATE condicional de
+        la inscripción, así que /horarios ya muestra esos lugares como ocupados.
+        """
+        if cantidad < 1:
+            raise ValueError("La cantidad de lugares a reservar debe ser al menos 1")
+        horario = self.db.get(Horario, id_horario)
+        if horario is None:
+            raise HorarioNoEncontradoError(id_horario)
+        if horario.estado != "activo":
+            raise EstadoHorarioInvalidoError(horario.estado)
+
+        try:
+            reservar_cupo(self.db, id_horario, cantidad)
+            fila = self.db.execute(
+                ReservaTemporal.__table__.insert()
+                .values(
+                    token=secrets.token_urlsafe(24),
+                    id_horario=id_horario,
+                    cantidad=cantidad,
+                    vence_en=func.now() + timedelta(seconds=ttl)
+                )
+                .returning(ReservaTemporal.token, ReservaTemporal.id_horario, ReservaTemporal.cantidad, ReservaTemporal.vence_en)
+            ).one()
+        except Exception:
+            self.db.rollback()
+            raise
+
+        self.db.commit()
+        return ReservaTemporalSchema.model_validate(fila)
+
+    def _devolver(self, reservas) -> int:
+        """
+        Borra las reservas elegidas por `reservas` (select de ids) y devuelve sus lugares.
+
+        Las reservas se toman con SKIP LOCKED: una que se está canjeando en ese momento
+        queda para el canje. Después se bloquean los horarios en orden de id (como la
+        inscripción) y un único UPDATE descuenta lo liberado en cada uno.
+        Devuelve la cantidad de reservas liberadas.
+        """
+        try:
+            liberadas = self.db.execute(
+                delete(ReservaTemporal)
+                .where(ReservaTemporal.id.in_(reservas.with_for_update(skip_locked=True)))
+                .returning(ReservaTemporal.id_horario, ReservaTemporal.cantidad)
+                .execution_options(synchronize_session=False)
+            ).all()
+            if not liberadas:
+                self.db.rollback()
+                return 0
+
+            por_horario = defaultdict(int)
+            for id_horario, cantidad in liberadas:
+                por_horario[id_horario] += cantidad
+            self.db.execute(
+                select(Horario.id).where(Horario.id.in_(por_horario)).order_by(Horario.id).with_for_update()
+            )
+            liberar = values(column("id", Integer), column("cantidad", Integer), name="liberar").data(
+                sorted(por_horario.items())
+            )
+            horario = Horario.__table__
+            self.db.execute(
+                update(horario)
+                .where(horario.c.id == liberar.c.id)
+                .values(cupo_ocupado=func.greatest(horario.c.cupo_ocupado - liberar.c.cantidad, 0))
+            )
+        except Exception:
+            self.db.rollback()
+            raise
+
+        self.db.commit()
+        # Los lugares devueltos pueden ser para la lista de espera
+        promotor_lista_espera.avisar()
+        return len(liberadas)
+
+    def liberar(self, token: str) -> bool:
+        """Devolver antes de tiempo los lugares de una reserva (el visitante abandonó la confirmación)"""
+        return self._devolver(select(ReservaTemporal.id).where(ReservaTemporal.token == token)) > 0
+
+    def liberar_vencidas(self, lote: int = LOTE_RESERVAS) -> int:
+        """Devolver en bloque el cupo de hasta `lote` reservas vencidas, las más viejas primero"""
+        return self._devolver(
+            select(ReservaTemporal.id)
+            .where(ReservaTemporal.vence_en <= func.now())
+            .order_by(ReservaTemporal.vence_en)
+            .limit(lote)
+        )
+
+class LiberadorReservas(TareaPeriodica):
+    """Devuelve al cupo las reservas vencidas cada `intervalo` segundos, en lotes de `lote`"""
+    nombre = "liberador-reservas"
+
+    def __init__(self, fabrica_sesion: Callable[[], Session], intervalo: float = INTERVALO_RESERVAS,
+                 lote: int = LOTE_RESERVAS):
+        super().__init__(fabrica_sesion, intervalo)
+        self.lote = lote
+
+    def pasada(self, db: Session) -> bool:
+        # Un lote completo indica que pueden quedar más vencidas
+        return ReservaService(db).liberar_vencidas(self.lote) >= self.lote
+
+liberador_reservas = LiberadorReservas(SessionLocal)
+
+def crear_reserva(db: Session, id_horario: int, cantidad: int) -> ReservaTemporalSchema:
+    """Función helper para apartar lugares de un horario"""
+    return ReservaService(db).reservar(id_horario=id_horario, cantidad=cantidad)
+
+def liberar_reserva(db: Session, token: str) -> bool:
+    return ReservaService(db).liberar(token)
+
+def liberar_reservas_vencidas(db: Session) -> int:
+    """Una pasada del liberador (para correrla a mano desde la API)"""
+    return ReservaService(db).liberar_vencidas()
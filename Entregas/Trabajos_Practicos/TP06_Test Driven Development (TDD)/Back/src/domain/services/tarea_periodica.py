@@ -0,0 +1,58 @@
+# Hilos de fondo de cada worker (promoción de la lista de espera, vencimiento de reservas)
+import logging
+import threading
+from abc import ABC, abstractmethod
+from typing import Callable
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+class TareaPeriodica(ABC):
+    """
+    Hilo que corre `pasada` cada `intervalo` segundos o apenas se le avisa. Cada ciclo
+    abre una sesión y repite la pasada mientras devuelva True (quedó trabajo pendiente).
+    Las subclases definen `nombre` y `pasada`.
+    """
+    nombre = "tarea-periodica"
+
+    def __init__(self, fabrica_sesion: Callable[[], Session], intervalo: float):
+        self.fabrica_sesion = fabrica_sesion
+        self.intervalo = intervalo
+        self._aviso = threading.Event()
+        self._detener = threading.Event()
+        self._hilo = None
+
+    @abstractmethod
+    def pasada(self, db: Session) -> bool:
+        """Una pasada de trabajo; True si quedó trabajo pendiente (se repite enseguida)"""
+
+    def avisar(self):
+        self._aviso.set()
+
+    def iniciar(self):
+        if self.intervalo <= 0 or self._hilo is not None:
+            return
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._ciclo, name=self.nombre, daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        if self._hilo is None:
+            return
+        self._detener.set()
+        self._aviso.set()
+        self._hilo.join()
+        self._hilo = None
+
+    def _ciclo(self):
+        while not self._detener.is_set():
+            self._aviso.wait(self.intervalo)
+            self._aviso.clear()
+            if self._detener.is_set():
+                break
+            try:
+                with self.fabrica_sesion() as db:
+                    while self.pasada(db) and not self._detener.is_set():
+                        pass
+            except Exception:
+                logger.exception("Error en %s", self.nombre)
@@ -0,0 +1,27 @@
+# Versiones de los recursos de catálogo (horarios, actividades, estados de horario)
+# Las mantiene la base (tabla version_catalogo, incrementada por triggers) y sirven para armar
+# ETags y validar caches en todos los workers
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from src.domain.models import VersionCatalogo
+
+RECURSOS_CATALOGO = ("horarios", "actividades", "estados-horario")
+
+# Suma de las ranuras de cada recurso, armada una sola vez
+_VERSIONES = {
+    "horarios": select(func.coalesce(func.sum(VersionCatalogo.horarios), 0)),
+    "actividades": select(func.coalesce(func.sum(VersionCatalogo.actividades), 0)),
+    "estados-horario": select(func.coalesce(func.sum(VersionCatalogo.estados_horario), 0)),
+}
+
+def leer_version(db: Session, recurso: str) -> int:
+    """
+    Versión confirmada del recurso. Cambia con cualquier modificación de horario, actividad o
+    estado_horario, venga de este worker o de otro, del ORM o de SQL directo. Leerla antes de
+    consultar los datos: un cambio que llegue en el medio deja la etiqueta vieja (un 200 de
+    más), nunca datos viejos con la etiqueta nueva.
+    """
+    return int(db.execute(_VERSIONES[recurso]).scalar_one())
+
+def etag_catalogo(recurso: str, version: int) -> str:
+    return f'"{recurso}-{version}"'
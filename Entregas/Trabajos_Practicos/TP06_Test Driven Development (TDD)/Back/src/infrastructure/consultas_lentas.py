@@ -0,0 +1,243 @@
+# Registro de sentencias SQL lentas (por proceso/worker)
+# Forma de la sentencia, tipos de los parámetros, duración, ruta y función de servicio que la
+# originó, y su plan (EXPLAIN) obtenido en un hilo aparte. Va a un archivo rotativo y se consulta
+# en GET /admin/consultas-lentas.
+import json
+import logging
+import queue
+import re
+import sys
+import threading
+from collections import Counter
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+from typing import Dict, List, Optional
+from sqlalchemy import create_engine
+from sqlalchemy.pool import NullPool
+from config_db import (
+    UMBRAL_CONSULTAS_LENTAS_MS, ARCHIVO_CONSULTAS_LENTAS, MAX_BYTES_CONSULTAS_LENTAS, COPIAS_CONSULTAS_LENTAS,
+    TIMEOUT_EXPLAIN_CONSULTAS_LENTAS
+)
+from src.domain.database import DATABASE_URL, OPCIONES_SERVIDOR, forma_sentencia, observadores_sentencias
+from src.infrastructure.metricas import ruta_en_curso
+
+logger = logging.getLogger(__name__)
+
+# Sólo estas sentencias tienen plan; EXPLAIN sin ANALYZE no las ejecuta
+_CON_PLAN = re.compile(r"^\s*(select|insert|update|delete|with)\b", re.IGNORECASE)
+# Parámetros posicionales de asyncpg ($1, $2...); el EXPLAIN se hace con psycopg2 (%s)
+_PARAMETRO_NUMERADO = re.compile(r"\$\d+")
+_MODULO_SERVICIOS = "src.domain.services."
+
+class _FormaLenta:
+    """Acumulado de una forma de sentencia lenta"""
+    __slots__ = ("veces", "tiempo_total", "tiempo_maximo", "tipos_parametros", "rutas", "funciones", "plan")
+
+    def __init__(self):
+        self.veces = 0
+        self.tiempo_total = 0.0
+        self.tiempo_maximo = 0.0
+        self.tipos_parametros = None
+        self.rutas: Counter = Counter()
+        self.funciones: Counter = Counter()
+        self.plan: Optional[str] = None
+
+def _tipos_parametros(parametros):
+    """Tipos de los valores, nunca los valores (pueden ser DNIs o nombres)"""
+    if isinstance(parametros, dict):
+        return {nombre: type(valor).__name__ for nombre, valor in parametros.items()}
+    if isinstance(parametros, (list, tuple)):
+        return [type(valor).__name__ for valor in parametros]
+    return None
+
+def _funcion_servicio() -> Optional[str]:
+    """Primera función de src.domain.services en la pila (vale también dentro de run_sync)"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        modulo = frame.f_globals.get("__name__", "")
+        if modulo.startswith(_MODULO_SERVICIOS):
+            return f"{modulo}.{frame.f_code.co_qualname}"
+        frame = frame.f_back
+    return None
+
+class RegistroConsultasLentas:
+    """
+    Observa cada sentencia que termina (observadores_sentencias en database.py) y encola las
+    que tardan `umbral_ms` o más. En el hilo del pedido sólo se arma el registro (forma de la
+    pila incluida); la forma normalizada, el EXPLAIN y la escritura del archivo se hacen en un
+    hilo propio, así una base lenta no se vuelve más lenta para el pedido. El plan se pide una
+    sola vez por forma, con los parámetros de la primera aparición, en una conexión propia
+    fuera del pool de la app (como ChequeoBase en salud.py): las sentencias lentas abundan
+    justo cuando el pool está agotado, y el EXPLAIN no debe quitarle una conexión a un pedido
+    ni quedarse esperando DB_POOL_TIMEOUT. `timeout` acota la conexión y el EXPLAIN.
+    """
+
+    def __init__(self, url: str = DATABASE_URL, umbral_ms: float = UMBRAL_CONSULTAS_LENTAS_MS,
+                 archivo: str = ARCHIVO_CONSULTAS_LENTAS, max_bytes: int = MAX_BYTES_CONSULTAS_LENTAS,
+                 copias: int = COPIAS_CONSULTAS_LENTAS, max_formas: int = 500, max_cola: int = 1000,
+                 timeout: int = TIMEOUT_EXPLAIN_CONSULTAS_LENTAS):
+        opciones = {**OPCIONES_SERVIDOR, "statement_timeout": timeout * 1000}
+        self.motor = create_engine(
+            url, poolclass=NullPool,
+            connect_args={
+                "connect_timeout": timeout,
+                "options": " ".join(f"-c {clave}={valor}" for clave, valor in opciones.items())
+            }
+        )
+        self.umbral_ms = umbral_ms
+        self.archivo = archivo
+        self.max_bytes = max_bytes
+        self.copias = copias
+        self.max_formas = max_formas
+        self.descartadas = 0
+        self._cola: queue.Queue = queue.Queue(maxsize=max_cola)
+        self._formas: Dict[str, _FormaLenta] = {}
+        self._lock = threading.Lock()
+        self._hilo = None
+        self._salida = None
+
+    def iniciar(self):
+        if self.umbral_ms <= 0 or self._hilo is not None:
+            return
+        self._salida = logging.getLogger(f"{__name__}.archivo.{id(self)}")
+        self._salida.propagate = False
+        self._salida.setLevel(logging.INFO)
+        self._salida.addHandler(
+            RotatingFileHandler(self.archivo, maxBytes=self.max_bytes, backupCount=self.copias, encoding="utf-8", delay=True)
+        )
+        self._hilo = threading.Thread(target=self._ciclo, name="consultas-lentas", daemon=True)
+        self._hilo.start()
+        observadores_sentencias.append(self.observar)
+
+    def detener(self):
+        if self._hilo is None:
+            return
+        observadores_sentencias.remove(self.observar)
+        self._cola.put(None)
+        self._hilo.join()
+        self._hilo = None
+        for handler in list(self._salida.handlers):
+            self._salida.removeHandler(handler)
+            handler.close()
+
+    def esperar(self):
+        """Bloquea hasta procesar todo lo encolado"""
+        self._cola.join()
+
+    def observar(self, sentencia: str, parametros, executemany: bool, duracion: float):
+        if duracion * 1000 < self.umbral_ms or sentencia.lstrip()[:7].upper() == "EXPLAIN":
+            return
+        if executemany and parametros:
+            parametros = parametros[0]
+        registro = {
+            "fecha": datetime.now(timezone.utc).isoformat(),
+            "sentencia": sentencia,
+            "parametros": parametros,
+            "duracion": duracion,
+            # Fuera de un pedido la sentencia es de una tarea de fondo (el hilo tiene su nombre)
+            "ruta": ruta_en_curso() or f"hilo {threading.current_thread().name}",
+            "funcion": _funcion_servicio(),
+        }
+        try:
+            self._cola.put_nowait(registro)
+        except queue.Full:
+            self.descartadas += 1
+
+    def _ciclo(self):
+        while True:
+            registro = self._cola.get()
+            try:
+                if registro is None:
+                    return
+                self._procesar(registro)
+            except Exception:
+                logger.exception("Error registrando una sentencia lenta")
+            finally:
+                self._cola.task_done()
+
+    def _procesar(self, registro: dict):
+        forma = forma_sentencia(registro["sentencia"])
+        tipos = _tipos_parametros(registro["parametros"])
+        with self._lock:
+            acumulado = self._formas.get(forma)
+            pedir_plan = acumulado is None or acumulado.plan is None
+        plan = self._explicar(registro["sentencia"], registro["parametros"]) if pedir_plan else None
+
+        with self._lock:
+            acumulado = self._formas.get(forma)
+            if acumulado is None:
+                if len(self._formas) >= self.max_formas:
+                    # Se olvida la forma que menos tiempo acumuló
+                    del self._formas[min(self._formas, key=lambda f: self._formas[f].tiempo_total)]
+                acumulado = self._formas[forma] = _FormaLenta()
+            acumulado.veces += 1
+            acumulado.tiempo_total += registro["duracion"]
+            acumulado.tiempo_maximo = max(acumulado.tiempo_maximo, registro["duracion"])
+            acumulado.tipos_parametros = tipos
+            acumulado.rutas[registro["ruta"]] += 1
+            if registro["funcion"]:
+                acumulado.funciones[registro["funcion"]] += 1
+            if acumulado.plan is None:
+                acumulado.plan = plan
+            plan = acumulado.plan
+
+        self._salida.info(json.dumps({
+            "fecha": registro["fecha"],
+            "duracion_ms": round(registro["duracion"] * 1000, 3),
+            "ruta": registro["ruta"],
+            "funcion": registro["funcion"],
+            "forma": forma,
+            "tipos_parametros": tipos,
+            "plan": plan,
+        }, ensure_ascii=False))
+
+    def _explicar(self, sentencia: str, parametros) -> Optional[str]:
+        """EXPLAIN (ANALYZE off) con los mismos parámetros, en una conexión nueva (NullPool)"""
+        if not _CON_PLAN.match(sentencia):
+            return None
+        if isinstance(parametros, (list, tuple)) and _PARAMETRO_NUMERADO.search(sentencia):
+            sentencia = _PARAMETRO_NUMERADO.sub("%s", sentencia.replace("%", "%%"))
+        # Conexión DBAPI directa: el EXPLAIN no pasa por los eventos del Engine
+        try:
+            conexion = self.motor.raw_connection()
+        except Exception as e:
+            return f"sin plan: {e}".strip()
+        try:
+            cursor = conexion.cursor()
+            cursor.execute("EXPLAIN (ANALYZE off) " + sentencia, parametros or None)
+            return "\n".join(fila[0] for fila in cursor.fetchall())
+        except Exception as e:
+            return f"sin plan: {e}".strip()
+        finally:
+            conexion.rollback()
+            conexion.close()
+
+    def top(self, limite: int = 20) -> List[dict]:
+        """Las formas que más tiempo acumularon como sentencias lentas"""
+        with self._lock:
+            formas = sorted(self._formas.items(), key=lambda item: item[1].tiempo_total, reverse=True)[:limite]
+            return [
+                {
+                    "forma": forma,
+                    "veces": acumulado.veces,
+                    "tiempo_total_ms": round(acumulado.tiempo_total * 1000, 3),
+                    "tiempo_promedio_ms": round(acumulado.tiempo_total / acumulado.veces * 1000, 3),
+                    "tiempo_maximo_ms": round(acumulado.tiempo_maximo * 1000, 3),
+                    "tipos_parametros": acumulado.tipos_parametros,
+                    "rutas": dict(acumulado.rutas.most_common()),
+                    "funciones": dict(acumulado.funciones.most_common()),
+                    "plan": acumulado.plan,
+                }
+                for forma, acumulado in formas
+            ]
+
+    def estado(self, limite: int = 20) -> dict:
+        return {
+            "activo": self._hilo is not None,
+            "umbral_ms": self.umbral_ms,
+            "archivo": self.archivo,
+            "descartadas": self.descartadas,
+            "formas": self.top(limite),
+        }
+
+registro_consultas_lentas = RegistroConsultasLentas()
@@ -0,0 +1,57 @@
+# Traducción de excepciones de dominio a respuestas HTTP, compartida por los routers
+from fastapi import HTTPException
+from typing import List
+from src.domain.exceptions import (
+    CupoInsuficienteError, TerminosNoAceptadosError, HorarioNoEncontradoError, VisitanteNoEncontradoError,
+    InscripcionDuplicadaError, TalleRequeridoError, EdadMinimaRequeridaError, EstadoHorarioInvalidoError,
+    YaEnListaEsperaError, HorarioConCupoError, ReservaNoValidaError
+)
+from src.domain.schemas import InscripcionUnificadaCreateRequest
+from src.infrastructure.metricas import metricas_http
+
+def visitantes_a_dict(inscripcion: InscripcionUnificadaCreateRequest) -> List[dict]:
+    """Convertir visitantes a formato dict para el servicio"""
+    return [
+        {
+            "nombre": v.nombre,
+            "dni": v.dni,
+            "edad": v.edad,
+            "talle": v.talle
+        }
+        for v in inscripcion.visitantes
+    ]
+
+def error_a_http(e: Exception) -> HTTPException:
+    """Traduce las excepciones de dominio a su código HTTP y las cuenta en /metrics"""
+    if isinstance(e, HTTPException):
+        return e
+    error = traducir_error(e)
+    metricas_http.registrar_error(type(e).__name__, error.status_code)
+    return error
+
+def traducir_error(e: Exception) -> HTTPException:
+    if isinstance(e, HorarioNoEncontradoError):
+        return HTTPException(status_code=404, detail="Horario no encontrado")
+    if isinstance(e, VisitanteNoEncontradoError):
+        return HTTPException(status_code=404, detail="Visitante no encontrado")
+    if isinstance(e, CupoInsuficienteError):
+        return HTTPException(status_code=400, detail="No hay cupo disponible")
+    if isinstance(e, TerminosNoAceptadosError):
+        return HTTPException(status_code=400, detail="Debe aceptar los términos y condiciones")
+    if isinstance(e, InscripcionDuplicadaError):
+        return HTTPException(status_code=409, detail=str(e))
+    if isinstance(e, YaEnListaEsperaError):
+        return HTTPException(status_code=409, detail=str(e))
+    if isinstance(e, HorarioConCupoError):
+        return HTTPException(status_code=409, detail=str(e))
+    if isinstance(e, ReservaNoValidaError):
+        return HTTPException(status_code=410, detail=str(e))
+    if isinstance(e, TalleRequeridoError):
+        return HTTPException(status_code=400, detail=f"La actividad {e.nombre_actividad} requiere talle pero el visitante no lo tiene asignado")
+    if isinstance(e, EdadMinimaRequeridaError):
+        return HTTPException(status_code=400, detail=str(e))
+    if isinstance(e, EstadoHorarioInvalidoError):
+        return HTTPException(status_code=400, detail=str(e))
+    if isinstance(e, ValueError):
+        return HTTPException(status_code=400, detail=str(e))
+    return HTTPException(status_code=500, detail=f"Error interno del servidor: {str(e)}")
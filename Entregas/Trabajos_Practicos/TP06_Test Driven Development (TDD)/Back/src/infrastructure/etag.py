@@ -0,0 +1,18 @@
+# Soporte de ETag / If-None-Match para endpoints de lectura
+from fastapi import Request, Response
+
+def coincide_etag(request: Request, etag: str) -> bool:
+    """True si alguna de las etiquetas de If-None-Match es `etag` (comparación débil, RFC 9110)"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    etiquetas = [e.strip() for e in if_none_match.split(",")]
+    return "*" in etiquetas or etag in (e.removeprefix("W/") for e in etiquetas)
+
+def no_modificado(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+def agregar_etag(response: Response, etag: str):
+    """no-cache: el cliente puede guardar la respuesta pero debe revalidarla con el ETag"""
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
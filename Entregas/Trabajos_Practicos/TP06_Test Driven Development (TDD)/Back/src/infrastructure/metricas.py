@@ -0,0 +1,229 @@
+# Métricas HTTP por ruta en formato Prometheus (por proceso/worker)
+# y sentencias SQL por pedido con aviso de posibles N+1
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Tuple
+from config_db import CONSULTAS_EN_HEADERS, UMBRAL_CONSULTAS_REPETIDAS
+from src.domain.database import ConsultasPedido, consultas_pedido
+
+logger = logging.getLogger(__name__)
+
+# Límites superiores (segundos) de los buckets del histograma de latencia
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class _SerieLatencia:
+    __slots__ = ("buckets", "suma")
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS_LATENCIA) + 1)  # el último es +Inf
+        self.suma = 0.0
+
+class _Fragmento:
+    """Contadores que escribe un solo hilo"""
+
+    def __init__(self):
+        self.pedidos: Dict[Tuple[str, str, int], int] = defaultdict(int)
+        self.latencias: Dict[Tuple[str, str], _SerieLatencia] = defaultdict(_SerieLatencia)
+        self.errores: Dict[Tuple[str, int], int] = defaultdict(int)
+
+class MetricasHttp:
+    """
+    Contadores de pedidos por ruta/método/status, histograma de latencia por ruta y
+    errores de dominio por tipo.
+
+    Cada hilo escribe en su propio fragmento (threading.local), así registrar un pedido no
+    toma ningún lock: el middleware corre en el hilo del event loop y los errores que se
+    traducen dentro del threadpool van a fragmentos de esos hilos. El lock sólo se usa al
+    crear un fragmento nuevo y al exportar, que suma todos los fragmentos.
+
+    El threadpool reemplaza los hilos ociosos, así que al exportar los fragmentos de hilos
+    que ya terminaron (nadie más los escribe) se suman a un total retirado y se descartan:
+    la lista no crece más que la cantidad de hilos vivos.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._fragmentos: List[Tuple[threading.Thread, _Fragmento]] = []
+        self._retirado = _Fragmento()
+        self._lock = threading.Lock()
+
+    def _fragmento(self) -> _Fragmento:
+        fragmento = getattr(self._local, "fragmento", None)
+        if fragmento is None:
+            fragmento = self._local.fragmento = _Fragmento()
+            with self._lock:
+                self._fragmentos.append((threading.current_thread(), fragmento))
+        return fragmento
+
+    def cantidad_fragmentos(self) -> int:
+        with self._lock:
+            return len(self._fragmentos)
+
+    def registrar_pedido(self, metodo: str, ruta: str, status: int, duracion: float):
+        fragmento = self._fragmento()
+        fragmento.pedidos[(metodo, ruta, status)] += 1
+        serie = fragmento.latencias[(metodo, ruta)]
+        serie.buckets[bisect_left(BUCKETS_LATENCIA, duracion)] += 1
+        serie.suma += duracion
+
+    def registrar_error(self, tipo: str, status: int):
+        """Error de dominio traducido a una respuesta HTTP (ver errores.error_a_http)"""
+        self._fragmento().errores[(tipo, status)] += 1
+
+    def _sumar(self):
+        total = _Fragmento()
+        with self._lock:
+            vivos = []
+            for hilo, fragmento in self._fragmentos:
+                if hilo.is_alive():
+                    vivos.append((hilo, fragmento))
+                else:
+                    _acumular(self._retirado, fragmento)
+            self._fragmentos = vivos
+            _acumular(total, self._retirado)
+        for _, fragmento in vivos:
+            _acumular(total, fragmento)
+        return total.pedidos, total.latencias, total.errores
+
+    def exportar(self) -> str:
+        """Texto de exposición de Prometheus (versión 0.0.4)"""
+        pedidos, latencias, errores = self._sumar()
+        lineas = [
+            "# HELP http_requests_total Pedidos HTTP atendidos por método, ruta y status.",
+            "# TYPE http_requests_total counter",
+        ]
+        for (metodo, ruta, status), valor in sorted(pedidos.items()):
+            lineas.append(f'http_requests_total{{method="{metodo}",route="{_escapar(ruta)}",status="{status}"}} {valor}')
+
+        lineas += [
+            "# HELP http_request_duration_seconds Latencia de los pedidos HTTP por método y ruta.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (metodo, ruta), serie in sorted(latencias.items()):
+            etiquetas = f'method="{metodo}",route="{_escapar(ruta)}"'
+            acumulado = 0
+            for limite, cantidad in zip(BUCKETS_LATENCIA + (float("inf"),), serie.buckets):
+                acumulado += cantidad
+                le = "+Inf" if limite == float("inf") else repr(limite)
+                lineas.append(f'http_request_duration_seconds_bucket{{{etiquetas},le="{le}"}} {acumulado}')
+            lineas.append(f"http_request_duration_seconds_sum{{{etiquetas}}} {serie.suma}")
+            lineas.append(f"http_request_duration_seconds_count{{{etiquetas}}} {acumulado}")
+
+        lineas += [
+            "# HELP parque_errores_dominio_total Errores de dominio devueltos como respuesta HTTP, por tipo y status.",
+            "# TYPE parque_errores_dominio_total counter",
+        ]
+        for (tipo, status), valor in sorted(errores.items()):
+            lineas.append(f'parque_errores_dominio_total{{tipo="{tipo}",status="{status}"}} {valor}')
+        return "\n".join(lineas) + "\n"
+
+def _acumular(destino: _Fragmento, fragmento: _Fragmento):
+    # list(): el hilo dueño puede agregar claves mientras se recorre
+    for clave, valor in list(fragmento.pedidos.items()):
+        destino.pedidos[clave] += valor
+    for clave, valor in list(fragmento.errores.items()):
+        destino.errores[clave] += valor
+    for clave, serie in list(fragmento.latencias.items()):
+        acumulada = destino.latencias[clave]
+        acumulada.buckets = [a + b for a, b in zip(acumulada.buckets, serie.buckets)]
+        acumulada.suma += serie.suma
+
+def _escapar(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace('"', '\\"')
+
+metricas_http = MetricasHttp()
+
+def _ruta(scope) -> str:
+    return getattr(scope.get("route"), "path", "sin_ruta")
+
+# Scope ASGI del pedido en curso (lo fija ConsultasMiddleware). Starlette completa "route" en el
+# mismo dict al rutear, así que desde el endpoint ya se ve la plantilla de la ruta.
+pedido_http: ContextVar[Optional[dict]] = ContextVar("pedido_http", default=None)
+
+def ruta_en_curso() -> Optional[str]:
+    """Método y plantilla de ruta del pedido en curso ("POST /inscripciones/"), o None fuera de un pedido"""
+    scope = pedido_http.get()
+    return f"{scope['method']} {_ruta(scope)}" if scope is not None else None
+
+class MetricasMiddleware:
+    """
+    Middleware ASGI que mide cada pedido HTTP. La ruta es la plantilla de FastAPI
+    (/lista-espera/{id_entrada}), no la URL, para que la cantidad de series no crezca
+    con los ids; lo que no coincide con ninguna ruta se agrupa en "sin_ruta".
+    """
+
+    def __init__(self, app, metricas: MetricasHttp = metricas_http):
+        self.app = app
+        self.metricas = metricas
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500  # si la app falla sin responder
+        inicio = time.perf_counter()
+
+        async def enviar(mensaje):
+            nonlocal status
+            if mensaje["type"] == "http.response.start":
+                status = mensaje["status"]
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            self.metricas.registrar_pedido(scope["method"], _ruta(scope), status, time.perf_counter() - inicio)
+
+# Funciones (método, ruta, consultas) que se llaman al terminar cada pedido (los tests las usan
+# para el presupuesto de consultas)
+observadores_consultas: List[Callable[[str, str, ConsultasPedido], None]] = []
+
+class ConsultasMiddleware:
+    """
+    Cuenta las sentencias SQL y el tiempo en la base de cada pedido HTTP (eventos del Engine
+    en database.py). Con DB_CONSULTAS_HEADERS agrega X-DB-Consultas, X-DB-Tiempo-ms y
+    Server-Timing (lo hecho hasta que empieza la respuesta). Si una misma forma de sentencia
+    se repite DB_CONSULTAS_REPETIDAS veces o más en el pedido, lo deja en el log: suele ser
+    un N+1 (una consulta por fila en lugar de una por lote).
+    """
+
+    def __init__(self, app, en_headers: bool = CONSULTAS_EN_HEADERS, umbral_repetidas: int = UMBRAL_CONSULTAS_REPETIDAS):
+        self.app = app
+        self.en_headers = en_headers
+        self.umbral_repetidas = umbral_repetidas
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        consultas = ConsultasPedido()
+        token = consultas_pedido.set(consultas)
+        token_pedido = pedido_http.set(scope)
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start" and self.en_headers:
+                mensaje["headers"] = list(mensaje.get("headers", [])) + [
+                    (b"x-db-consultas", str(consultas.cantidad).encode()),
+                    (b"x-db-tiempo-ms", f"{consultas.tiempo * 1000:.2f}".encode()),
+                    (b"server-timing", f"db;desc=\"{consultas.cantidad} sentencias\";dur={consultas.tiempo * 1000:.2f}".encode()),
+                ]
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            consultas_pedido.reset(token)
+            pedido_http.reset(token_pedido)
+            metodo, ruta = scope["method"], _ruta(scope)
+            logger.debug("%s %s: %d sentencias SQL, %.2f ms", metodo, ruta, consultas.cantidad, consultas.tiempo * 1000)
+            if self.umbral_repetidas > 0:
+                for forma, veces in consultas.repetidas(self.umbral_repetidas):
+                    logger.warning("Posible N+1 en %s %s: %d veces %s", metodo, ruta, veces, forma)
+            for observador in observadores_consultas:
+                observador(metodo, ruta, consultas)
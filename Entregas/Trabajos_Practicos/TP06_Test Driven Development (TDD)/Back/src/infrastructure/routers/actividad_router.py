@@ -1,36 +1,51 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
-from src.domain.database import get_db
-from src.domain.schemas import Actividad, ActividadCreate
-from src.domain.services.actividad_service import get_actividad, get_actividades, create_actividad, update_actividad, delete_actividad
+from src.domain.database import get_db, run_in_session
+from src.domain.services.version_service import etag_catalogo, leer_version
+from src.infrastructure.etag import agregar_etag, coincide_etag, no_modificado
+from src.domain.schemas import Actividad, ActividadCreate, DisponibilidadActividad
+from src.domain.services.actividad_service import get_actividad, get_actividades, create_actividad, update_actividad, delete_actividad, get_disponibilidad_actividades
 
 router = APIRouter(prefix="/actividades", tags=["actividades"])
 
 @router.get("/", response_model=list[Actividad])
-def read_actividades(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return get_actividades(db, skip=skip, limit=limit)
+async def read_actividades(request: Request, response: Response, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+    etag = etag_catalogo("actividades", await run_in_session(db, leer_version, "actividades"))
+    if coincide_etag(request, etag):
+        return no_modificado(etag)
+    agregar_etag(response, etag)
+    return await run_in_session(db, get_actividades, skip=skip, limit=limit)
+
+@router.get("/disponibilidad", response_model=list[DisponibilidadActividad])
+async def read_disponibilidad_actividades(request: Request, response: Response, db: Session = Depends(get_db)):
+    """Horarios abiertos y lugares libres por actividad (cambia junto con los horarios)"""
+    etag = etag_catalogo("horarios", await run_in_session(db, leer_version, "horarios"))
+    if coincide_etag(request, etag):
+        return no_modificado(etag)
+    agregar_etag(response, etag)
+    return await run_in_session(db, get_disponibilidad_actividades)
 
 @router.get("/{actividad_id}", response_model=Actividad)
-def read_actividad(actividad_id: int, db: Session = Depends(get_db)):
-    actividad = get_actividad(db, actividad_id=actividad_id)
+async def read_actividad(actividad_id: int, db: Session = Depends(get_db)):
+    actividad = await run_in_session(db, get_actividad, actividad_id=actividad_id)
     if actividad is None:
         raise HTTPException(status_code=404, detail="Actividad not found")
     return actividad
 
 @router.post("/", response_model=Actividad)
-def create_actividad_endpoint(actividad: ActividadCreate, db: Session = Depends(get_db)):
-    return create_actividad(db=db, actividad=actividad)
+async def create_actividad_endpoint(actividad: ActividadCreate, db: Session = Depends(get_db)):
+    return await run_in_session(db, create_actividad, actividad=actividad)
 
 @router.put("/{actividad_id}", response_model=Actividad)
-def update_actividad_endpoint(actividad_id: int, actividad: ActividadCreate, db: Session = Depends(get_db)):
-    db_actividad = update_actividad(db, actividad_id=actividad_id, actividad=actividad)
+async def update_actividad_endpoint(actividad_id: int, actividad: ActividadCreate, db: Session = Depends(get_db)):
+    db_actividad = await run_in_session(db, update_actividad, actividad_id=actividad_id, actividad=actividad)
     if db_actividad is None:
         raise HTTPException(status_code=404, detail="Actividad not found")
     return db_actividad
 
 @router.delete("/{actividad_id}")
-def delete_actividad_endpoint(actividad_id: int, db: Session = Depends(get_db)):
-    db_actividad = delete_actividad(db, actividad_id=actividad_id)
+async def delete_actividad_endpoint(actividad_id: int, db: Session = Depends(get_db)):
+    db_actividad = await run_in_session(db, delete_actividad, actividad_id=actividad_id)
     if db_actividad is None:
         raise HTTPException(status_code=404, detail="Actividad not found")
-    return {"message": "Actividad deleted"}
\ No newline at end of file
+    return {"message": "Actividad deleted"}
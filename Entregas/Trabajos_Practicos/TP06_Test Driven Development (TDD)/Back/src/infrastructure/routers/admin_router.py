@@ -0,0 +1,19 @@
+# Endpoints de operación del servicio
+# GET /admin/pool - Estado y métricas del pool de conexiones de este worker
+# GET /admin/consultas-lentas - Sentencias SQL que más tiempo acumularon por encima de DB_CONSULTAS_LENTAS_MS
+
+from fastapi import APIRouter, Query
+from src.domain.database import get_pool_metrics
+from src.infrastructure.consultas_lentas import registro_consultas_lentas
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+@router.get("/pool")
+def read_pool_metrics():
+    """Conexiones en uso, overflow, espera en checkout y timeouts del pool"""
+    return get_pool_metrics()
+
+@router.get("/consultas-lentas")
+def read_consultas_lentas(limite: int = Query(20, ge=1, le=500)):
+    """Formas de sentencia lentas de este worker con su plan, de la que más tiempo acumuló a la que menos"""
+    return registro_consultas_lentas.estado(limite)
@@ -1,36 +1,43 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
-from src.domain.database import get_db
+from src.domain.database import get_db, run_in_session
+from src.domain.services.version_service import etag_catalogo, leer_version
+from src.infrastructure.etag import agregar_etag, coincide_etag, no_modificado
 from src.domain.schemas import EstadoHorario, EstadoHorarioCreate
 from src.domain.services.estado_horario_service import get_estado_horario, get_estados_horario, create_estado_horario, update_estado_horario, delete_estado_horario
 
 router = APIRouter(prefix="/estados-horario", tags=["estados_horario"])
 
 @router.get("/", response_model=list[EstadoHorario])
-def read_estados_horario(db: Session = Depends(get_db)):
-    return get_estados_horario(db)
+async def read_estados_horario(request: Request, response: Response, db: Session = Depends(get_db)):
+    version = await run_in_session(db, leer_version, "estados-horario")
+    etag = etag_catalogo("estados-horario", version)
+    if coincide_etag(request, etag):
+        return no_modificado(etag)
+    agregar_etag(response, etag)
+    return await run_in_session(db, get_estados_horario, version)
 
 @router.get("/{nombre}", response_model=EstadoHorario)
-def read_estado_horario(nombre: str, db: Session = Depends(get_db)):
-    estado = get_estado_horario(db, nombre=nombre)
+async def read_estado_horario(nombre: str, db: Session = Depends(get_db)):
+    estado = await run_in_session(db, get_estado_horario, nombre=nombre)
     if estado is None:
         raise HTTPException(status_code=404, detail="EstadoHorario not found")
     return estado
 
 @router.post("/", response_model=EstadoHorario)
-def create_estado_horario_endpoint(estado: EstadoHorarioCreate, db: Session = Depends(get_db)):
-    return create_estado_horario(db=db, estado=estado)
+async def create_estado_horario_endpoint(estado: EstadoHorarioCreate, db: Session = Depends(get_db)):
+    return await run_in_session(db, create_estado_horario, estado=estado)
 
 @router.put("/{nombre}", response_model=EstadoHorario)
-def update_estado_horario_endpoint(nombre: str, estado: EstadoHorarioCreate, db: Session = Depends(get_db)):
-    db_estado = update_estado_horario(db, nombre=nombre, estado=estado)
+async def update_estado_horario_endpoint(nombre: str, estado: EstadoHorarioCreate, db: Session = Depends(get_db)):
+    db_estado = await run_in_session(db, update_estado_horario, nombre=nombre, estado=estado)
     if db_estado is None:
         raise HTTPException(status_code=404, detail="EstadoHorario not found")
     return db_estado
 
 @router.delete("/{nombre}")
-def delete_estado_horario_endpoint(nombre: str, db: Session = Depends(get_db)):
-    db_estado = delete_estado_horario(db, nombre=nombre)
+async def delete_estado_horario_endpoint(nombre: str, db: Session = Depends(get_db)):
+    db_estado = await run_in_session(db, delete_estado_horario, nombre=nombre)
     if db_estado is None:
         raise HTTPException(status_code=404, detail="EstadoHorario not found")
-    return {"message": "EstadoHorario deleted"}
\ No newline at end of file
+    return {"message": "EstadoHorario deleted"}
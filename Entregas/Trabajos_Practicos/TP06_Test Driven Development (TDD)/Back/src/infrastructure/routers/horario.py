@@ -1,62 +1,145 @@
+# Endpoints de horarios
+# GET /horarios/ - Listar horarios con actividad y estado (cacheado, con ETag)
+# GET /horarios/buscar - Buscar horarios por actividad, estado, franja horaria, cupo libre y requisitos
+# GET /horarios/cupos/stream - Cambios de cupo/estado en vivo por Server-Sent Events
+# WS /horarios/cupos/ws - Cambios de cupo/estado en vivo por WebSocket
 
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session, joinedload
-from pydantic import BaseModel, ConfigDict
-from typing import List
-from src.domain.database import get_db
-from src.domain.models import Horario, Actividad, EstadoHorario
+import asyncio
+import json
+from datetime import time
+from fastapi import APIRouter, Depends, Header, Query, Request, Response, WebSocket
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from src.domain.database import get_db, run_in_session
+from src.domain.services.horario_service import HorarioConDetalles, buscar_horarios, cache_horarios, get_horarios_con_detalles_json
+from src.domain.services.notificacion_service import canal_cupos
+from src.domain.services.version_service import etag_catalogo, leer_version
+from src.infrastructure.etag import agregar_etag, coincide_etag, no_modificado
+from src.infrastructure.serializacion import RespuestaLista
 
 router = APIRouter(prefix="/horarios", tags=["horarios"])
 
-class HorarioConDetalles(BaseModel):
-    model_config = ConfigDict(from_attributes=True)
-    
-    id: int
-    id_actividad: int
-    hora_inicio: str
-    hora_fin: str
-    cupo_total: int
-    cupo_ocupado: int
-    estado: str
-    
-    actividad: dict  # Contendrá id, nombre, requiere_talle
-    
-    estado_horario: dict  # Contendrá nombre, descripcion
-
 @router.get("/", response_model=List[HorarioConDetalles])
-def get_horarios(db: Session = Depends(get_db)):
+async def get_horarios(request: Request, db: Session = Depends(get_db)):
     """
     Obtener todos los horarios con información completa de actividad y estado_horario
+    (se sirve desde cache_horarios mientras no cambie la versión de horarios ni venza el TTL)
     """
-    horarios = (
-        db.query(Horario)
-        .options(joinedload(Horario.actividad))
-        .options(joinedload(Horario.estado_horario))
-        .all()
+    version = await run_in_session(db, leer_version, "horarios")
+    etag = etag_catalogo("horarios", version)
+    if coincide_etag(request, etag):
+        return no_modificado(etag)
+
+    cuerpo = cache_horarios.obtener("todos", version)
+    if cuerpo is None:
+        cuerpo = await run_in_session(db, get_horarios_con_detalles_json, version)
+    response = Response(content=cuerpo, media_type="application/json")
+    agregar_etag(response, etag)
+    return response
+
+LISTA_HORARIOS = RespuestaLista(HorarioConDetalles)
+
+class FiltrosHorarios:
+    """Filtros de la búsqueda de horarios; todos se aplican en la consulta SQL"""
+
+    def __init__(
+        self,
+        id_actividad: Optional[int] = None,
+        estado: Optional[str] = None,
+        desde: Optional[time] = Query(None, description="Empieza a esta hora o después (HH:MM)"),
+        hasta: Optional[time] = Query(None, description="Termina a esta hora o antes (HH:MM)"),
+        cupo_minimo: Optional[int] = Query(None, ge=1, description="Lugares libres que tiene que tener el horario"),
+        requiere_talle: Optional[bool] = None,
+        requiere_edad: Optional[bool] = Query(None, description="La actividad tiene (o no) edad mínima"),
+        edad: Optional[int] = Query(None, ge=0, description="Sólo actividades permitidas para esta edad")
+    ):
+        self.id_actividad = id_actividad
+        self.estado = estado
+        self.desde = desde
+        self.hasta = hasta
+        self.cupo_minimo = cupo_minimo
+        self.requiere_talle = requiere_talle
+        self.requiere_edad = requiere_edad
+        self.edad = edad
+
+    def como_dict(self) -> dict:
+        return vars(self).copy()
+
+@router.get("/buscar", response_model=List[HorarioConDetalles])
+async def search_horarios(request: Request, filtros: FiltrosHorarios = Depends(), db: Session = Depends(get_db)):
+    """Buscar horarios filtrando en la base, ordenados por hora de inicio"""
+    etag = etag_catalogo("horarios", await run_in_session(db, leer_version, "horarios"))
+    if coincide_etag(request, etag):
+        return no_modificado(etag)
+
+    horarios = await run_in_session(db, buscar_horarios, **filtros.como_dict())
+    response = LISTA_HORARIOS.respuesta(horarios)
+    agregar_etag(response, etag)
+    return response
+
+def _evento_sse(evento: str, datos: dict, id_evento: str) -> str:
+    return f"id: {id_evento}\nevent: {evento}\ndata: {json.dumps(datos)}\n\n"
+
+@router.get("/cupos/stream")
+async def stream_cupos(desde: Optional[str] = None, last_event_id: Optional[str] = Header(None)):
+    """
+    Deltas {id, cupo_ocupado, estado} de cada horario que cambia, como Server-Sent Events.
+    Para reanudar se envía `desde` o el header Last-Event-ID; si esos eventos ya no están
+    (o son de otro worker) se emite `reset` y el cliente debe volver a pedir /horarios.
+    """
+    suscripcion = canal_cupos.suscribir(desde if desde is not None else last_event_id)
+
+    async def generar():
+        try:
+            while True:
+                reinicio = suscripcion.tomar_reinicio()
+                if reinicio is not None:
+                    yield _evento_sse("reset", {"seq": reinicio}, reinicio)
+                eventos = await suscripcion.siguientes()
+                if eventos:
+                    yield "".join(_evento_sse("cupo", delta, id_evento) for id_evento, delta in eventos)
+                elif not suscripcion.reiniciar:
+                    yield ": latido\n\n"
+        finally:
+            canal_cupos.desuscribir(suscripcion)
+
+    return StreamingResponse(
+        generar(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
-    
-    # Convertir a formato de respuesta
-    result = []
-    for h in horarios:
-        result.append(HorarioConDetalles(
-            id=h.id,
-            id_actividad=h.id_actividad,
-            hora_inicio=h.hora_inicio,
-            hora_fin=h.hora_fin,
-            cupo_total=h.cupo_total,
-            cupo_ocupado=h.cupo_ocupado,
-            estado=h.estado,
-            actividad={
-                "id": h.actividad.id,
-                "nombre": h.actividad.nombre,
-                "requiere_talle": h.actividad.requiere_talle,
-                "edad": h.actividad.edad_minima,
-                "descripcion": h.actividad.descripcion
-            },
-            estado_horario={
-                "nombre": h.estado_horario.nombre,
-                "descripcion": h.estado_horario.descripcion
-            }
-        ))
-    
-    return result
\ No newline at end of file
+
+async def _enviar_cupos_ws(websocket: WebSocket, suscripcion):
+    while True:
+        reinicio = suscripcion.tomar_reinicio()
+        if reinicio is not None:
+            await websocket.send_json({"tipo": "reset", "seq": reinicio})
+        eventos = await suscripcion.siguientes()
+        if not eventos and not suscripcion.reiniciar:
+            await websocket.send_json({"tipo": "latido", "seq": canal_cupos.ultimo_id})
+        for id_evento, delta in eventos:
+            await websocket.send_json({"tipo": "cupo", "seq": id_evento, **delta})
+
+async def _esperar_cierre_ws(websocket: WebSocket):
+    """El canal es sólo de salida: lo que mande el cliente se ignora hasta que cierra"""
+    while (await websocket.receive())["type"] != "websocket.disconnect":
+        pass
+
+@router.websocket("/cupos/ws")
+async def ws_cupos(websocket: WebSocket, desde: Optional[str] = None):
+    """Mismos eventos que /cupos/stream como mensajes JSON {tipo, seq, ...}"""
+    await websocket.accept()
+    suscripcion = canal_cupos.suscribir(desde)
+    tareas = [
+        asyncio.create_task(_enviar_cupos_ws(websocket, suscripcion)),
+        asyncio.create_task(_esperar_cierre_ws(websocket))
+    ]
+    try:
+        # Termina cuando el cliente cierra o falla un envío
+        await asyncio.wait(tareas, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for tarea in tareas:
+            tarea.cancel()
+        await asyncio.gather(*tareas, return_exceptions=True)
+        canal_cupos.desuscribir(suscripcion)
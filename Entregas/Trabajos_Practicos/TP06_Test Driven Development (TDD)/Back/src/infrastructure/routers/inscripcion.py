@@ -1,78 +1,262 @@
 # Endpoints para gestión de inscripciones
-# GET /inscripciones/ - Listar inscripciones
-# GET /inscripciones/con-visitantes - Listar inscripciones con datos de visitantes
+# GET /inscripciones/ - Listar inscripciones (paginado con limit/after y filtros)
+# GET /inscripciones/con-visitantes - Listar inscripciones con datos de visitantes (idem)
 # POST /inscripciones/ - Crear inscripción (individual o grupal)
+# GET /inscripciones/export - Exportar inscripciones en streaming (NDJSON o CSV)
+# POST /inscripciones/bulk - Crear muchas inscripciones en un solo pedido (agencias)
+# DELETE /inscripciones/{id} - Cancelar una inscripción y liberar su cupo
+# POST /inscripciones/cancelar - Cancelar muchas inscripciones en una sola transacción
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
-from src.domain.database import get_db
-from src.domain.schemas import InscripcionUnificadaCreateRequest, InscripcionConVisitantes
-from src.domain.services.inscripcion_service import create_inscripcion_unificada, get_all_inscripciones, get_all_inscripciones_con_visitantes, InscripcionConActividad
+from pydantic import BaseModel
+from typing import List, Literal, Optional
+import csv
+import io
+import json
+from config_db import USAR_DB_ASYNC
+from src.domain.database import get_db, run_in_session, SessionLocal, AsyncSessionLocal
+from src.domain.models import Inscripcion
+from src.domain.schemas import InscripcionUnificadaCreateRequest, InscripcionMasivaCreateRequest, InscripcionConVisitantes, CancelacionRequest, ResultadoCancelacion
+from src.domain.services.inscripcion_service import create_inscripcion_unificada, create_inscripciones_masivas, get_all_inscripciones, get_all_inscripciones_con_visitantes, export_inscripciones_query, iterar_lotes_export, cancelar_inscripciones, InscripcionConActividad
+from src.domain.services.lista_espera_service import promotor_lista_espera
 from src.domain.services.inscripcion_service import create_inscripcion_unificada, get_all_inscripciones, InscripcionConActividad
-from src.domain.exceptions import CupoInsuficienteError, TerminosNoAceptadosError, HorarioNoEncontradoError, VisitanteNoEncontradoError, InscripcionDuplicadaError, TalleRequeridoError
+from src.infrastructure.errores import error_a_http, visitantes_a_dict
+from src.infrastructure.serializacion import RespuestaLista
 
 router = APIRouter(prefix="/inscripciones", tags=["inscripciones"])
 
+class ResultadoInscripcionMasiva(BaseModel):
+    """Resultado de cada solicitud de un lote, en el mismo orden en que se enviaron"""
+    indice: int
+    ok: bool
+    status_code: int
+    detail: Optional[str] = None
+    inscripciones: List[InscripcionConActividad] = []
+
+def _a_respuesta(insc: Inscripcion) -> InscripcionConActividad:
+    return InscripcionConActividad(
+        id=insc.id,
+        id_horario=insc.id_horario,
+        id_visitante=insc.id_visitante,
+        nro_personas=insc.nro_personas,
+        acepta_Terminos_Condiciones=insc.acepta_Terminos_Condiciones,
+        nombre_actividad=insc.horario.actividad.nombre
+    )
+
+LIMITE_PAGINA = 100  # página por defecto cuando se pagina con `after` sin `limit`
+
+class FiltrosInscripciones:
+    """
+    Parámetros de filtro y paginación por keyset compartidos por los listados.
+    La paginación es opcional: sin `limit` ni `after` se devuelven todas las inscripciones,
+    como antes de paginar; con `after` solo, páginas de LIMITE_PAGINA.
+    """
+
+    def __init__(
+        self,
+        limit: Optional[int] = Query(None, ge=1, le=1000, description="Cantidad máxima de inscripciones por página (sin limit ni after: todas)"),
+        after: Optional[int] = Query(None, description="Devolver inscripciones con id mayor a este (cursor)"),
+        id_horario: Optional[int] = None,
+        id_actividad: Optional[int] = None,
+        dni: Optional[int] = None
+    ):
+        if limit is None and after is not None:
+            limit = LIMITE_PAGINA
+        self.limit = limit
+        self.after = after
+        self.id_horario = id_horario
+        self.id_actividad = id_actividad
+        self.dni = dni
+
+    def como_dict(self) -> dict:
+        return vars(self).copy()
+
+LISTA_INSCRIPCIONES = RespuestaLista(InscripcionConActividad)
+LISTA_INSCRIPCIONES_CON_VISITANTES = RespuestaLista(InscripcionConVisitantes)
+
+def _agregar_link_siguiente(request: Request, response: Response, pagina: list, filtros: FiltrosInscripciones):
+    """Si la página vino completa, informar el cursor de la siguiente en el header Link (RFC 8288)"""
+    if filtros.limit is not None and len(pagina) == filtros.limit:
+        siguiente = request.url.include_query_params(after=pagina[-1].id, limit=filtros.limit)
+        response.headers["Link"] = f'<{siguiente}>; rel="next"'
+
 @router.get("/", response_model=List[InscripcionConActividad])
-def read_inscripciones(db: Session = Depends(get_db)):
-    """Obtener todas las inscripciones"""
-    return get_all_inscripciones(db)
+async def read_inscripciones(request: Request, filtros: FiltrosInscripciones = Depends(), db: Session = Depends(get_db)):
+    """Obtener inscripciones por id; con limit/after paginadas (la página siguiente va en el header Link)"""
+    inscripciones = await run_in_session(db, get_all_inscripciones, **filtros.como_dict())
+    response = LISTA_INSCRIPCIONES.respuesta(inscripciones)
+    _agregar_link_siguiente(request, response, inscripciones, filtros)
+    return response
 
 @router.get("/con-visitantes", response_model=List[InscripcionConVisitantes])
-def read_inscripciones_con_visitantes(db: Session = Depends(get_db)):
-    """Obtener todas las inscripciones con datos completos de los visitantes"""
-    return get_all_inscripciones_con_visitantes(db)
+async def read_inscripciones_con_visitantes(request: Request, filtros: FiltrosInscripciones = Depends(), db: Session = Depends(get_db)):
+    """Obtener inscripciones con datos completos de los visitantes; con limit/after paginadas por id"""
+    inscripciones = await run_in_session(db, get_all_inscripciones_con_visitantes, **filtros.como_dict())
+    response = LISTA_INSCRIPCIONES_CON_VISITANTES.respuesta(inscripciones)
+    _agregar_link_siguiente(request, response, inscripciones, filtros)
+    return response
+
+COLUMNAS_CSV_EXPORT = [
+    "id", "id_horario", "nro_personas", "acepta_Terminos_Condiciones", "nombre_actividad",
+    "id_visitante", "nombre", "dni", "edad", "talle"
+]
+
+def _lote_ndjson(filas) -> bytes:
+    """Una línea JSON por inscripción, con la misma forma que InscripcionConVisitantes"""
+    return "".join(
+        json.dumps({
+            "id": fila.id,
+            "id_horario": fila.id_horario,
+            "nro_personas": fila.nro_personas,
+            "acepta_Terminos_Condiciones": fila.acepta_Terminos_Condiciones,
+            "nombre_actividad": fila.nombre_actividad,
+            "visitante": {
+                "id": fila.id_visitante,
+                "nombre": fila.nombre,
+                "dni": fila.dni,
+                "edad": fila.edad,
+                "talle": fila.talle
+            }
+        }, ensure_ascii=False) + "\n"
+        for fila in filas
+    ).encode("utf-8")
+
+def _lote_csv(filas, encabezado: bool = False) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if encabezado:
+        writer.writerow(COLUMNAS_CSV_EXPORT)
+    writer.writerows(filas)
+    return buffer.getvalue().encode("utf-8")
+
+def _stream_export(formato: str, filtros: dict):
+    """
+    Genera la exportación de a un lote por vez leyendo desde un cursor del servidor.
+    La sesión se abre y se cierra dentro del generador, así vive lo mismo que la respuesta.
+    """
+    if USAR_DB_ASYNC:
+        async def generar():
+            if formato == "csv":
+                yield _lote_csv([], encabezado=True)
+            async with AsyncSessionLocal() as db:
+                resultado = await db.stream(export_inscripciones_query(**filtros))
+                async for filas in resultado.partitions():
+                    yield _lote_csv(filas) if formato == "csv" else _lote_ndjson(filas)
+        return generar()
+
+    def generar():
+        if formato == "csv":
+            yield _lote_csv([], encabezado=True)
+        db = SessionLocal()
+        try:
+            for filas in iterar_lotes_export(db, **filtros):
+                yield _lote_csv(filas) if formato == "csv" else _lote_ndjson(filas)
+        finally:
+            db.close()
+    return generar()
+
+@router.get("/export")
+async def export_inscripciones(
+    formato: Literal["ndjson", "csv"] = "ndjson",
+    id_horario: Optional[int] = None,
+    id_actividad: Optional[int] = None,
+    dni: Optional[int] = None
+):
+    """Exportar todas las inscripciones con datos de visitantes como NDJSON o CSV, en streaming"""
+    filtros = {"id_horario": id_horario, "id_actividad": id_actividad, "dni": dni}
+    if formato == "csv":
+        return StreamingResponse(
+            _stream_export(formato, filtros),
+            media_type="text/csv; charset=utf-8",
+            headers={"Content-Disposition": 'attachment; filename="inscripciones.csv"'}
+        )
+    return StreamingResponse(_stream_export(formato, filtros), media_type="application/x-ndjson")
+
+def _crear_inscripcion(db: Session, inscripcion: InscripcionUnificadaCreateRequest) -> List[InscripcionConActividad]:
+    inscripciones = create_inscripcion_unificada(
+        db=db,
+        id_horario=inscripcion.id_horario,
+        visitantes=visitantes_a_dict(inscripcion),
+        acepta_terminos=inscripcion.acepta_terminos,
+        token_reserva=inscripcion.token_reserva
+    )
+
+    # Convertir a formato de respuesta dentro de la sesión
+    return [_a_respuesta(insc) for insc in inscripciones]
 
 @router.post("/", response_model=List[InscripcionConActividad])
-def create_inscripcion_endpoint(inscripcion: InscripcionUnificadaCreateRequest, db: Session = Depends(get_db)):
+async def create_inscripcion_endpoint(inscripcion: InscripcionUnificadaCreateRequest, db: Session = Depends(get_db)):
     """Crear inscripción individual o grupal"""
     try:
-        # Convertir visitantes a formato dict para el servicio
-        visitantes_dict = [
-            {
-                "nombre": v.nombre,
-                "dni": v.dni,
-                "edad": v.edad,
-                "talle": v.talle
-            }
-            for v in inscripcion.visitantes
-        ]
-        
-        inscripciones = create_inscripcion_unificada(
-            db=db,
-            id_horario=inscripcion.id_horario,
-            visitantes=visitantes_dict,
-            acepta_terminos=inscripcion.acepta_terminos
-        )
-        
-        # Convertir a formato de respuesta
-        resultado = []
-        for insc in inscripciones:
-            resultado.append(InscripcionConActividad(
-                id=insc.id,
-                id_horario=insc.id_horario,
-                id_visitante=insc.id_visitante,
-                nro_personas=insc.nro_personas,
-                acepta_Terminos_Condiciones=insc.acepta_Terminos_Condiciones,
-                nombre_actividad=insc.horario.actividad.nombre
+        return await run_in_session(db, _crear_inscripcion, inscripcion)
+    except Exception as e:
+        raise error_a_http(e)
+
+def _crear_inscripciones_bulk(db: Session, lote: InscripcionMasivaCreateRequest) -> List[ResultadoInscripcionMasiva]:
+    solicitudes = [
+        {
+            "id_horario": inscripcion.id_horario,
+            "visitantes": visitantes_a_dict(inscripcion),
+            "acepta_terminos": inscripcion.acepta_terminos,
+            "token_reserva": inscripcion.token_reserva
+        }
+        for inscripcion in lote.inscripciones
+    ]
+    resultados = create_inscripciones_masivas(db=db, solicitudes=solicitudes)
+
+    respuesta = []
+    for indice, resultado in enumerate(resultados):
+        if isinstance(resultado, Exception):
+            error = error_a_http(resultado)
+            respuesta.append(ResultadoInscripcionMasiva(
+                indice=indice, ok=False, status_code=error.status_code, detail=error.detail
             ))
-        
-        return resultado
-        
-    except HorarioNoEncontradoError:
-        raise HTTPException(status_code=404, detail="Horario no encontrado")
-    except VisitanteNoEncontradoError:
-        raise HTTPException(status_code=404, detail="Visitante no encontrado")
-    except CupoInsuficienteError:
-        raise HTTPException(status_code=400, detail="No hay cupo disponible")
-    except TerminosNoAceptadosError:
-        raise HTTPException(status_code=400, detail="Debe aceptar los términos y condiciones")
-    except InscripcionDuplicadaError as e:
-        raise HTTPException(status_code=409, detail=str(e))
-    except TalleRequeridoError as e:
-        raise HTTPException(status_code=400, detail=f"La actividad {e.nombre_actividad} requiere talle pero el visitante no lo tiene asignado")
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
+        else:
+            respuesta.append(ResultadoInscripcionMasiva(
+                indice=indice, ok=True, status_code=200,
+                inscripciones=[_a_respuesta(insc) for insc in resultado]
+            ))
+    return respuesta
+
+@router.post("/bulk", response_model=List[ResultadoInscripcionMasiva])
+async def create_inscripciones_bulk_endpoint(lote: InscripcionMasivaCreateRequest, db: Session = Depends(get_db)):
+    """
+    Crear muchas inscripciones en un solo pedido y una sola transacción.
+    Cada solicitud se acepta o rechaza por separado; el resultado indica el código
+    HTTP que hubiera devuelto POST /inscripciones/ para esa solicitud.
+    """
+    try:
+        return await run_in_session(db, _crear_inscripciones_bulk, lote)
+    except Exception as e:
+        raise error_a_http(e)
+
+def _cancelar(db: Session, ids: List[int]) -> ResultadoCancelacion:
+    resultado = cancelar_inscripciones(db=db, ids_inscripciones=ids)
+    if resultado.canceladas:
+        # El cupo liberado puede ser para alguien de la lista de espera
+        promotor_lista_espera.avisar()
+    return resultado
+
+@router.delete("/{inscripcion_id}", response_model=ResultadoCancelacion)
+async def cancelar_inscripcion_endpoint(inscripcion_id: int, db: Session = Depends(get_db)):
+    """Cancelar una inscripción; devuelve el cupo del horario después de liberarla"""
+    try:
+        resultado = await run_in_session(db, _cancelar, [inscripcion_id])
+    except Exception as e:
+        raise error_a_http(e)
+    if not resultado.canceladas:
+        raise HTTPException(status_code=404, detail="Inscripción no encontrada")
+    return resultado
+
+@router.post("/cancelar", response_model=ResultadoCancelacion)
+async def cancelar_inscripciones_endpoint(cancelacion: CancelacionRequest, db: Session = Depends(get_db)):
+    """
+    Cancelar muchas inscripciones en una sola transacción. Los ids que no existen
+    se informan en no_encontradas sin hacer fallar al resto.
+    """
+    try:
+        return await run_in_session(db, _cancelar, cancelacion.ids)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error interno del servidor: {str(e)}")
\ No newline at end of file
+        raise error_a_http(e)
@@ -0,0 +1,39 @@
+# Endpoints de la lista de espera
+# POST /lista-espera/ - Anotarse en la lista de espera de un horario lleno
+# GET /lista-espera/{id_entrada} - Estado y posición de una entrada
+# POST /lista-espera/promover - Correr una pasada del promotor a mano
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from typing import Dict, List
+from src.domain.database import get_db, run_in_session
+from src.domain.schemas import EntradaListaEspera, InscripcionUnificadaCreateRequest
+from src.domain.services.lista_espera_service import get_entrada_lista_espera, promover_lista_espera, unirse_lista_espera
+from src.infrastructure.errores import error_a_http, visitantes_a_dict
+
+router = APIRouter(prefix="/lista-espera", tags=["lista_espera"])
+
+@router.post("/", response_model=List[EntradaListaEspera])
+async def create_entrada_lista_espera(solicitud: InscripcionUnificadaCreateRequest, db: Session = Depends(get_db)):
+    """Anotar uno o más visitantes en la lista de espera; se inscriben solos cuando se libera cupo"""
+    try:
+        return await run_in_session(
+            db, unirse_lista_espera,
+            id_horario=solicitud.id_horario,
+            visitantes=visitantes_a_dict(solicitud),
+            acepta_terminos=solicitud.acepta_terminos
+        )
+    except Exception as e:
+        raise error_a_http(e)
+
+@router.post("/promover")
+async def promover_lista_espera_endpoint(db: Session = Depends(get_db)) -> Dict[str, int]:
+    """Promover ahora las entradas que tengan lugar (el promotor lo hace solo cada LISTA_ESPERA_INTERVALO)"""
+    return await run_in_session(db, promover_lista_espera)
+
+@router.get("/{id_entrada}", response_model=EntradaListaEspera)
+async def read_entrada_lista_espera(id_entrada: int, db: Session = Depends(get_db)):
+    entrada = await run_in_session(db, get_entrada_lista_espera, id_entrada=id_entrada)
+    if entrada is None:
+        raise HTTPException(status_code=404, detail="Entrada de lista de espera no encontrada")
+    return entrada
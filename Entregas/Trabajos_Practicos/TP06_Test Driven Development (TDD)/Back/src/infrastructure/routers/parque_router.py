@@ -1,25 +1,25 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from src.domain.database import get_db
+from src.domain.database import get_db, run_in_session
 from src.domain.schemas import Parque, ParqueCreate
 from src.domain.services.parque_service import get_parque, create_parque, update_parque
 
 router = APIRouter(prefix="/parque", tags=["parque"])
 
 @router.get("/", response_model=Parque)
-def read_parque(db: Session = Depends(get_db)):
-    parque = get_parque(db)
+async def read_parque(db: Session = Depends(get_db)):
+    parque = await run_in_session(db, get_parque)
     if parque is None:
         raise HTTPException(status_code=404, detail="Parque not found")
     return parque
 
 @router.post("/", response_model=Parque)
-def create_parque_endpoint(parque: ParqueCreate, db: Session = Depends(get_db)):
-    return create_parque(db=db, parque=parque)
+async def create_parque_endpoint(parque: ParqueCreate, db: Session = Depends(get_db)):
+    return await run_in_session(db, create_parque, parque=parque)
 
 @router.put("/", response_model=Parque)
-def update_parque_endpoint(parque: ParqueCreate, db: Session = Depends(get_db)):
-    db_parque = update_parque(db, parque=parque)
+async def update_parque_endpoint(parque: ParqueCreate, db: Session = Depends(get_db)):
+    db_parque = await run_in_session(db, update_parque, parque=parque)
     if db_parque is None:
         raise HTTPException(status_code=404, detail="Parque not found")
-    return db_parque
\ No newline at end of file
+    return db_parque
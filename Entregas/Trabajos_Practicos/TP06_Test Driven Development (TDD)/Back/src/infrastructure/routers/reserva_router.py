@@ -0,0 +1,33 @@
+# Endpoints de reservas temporales de cupo
+# POST /reservas/ - Apartar lugares de un horario por RESERVA_TTL segundos (devuelve el token)
+# DELETE /reservas/{token} - Devolver los lugares antes de que venza la reserva
+# POST /reservas/liberar-vencidas - Correr una pasada del liberador a mano
+# El token se canjea con POST /inscripciones/ (campo token_reserva)
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from typing import Dict
+from src.domain.database import get_db, run_in_session
+from src.domain.schemas import ReservaCreateRequest, ReservaTemporal
+from src.domain.services.reserva_service import crear_reserva, liberar_reserva, liberar_reservas_vencidas
+from src.infrastructure.errores import error_a_http
+
+router = APIRouter(prefix="/reservas", tags=["reservas"])
+
+@router.post("/", response_model=ReservaTemporal)
+async def create_reserva(solicitud: ReservaCreateRequest, db: Session = Depends(get_db)):
+    """Apartar lugares mientras se completa la inscripción"""
+    try:
+        return await run_in_session(db, crear_reserva, id_horario=solicitud.id_horario, cantidad=solicitud.cantidad)
+    except Exception as e:
+        raise error_a_http(e)
+
+@router.post("/liberar-vencidas")
+async def liberar_reservas_vencidas_endpoint(db: Session = Depends(get_db)) -> Dict[str, int]:
+    """Liberar ahora las reservas vencidas (el liberador lo hace solo cada RESERVAS_INTERVALO)"""
+    return {"liberadas": await run_in_session(db, liberar_reservas_vencidas)}
+
+@router.delete("/{token}", status_code=204)
+async def delete_reserva(token: str, db: Session = Depends(get_db)):
+    if not await run_in_session(db, liberar_reserva, token=token):
+        raise HTTPException(status_code=404, detail="Reserva no encontrada")
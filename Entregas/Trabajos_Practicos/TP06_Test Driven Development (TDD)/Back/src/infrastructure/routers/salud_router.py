@@ -0,0 +1,24 @@
+# Endpoints de salud para el balanceador
+# GET /healthz - El worker está vivo (no consulta la base)
+# GET /readyz - El worker terminó de precalentar y la base responde (503 si no)
+
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from src.infrastructure import salud
+
+router = APIRouter(tags=["salud"])
+
+@router.get("/healthz")
+def read_healthz():
+    return {"status": "ok"}
+
+@router.get("/readyz")
+async def read_readyz():
+    """El chequeo de la base se reutiliza SALUD_DB_TTL segundos (ver ChequeoBase)"""
+    db = salud.chequeo_base.vigente() or await run_in_threadpool(salud.chequeo_base.consultar)
+    listo = salud.estado_arranque.listo and db["ok"]
+    return JSONResponse(
+        status_code=200 if listo else 503,
+        content={"status": "ok" if listo else "no_listo", "arranque": salud.estado_arranque.resumen(), "db": db}
+    )
@@ -0,0 +1,160 @@
+# Estado de salud de cada worker: precalentamiento al iniciar y chequeo de la base para /readyz
+import asyncio
+import logging
+import threading
+import time
+from typing import Dict, Optional, Union
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+from config_db import POOL_SIZE_DB, PRECALENTAR_AL_INICIAR, TIMEOUT_PRECALENTAR, TTL_CHEQUEO_DB, TIMEOUT_CHEQUEO_DB
+from src.domain.database import DATABASE_URL, AsyncSessionLocal, SessionLocal, async_engine, engine
+from src.domain.services.actividad_service import get_disponibilidad_actividades
+from src.domain.services.estado_horario_service import get_estados_horario
+from src.domain.services.horario_service import buscar_horarios, get_horarios_con_detalles_json
+from src.domain.services.inscripcion_service import (
+    buscar_horario_con_actividad, buscar_inscripciones_con_horario, buscar_visitantes_por_dni, get_all_inscripciones
+)
+from src.domain.services.version_service import RECURSOS_CATALOGO, leer_version
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+class ChequeoBase:
+    """
+    Chequeo de la base para /readyz. El resultado se reutiliza `ttl` segundos y nunca corre
+    más de un chequeo a la vez (los demás pedidos reciben el último resultado), así los
+    probes del balanceador no compiten con el tráfico real. Usa su propia conexión, fuera
+    del pool de la app: con el pool agotado el probe no espera DB_POOL_TIMEOUT ni le quita
+    una conexión a un pedido.
+    """
+
+    def __init__(self, url: str = DATABASE_URL, ttl: float = TTL_CHEQUEO_DB, timeout: int = TIMEOUT_CHEQUEO_DB):
+        self.ttl = ttl
+        self.motor = create_engine(
+            url, poolclass=NullPool,
+            connect_args={"connect_timeout": timeout, "options": f"-c statement_timeout={timeout * 1000}"}
+        )
+        self.chequeos = 0
+        self._resultado: Optional[dict] = None
+        self._momento = 0.0
+        self._lock = threading.Lock()
+
+    def vigente(self) -> Optional[dict]:
+        """El último resultado si tiene menos de `ttl` segundos, sin tocar la base"""
+        if self._resultado is not None and time.monotonic() - self._momento < self.ttl:
+            return self._resultado
+        return None
+
+    def consultar(self) -> dict:
+        resultado = self.vigente()
+        if resultado is not None:
+            return resultado
+        if not self._lock.acquire(blocking=False):
+            # Otro pedido está chequeando: su resultado (o el anterior) alcanza
+            if self._resultado is not None:
+                return self._resultado
+            with self._lock:
+                return self._resultado
+        try:
+            self.chequeos += 1
+            inicio = time.perf_counter()
+            try:
+                with self.motor.connect() as conexion:
+                    conexion.execute(text("SELECT 1"))
+                resultado = {"ok": True, "latencia_ms": round((time.perf_counter() - inicio) * 1000, 3)}
+            except Exception as e:
+                logger.warning("Chequeo de la base falló: %s", e)
+                resultado = {"ok": False, "error": type(e).__name__}
+            self._resultado, self._momento = resultado, time.monotonic()
+            return resultado
+        finally:
+            self._lock.release()
+
+chequeo_base = ChequeoBase()
+
+class EstadoArranque:
+    """Resultado del precalentamiento de este worker (duración de cada paso o su error)"""
+
+    def __init__(self):
+        self.listo = False
+        self.pasos: Dict[str, Union[float, str]] = {}
+
+    def resumen(self) -> dict:
+        return {"listo": self.listo, "pasos": dict(self.pasos)}
+
+estado_arranque = EstadoArranque()
+
+def _abrir_pool(cantidad: int):
+    """Abre `cantidad` conexiones a la vez y las devuelve: quedan en el pool para los primeros pedidos"""
+    conexiones = []
+    try:
+        for _ in range(cantidad):
+            conexiones.append(engine.connect())
+    finally:
+        for conexion in conexiones:
+            conexion.close()
+
+async def _abrir_pool_async(cantidad: int):
+    conexiones = [async_engine.connect() for _ in range(cantidad)]
+    abiertas = await asyncio.gather(*(conexion.start() for conexion in conexiones), return_exceptions=True)
+    for conexion in conexiones:
+        await conexion.close()
+    for abierta in abiertas:
+        if isinstance(abierta, Exception):
+            raise abierta
+
+def _consultas_frecuentes(db: Session):
+    """
+    Corre las lecturas de los endpoints más usados: compila sus sentencias en la cache de
+    SQLAlchemy del motor y deja cargadas la cache de horarios y la lista de estados
+    """
+    for recurso in RECURSOS_CATALOGO:
+        leer_version(db, recurso)
+    get_horarios_con_detalles_json(db, leer_version(db, "horarios"))
+    get_estados_horario(db)
+    buscar_horarios(db)
+    get_disponibilidad_actividades(db)
+    get_all_inscripciones(db, limit=1)
+    # Búsquedas de POST /inscripciones/ (con ids que no existen)
+    buscar_horario_con_actividad(db, 0)
+    buscar_visitantes_por_dni(db, [0])
+    buscar_inscripciones_con_horario(db, [0])
+    db.rollback()
+
+def _compilar_consultas():
+    with SessionLocal() as db:
+        _consultas_frecuentes(db)
+
+async def _compilar_consultas_async():
+    async with AsyncSessionLocal() as db:
+        await db.run_sync(_consultas_frecuentes)
+
+async def precalentar(app, activo: bool = PRECALENTAR_AL_INICIAR, timeout: float = TIMEOUT_PRECALENTAR):
+    """
+    Abre el pool, compila las consultas frecuentes y arma el esquema OpenAPI. El lifespan lo
+    lanza como tarea de fondo: el worker ya atiende (/healthz responde) y /readyz da 503 hasta
+    que termina. Cada paso tiene `timeout` segundos (el motor de la app no tiene timeout de
+    conexión: con la base caída un connect puede colgarse); un paso que falla o se pasa de
+    tiempo queda anotado con su error y el precalentamiento sigue: /readyz depende igual de
+    la base.
+    """
+    pasos = [("pool", lambda: run_in_threadpool(_abrir_pool, POOL_SIZE_DB))]
+    if async_engine is not None:
+        pasos.append(("pool_async", lambda: _abrir_pool_async(POOL_SIZE_DB)))
+    pasos.append(("consultas", lambda: run_in_threadpool(_compilar_consultas)))
+    if AsyncSessionLocal is not None:
+        pasos.append(("consultas_async", _compilar_consultas_async))
+    pasos.append(("esquemas", lambda: run_in_threadpool(app.openapi)))
+
+    estado_arranque.listo = False
+    estado_arranque.pasos.clear()
+    for nombre, paso in pasos if activo else []:
+        inicio = time.perf_counter()
+        try:
+            await asyncio.wait_for(paso(), timeout)
+            estado_arranque.pasos[nombre] = round((time.perf_counter() - inicio) * 1000, 3)
+        except Exception as e:
+            logger.exception("Precalentamiento: falló el paso %s", nombre)
+            estado_arranque.pasos[nombre] = f"error: {type(e).__name__}"
+    estado_arranque.listo = True
@@ -0,0 +1,20 @@
+# Serialización rápida de listados grandes
+from typing import List, Optional, Type
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+
+class RespuestaLista:
+    """
+    Codifica una lista de modelos con un TypeAdapter armado una sola vez (serializador de
+    pydantic-core). Al devolver un Response ya armado FastAPI no vuelve a validar contra
+    response_model ni pasa por jsonable_encoder; response_model queda sólo para la documentación.
+    """
+
+    def __init__(self, modelo: Type[BaseModel]):
+        self._adaptador = TypeAdapter(List[modelo])
+
+    def json(self, items: list) -> bytes:
+        return self._adaptador.dump_json(items)
+
+    def respuesta(self, items: list, headers: Optional[dict] = None) -> Response:
+        return Response(content=self.json(items), media_type="application/json", headers=headers)
@@ -1,41 +1,181 @@
 # Configuración de fixtures para tests
+#
+# El esquema se crea una vez por sesión (uno por worker de pytest-xdist, así `pytest -n auto`
+# corre en paralelo) y los datos base se cargan una sola vez. Cada test corre dentro de una
+# transacción que se revierte al final: los commit de los servicios sólo liberan un SAVEPOINT.
+# Los tests marcados con @pytest.mark.datos_confirmados (o que usan async_client) necesitan que
+# otras conexiones vean sus datos: confirman de verdad y al terminar se vacían las tablas y se
+# vuelven a cargar los datos base.
 import sys
 import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 import pytest
+
+# Los tests corren la promoción de la lista de espera y la liberación de reservas a mano
+# (POST /lista-espera/promover, POST /reservas/liberar-vencidas)
+os.environ.setdefault("LISTA_ESPERA_INTERVALO", "0")
+os.environ.setdefault("RESERVAS_INTERVALO", "0")
+# El precalentamiento se prueba aparte (test_readyz_y_precalentamiento)
+os.environ.setdefault("ARRANQUE_PRECALENTAR", "false")
+
+# Esquema propio de este worker; también lo usan las sesiones que la app abre por su cuenta
+ESQUEMA_TESTS = f"tests_{os.environ.get('PYTEST_XDIST_WORKER', 'main')}"
+os.environ["DB_SCHEMA"] = ESQUEMA_TESTS
+
 from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import NullPool
 from fastapi.testclient import TestClient
 from src.domain.database import Base, get_db
+from src.domain.models import Actividad, EstadoHorario, Horario, Visitante
+from src.domain.services.horario_service import cache_horarios
 from src.application.main import app
+from src.infrastructure.metricas import observadores_consultas
 from config_db import USUARIO_DB, CONTRASENA_DB, PUERTO_DB, URL_DB, DATABASE_NAME
 
 TEST_DATABASE_URL = f"postgresql://{USUARIO_DB}:{CONTRASENA_DB}@{URL_DB}:{PUERTO_DB}/{DATABASE_NAME}"
+TEST_ASYNC_DATABASE_URL = f"postgresql+asyncpg://{USUARIO_DB}:{CONTRASENA_DB}@{URL_DB}:{PUERTO_DB}/{DATABASE_NAME}"
 
-engine = create_engine(TEST_DATABASE_URL)
+engine = create_engine(TEST_DATABASE_URL, connect_args={"options": f"-c search_path={ESQUEMA_TESTS}"})
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-@pytest.fixture(scope="function")
-def db_session():
-    # Limpiar todas las tablas antes del test
-    with engine.connect() as conn:
-        # Deshabilitar restricciones de clave foránea temporalmente
-        conn.execute(text("SET session_replication_role = 'replica'"))
-        for table in reversed(Base.metadata.sorted_tables):
-            conn.execute(text(f"DELETE FROM {table.name}"))
-        # Rehabilitar restricciones de clave foránea
-        conn.execute(text("SET session_replication_role = 'origin'"))
-        conn.commit()
-
-    # Crear tablas si no existen
+# {clave: (modelo, id)} de los datos base cargados (ver build_test_data en los tests)
+datos_base = {}
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--presupuesto-consultas", type=int, default=None,
+        help="falla el test si algún pedido HTTP ejecuta más sentencias SQL que esto"
+    )
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        "datos_confirmados: el test confirma sus datos de verdad (hilos u otras conexiones tienen que verlos)"
+    )
+    config.addinivalue_line(
+        "markers",
+        "presupuesto_consultas(maximo): máximo de sentencias SQL por pedido HTTP en este test"
+    )
+
+def sembrar_datos_base():
+    """Cargar estados, actividades, horarios y visitantes que usan todos los tests"""
+    with TestingSessionLocal() as db:
+        estado_activo = EstadoHorario(nombre="activo", descripcion="Horario activo")
+        estado_inactivo = EstadoHorario(nombre="inactivo", descripcion="Horario inactivo")
+
+        tirolesa = Actividad(nombre="Tirolesa", requiere_talle=True, edad_minima=12, descripcion="Deslízate por las copas de los árboles en una experiencia emocionante de aventura extrema")
+        safari = Actividad(nombre="Safari", requiere_talle=False, edad_minima=None, descripcion="Recorre el parque en vehículos especiales y observa la fauna local en su hábitat natural")
+        palestra = Actividad(nombre="Palestra", requiere_talle=True, edad_minima=8, descripcion="Zona de juegos infantiles con estructuras")
+        jardineria = Actividad(nombre="Jardineria", requiere_talle=False, edad_minima=None, descripcion="Aprende técnicas de cultivo sustentable y participa en el cuidado de nuestro vivero ecológico")
+
+        db.add_all([estado_activo, estado_inactivo, tirolesa, safari, palestra, jardineria])
+        db.flush()
+
+        horarios = {
+            'horario_tirolesa': Horario(id_actividad=tirolesa.id, hora_inicio="10:00", hora_fin="11:00", cupo_total=5, cupo_ocupado=0, estado="activo"),
+            'horario_safari': Horario(id_actividad=safari.id, hora_inicio="10:00", hora_fin="12:00", cupo_total=10, cupo_ocupado=0, estado="activo"),
+            'horario_palestra': Horario(id_actividad=palestra.id, hora_inicio="13:00", hora_fin="14:00", cupo_total=8, cupo_ocupado=0, estado="inactivo"),
+            'horario_jardineria': Horario(id_actividad=jardineria.id, hora_inicio="14:00", hora_fin="15:00", cupo_total=10, cupo_ocupado=0, estado="activo"),
+            'horario_palestra_2': Horario(id_actividad=palestra.id, hora_inicio="15:00", hora_fin="16:00", cupo_total=8, cupo_ocupado=0, estado="activo"),
+        }
+        ana = Visitante(nombre="Ana", dni=12345678, edad=25, talle="M")
+        luis = Visitante(nombre="Luis", dni=87654321, edad=30, talle="L")
+        db.add_all([*horarios.values(), ana, luis])
+        db.commit()
+
+        objetos = {
+            'tirolesa': tirolesa,
+            'safari': safari,
+            'palestra': palestra,
+            'jardineria': jardineria,
+            **horarios,
+            'ana': ana,
+            'luis': luis,
+            'estado_activo': estado_activo,
+            'estado_inactivo': estado_inactivo
+        }
+        datos_base.clear()
+        datos_base.update({
+            clave: (type(objeto), db.identity_key(instance=objeto)[1][0])
+            for clave, objeto in objetos.items()
+        })
+
+def vaciar_tablas():
+    # version_catalogo sigue contando: vaciarla repetiría ETags entre tests
+    tablas = ", ".join(table.name for table in Base.metadata.sorted_tables if table.name != "version_catalogo")
+    with engine.begin() as conn:
+        conn.execute(text(f"TRUNCATE {tablas} CASCADE"))
+
+@pytest.fixture(scope="session")
+def esquema_tests():
+    """Crear el esquema del worker con todas las tablas y los datos base, una sola vez"""
+    with engine.begin() as conn:
+        conn.execute(text(f'DROP SCHEMA IF EXISTS "{ESQUEMA_TESTS}" CASCADE'))
+        conn.execute(text(f'CREATE SCHEMA "{ESQUEMA_TESTS}"'))
     Base.metadata.create_all(bind=engine)
-    db = TestingSessionLocal()
+    sembrar_datos_base()
+    yield
+    with engine.begin() as conn:
+        conn.execute(text(f'DROP SCHEMA IF EXISTS "{ESQUEMA_TESTS}" CASCADE'))
+    engine.dispose()
+
+@pytest.fixture(scope="function")
+def db_session(request, esquema_tests):
+    # La cache es del proceso: que no arrastre datos de otro test
+    cache_horarios.invalidar()
+
+    if request.node.get_closest_marker("datos_confirmados") or "async_client" in request.fixturenames:
+        db = TestingSessionLocal()
+        db.info["datos_base"] = datos_base
+        try:
+            yield db
+        finally:
+            db.close()
+            vaciar_tablas()
+            sembrar_datos_base()
+        return
+
+    # Todo lo que haga el test (commits incluidos) queda dentro de esta transacción
+    conexion = engine.connect()
+    transaccion = conexion.begin()
+    db = Session(bind=conexion, autoflush=False, join_transaction_mode="create_savepoint")
+    db.info["datos_base"] = datos_base
     try:
         yield db
     finally:
-        db.rollback()  # Revertir cambios después de cada test
         db.close()
+        transaccion.rollback()
+        conexion.close()
+
+@pytest.fixture(autouse=True)
+def presupuesto_consultas(request):
+    """
+    Con @pytest.mark.presupuesto_consultas(n) o --presupuesto-consultas=n, el test falla si
+    algún pedido HTTP que hizo ejecutó más de n sentencias SQL (ver ConsultasMiddleware)
+    """
+    marca = request.node.get_closest_marker("presupuesto_consultas")
+    maximo = marca.args[0] if marca else request.config.getoption("--presupuesto-consultas")
+    if maximo is None:
+        yield
+        return
+
+    excedidos = []
+
+    def controlar(metodo, ruta, consultas):
+        if consultas.cantidad > maximo:
+            repetida, veces = consultas.formas.most_common(1)[0]
+            excedidos.append(f"{metodo} {ruta}: {consultas.cantidad} sentencias (la más repetida, {veces} veces: {repetida})")
+
+    observadores_consultas.append(controlar)
+    try:
+        yield
+    finally:
+        observadores_consultas.remove(controlar)
+    if excedidos:
+        pytest.fail(f"Presupuesto de {maximo} sentencias SQL por pedido excedido:\n" + "\n".join(excedidos))
 
 @pytest.fixture(scope="function")
 def client(db_session):
@@ -46,7 +186,27 @@ def client(db_session):
             yield db_session
         finally:
             pass
-    
+
+    app.dependency_overrides[get_db] = override_get_db
+    with TestClient(app) as test_client:
+        yield test_client
+
+@pytest.fixture(scope="function")
+def async_client(db_session):
+    """Fixture para un cliente de test cuyos endpoints usan AsyncSession (modo DB_ASYNC)"""
+    pytest.importorskip("asyncpg")
+    # NullPool: cada request abre su conexión en el event loop del TestClient
+    async_engine = create_async_engine(
+        TEST_ASYNC_DATABASE_URL, poolclass=NullPool,
+        connect_args={"server_settings": {"search_path": ESQUEMA_TESTS}}
+    )
+    AsyncTestingSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+    async def override_get_db():
+        async with AsyncTestingSessionLocal() as db:
+            yield db
+
     app.dependency_overrides[get_db] = override_get_db
     with TestClient(app) as test_client:
-        yield test_client
\ No newline at end of file
+        yield test_client
+    app.dependency_overrides.clear()